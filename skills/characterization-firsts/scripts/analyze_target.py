@@ -5,6 +5,9 @@ Used in the SELECT phase of characterization-first workflow.
 
 Usage:
     python analyze_target.py <target_file.py> [--json]
+    python analyze_target.py --recursive <package_dir> [--workers N]
+    python analyze_target.py ... --cache-dir .tmp/analysis-cache [--cache-max-mb 256]
+    python analyze_target.py <file or --recursive dir> --call-graph [--profile prof.out] [--top N] [--json]
 
 Output:
     Structured analysis of the target file including:
@@ -13,15 +16,40 @@ Output:
     - Imports (potential seams)
     - Global variable access (implicit inputs)
     - File/network operations (side effects)
+
+    With --recursive, every .py file under the directory is analyzed in a
+    process pool and printed as one JSON object per line (NDJSON), in path
+    order, followed by a final {"summary": {...}} line aggregating counts.
+
+    With --cache-dir, results are stored keyed by (source hash, analyzer
+    version, Python version), so repeated passes only re-parse files whose
+    contents changed. The least recently used entries are evicted once the
+    directory grows past --cache-max-mb.
+
+    With --call-graph, the calls_made of every analyzed function are resolved
+    into an intra- and inter-module call graph, and functions are ranked for
+    characterization by fan-in, fan-out and transitive reach. --profile merges
+    a cProfile/pstats file so measured cumulative time ranks first. Printed
+    as a ranked table, or with --json as {"functions": [...], "edges": [...]}.
 """
 
 import ast
+import os
 import sys
 import json
 import argparse
+import hashlib
+import tempfile
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache, partial
 from pathlib import Path
 from dataclasses import dataclass, field, asdict
-from typing import List, Set
+from typing import Dict, Iterator, List, Optional, Set, Tuple, Union
+
+# Bump whenever TargetAnalyzer's output changes, so cached analyses from
+# older versions stop matching.
+ANALYZER_VERSION = 3
 
 
 @dataclass
@@ -30,6 +58,8 @@ class FunctionAnalysis:
     lineno: int
     parameters: List[str]
     returns_value: bool
+    is_async: bool = False
+    qualname: str = ""  # e.g. "Parser.parse"; same as name at module level
     calls_made: List[str] = field(default_factory=list)
     globals_accessed: List[str] = field(default_factory=list)
     potential_side_effects: List[str] = field(default_factory=list)
@@ -51,6 +81,8 @@ class TargetAnalysis:
     imports: List[str] = field(default_factory=list)
     seams: List[SeamAnalysis] = field(default_factory=list)
     warnings: List[str] = field(default_factory=list)
+    # Local name -> what it was imported as ("np" -> "numpy", "f" -> ".mod.f")
+    import_aliases: Dict[str, str] = field(default_factory=dict)
 
 
 class TargetAnalyzer(ast.NodeVisitor):
@@ -86,6 +118,7 @@ class TargetAnalyzer(ast.NodeVisitor):
     def __init__(self):
         self.analysis = TargetAnalysis(file_path="")
         self.current_function = None
+        self._scope: List[str] = []
         self._all_imports: Set[str] = set()
 
     def analyze_file(self, file_path: str) -> TargetAnalysis:
@@ -102,6 +135,12 @@ class TargetAnalyzer(ast.NodeVisitor):
             self.analysis.warnings.append(f"Error reading file: {e}")
             return self.analysis
 
+        return self.analyze_source(source, file_path)
+
+    def analyze_source(self, source: Union[str, bytes], file_path: str) -> TargetAnalysis:
+        """Analyze already-read source (bytes honour PEP 263 coding cookies)."""
+        self.analysis.file_path = file_path
+
         try:
             tree = ast.parse(source)
             self.visit(tree)
@@ -118,17 +157,29 @@ class TargetAnalyzer(ast.NodeVisitor):
         for alias in node.names:
             self.analysis.imports.append(alias.name)
             self._all_imports.add(alias.name.split('.')[0])
+            if alias.asname:
+                self.analysis.import_aliases[alias.asname] = alias.name
+            else:
+                base = alias.name.split('.')[0]
+                self.analysis.import_aliases[base] = base
         self.generic_visit(node)
 
     def visit_ImportFrom(self, node):
         if node.module:
             self.analysis.imports.append(node.module)
             self._all_imports.add(node.module.split('.')[0])
+        # Relative imports keep their leading dots; the call graph resolves them
+        source = '.' * node.level + (f"{node.module}." if node.module else '')
+        for alias in node.names:
+            if alias.name != '*':
+                self.analysis.import_aliases[alias.asname or alias.name] = source + alias.name
         self.generic_visit(node)
 
     def visit_ClassDef(self, node):
         self.analysis.classes.append(node.name)
+        self._scope.append(node.name)
         self.generic_visit(node)
+        self._scope.pop()
 
     def visit_FunctionDef(self, node):
         func = FunctionAnalysis(
@@ -136,12 +187,18 @@ class TargetAnalyzer(ast.NodeVisitor):
             lineno=node.lineno,
             parameters=[arg.arg for arg in node.args.args],
             returns_value=self._has_return(node),
+            is_async=isinstance(node, ast.AsyncFunctionDef),
+            qualname='.'.join(self._scope + [node.name]),
         )
 
-        # Analyze function body
+        # Analyze function body (restoring the enclosing function, so calls
+        # after a nested def are still attributed to it)
+        enclosing = self.current_function
         self.current_function = func
+        self._scope.append(node.name)
         self.generic_visit(node)
-        self.current_function = None
+        self._scope.pop()
+        self.current_function = enclosing
 
         self.analysis.functions.append(func)
 
@@ -276,21 +333,573 @@ def format_text_report(analysis: TargetAnalysis) -> str:
     return '\n'.join(lines)
 
 
+def analysis_from_dict(data: dict) -> TargetAnalysis:
+    """Rebuild a TargetAnalysis from its asdict() form."""
+    return TargetAnalysis(
+        file_path=data['file_path'],
+        functions=[FunctionAnalysis(**f) for f in data['functions']],
+        classes=list(data['classes']),
+        imports=list(data['imports']),
+        seams=[SeamAnalysis(**s) for s in data['seams']],
+        warnings=list(data['warnings']),
+        import_aliases=dict(data.get('import_aliases', {})),
+    )
+
+
+class AnalysisCache:
+    """
+    On-disk cache of TargetAnalysis results, one JSON file per key.
+
+    Keys hash the file contents together with ANALYZER_VERSION and the
+    Python version (ast output differs between releases), so a hit is
+    always safe to reuse regardless of path or mtime. Writes are atomic,
+    which lets several worker processes share one directory.
+    """
+
+    def __init__(self, directory: str, max_bytes: int = 256 * 1024 * 1024):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    @staticmethod
+    def key(source: bytes) -> str:
+        digest = hashlib.sha256()
+        digest.update(f"v{ANALYZER_VERSION}:{sys.implementation.name}"
+                      f"{sys.version_info[0]}.{sys.version_info[1]}:".encode())
+        digest.update(source)
+        return digest.hexdigest()
+
+    def get(self, key: str, file_path: str) -> Optional[TargetAnalysis]:
+        entry = self.directory / f"{key}.json"
+        try:
+            with open(entry, 'r') as f:
+                analysis = analysis_from_dict(json.load(f))
+            os.utime(entry)  # mark as recently used for eviction
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+        analysis.file_path = file_path
+        return analysis
+
+    def put(self, key: str, analysis: TargetAnalysis):
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(asdict(analysis), f)
+            os.replace(tmp_path, self.directory / f"{key}.json")
+        except OSError:
+            Path(tmp_path).unlink(missing_ok=True)
+
+    def prune(self):
+        """Evict least recently used entries until under max_bytes."""
+        entries = []
+        for entry in self.directory.glob('*.json'):
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, entry in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            entry.unlink(missing_ok=True)
+            total -= size
+
+
+def analyze_cached(file_path: str, cache: Optional[AnalysisCache] = None) -> TargetAnalysis:
+    """Analyze a file, reusing a cached result when its contents are unchanged."""
+    if cache is None:
+        return TargetAnalyzer().analyze_file(file_path)
+
+    try:
+        with open(file_path, 'rb') as f:
+            source = f.read()
+    except OSError:
+        # Let analyze_file record the same warning it always has
+        return TargetAnalyzer().analyze_file(file_path)
+
+    key = cache.key(source)
+    analysis = cache.get(key, file_path)
+    if analysis is None:
+        analysis = TargetAnalyzer().analyze_source(source, file_path)
+        cache.put(key, analysis)
+    return analysis
+
+
+# Directories never worth analyzing when walking a package
+SKIP_DIRS = {
+    '__pycache__', 'venv', 'env', 'node_modules', 'site-packages',
+    'build', 'dist',
+}
+
+
+def discover_python_files(root: str) -> List[str]:
+    """Find .py files under root, skipping hidden, virtualenv and build dirs."""
+    files = []
+    for path in Path(root).rglob('*.py'):
+        relative_dirs = path.relative_to(root).parts[:-1]
+        if any(part.startswith('.') or part in SKIP_DIRS for part in relative_dirs):
+            continue
+        files.append(str(path))
+    return sorted(files)
+
+
+def analyze_path(file_path: str, cache_dir: Optional[str] = None) -> dict:
+    """Analyze one file with a fresh analyzer (process-pool entry point)."""
+    # Workers never prune; the parent does that once the pass is over
+    cache = AnalysisCache(cache_dir) if cache_dir else None
+    return asdict(analyze_cached(file_path, cache))
+
+
+def analyze_project(
+    files: List[str],
+    workers: Optional[int] = None,
+    cache_dir: Optional[str] = None,
+) -> Iterator[dict]:
+    """
+    Analyze files across a process pool, yielding results in input order.
+
+    Files are handed out in chunks so per-task overhead stays small next to
+    parsing; results stream as soon as each chunk's predecessors are done.
+    """
+    if not files:
+        return
+    workers = min(workers or os.cpu_count() or 1, len(files))
+    chunksize = max(1, len(files) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        yield from executor.map(partial(analyze_path, cache_dir=cache_dir),
+                                files, chunksize=chunksize)
+
+
+def summarize(results: List[dict]) -> dict:
+    """Aggregate per-file analyses into project-wide counts."""
+    seam_types = Counter()
+    imports = Counter()
+    for result in results:
+        seam_types.update(seam['seam_type'] for seam in result['seams'])
+        imports.update(result['imports'])
+
+    return {
+        'files': len(results),
+        'functions': sum(len(r['functions']) for r in results),
+        'classes': sum(len(r['classes']) for r in results),
+        'seams': sum(seam_types.values()),
+        'seam_types': dict(seam_types.most_common()),
+        'top_imports': dict(imports.most_common(20)),
+        'files_with_warnings': [r['file_path'] for r in results if r['warnings']],
+    }
+
+
+@dataclass
+class FunctionRank:
+    id: str  # "module:qualname"
+    module: str
+    qualname: str
+    file_path: str
+    lineno: int
+    fan_in: int = 0  # distinct analyzed callers
+    fan_out: int = 0  # distinct analyzed callees
+    external_calls: int = 0  # distinct calls that resolve outside the analyzed code
+    reaches: int = 0  # functions transitively called from here
+    reached_by: int = 0  # functions that transitively call this one
+    cumtime: Optional[float] = None  # seconds, from a merged profile
+    ncalls: Optional[int] = None
+    callers: List[str] = field(default_factory=list)
+    callees: List[str] = field(default_factory=list)
+
+
+@lru_cache(maxsize=None)
+def package_prefix(directory: str) -> Tuple[str, ...]:
+    """Names of the packages enclosing directory, outermost first ("" if none)."""
+    prefix = []
+    current = Path(directory).resolve()
+    while current.name and (current / '__init__.py').is_file():
+        prefix.insert(0, current.name)
+        current = current.parent
+    return tuple(prefix)
+
+
+def module_name_for(file_path: str, root: Optional[str] = None) -> Tuple[str, bool]:
+    """
+    Dotted module name of file_path, and whether it is a package.
+
+    Names are relative to root (the file's directory without one), prefixed
+    with the packages root itself sits in, so a root holding __init__.py
+    yields "pkg.mod" rather than "mod".
+    """
+    path = Path(file_path)
+    parts = list(path.relative_to(root).with_suffix('').parts) if root else [path.stem]
+    parts[:0] = package_prefix(root if root else str(path.parent))
+    is_package = parts[-1] == '__init__'
+    if is_package and len(parts) > 1:
+        parts.pop()
+    return '.'.join(parts), is_package
+
+
+class CallGraph:
+    """
+    Call graph over analyzed modules, built from FunctionAnalysis.calls_made.
+
+    Calls are resolved statically: local functions, self./cls. methods of
+    the enclosing class, constructors (to __init__) and names bound by
+    imports, following relative imports and package re-exports. Anything
+    else (builtins, third-party code, dynamic dispatch) counts as external.
+    """
+
+    def __init__(self, analyses: List[TargetAnalysis], root: Optional[str] = None):
+        self.nodes: Dict[str, FunctionRank] = {}
+        self.edges: Dict[str, Set[str]] = {}
+        self._modules: Dict[str, dict] = {}
+        self._external: Dict[str, Set[str]] = {}
+
+        for analysis in analyses:
+            module, is_package = module_name_for(analysis.file_path, root)
+            functions = {}
+            for func in analysis.functions:
+                qualname = func.qualname or func.name
+                node_id = f"{module}:{qualname}"
+                if node_id in self.nodes:  # redefinition, e.g. a property setter
+                    node_id = f"{node_id}@{func.lineno}"
+                functions.setdefault(qualname, node_id)
+                self.nodes[node_id] = FunctionRank(
+                    id=node_id, module=module, qualname=qualname,
+                    file_path=analysis.file_path, lineno=func.lineno,
+                )
+            self._modules[module] = {
+                'analysis': analysis,
+                'functions': functions,
+                'classes': set(analysis.classes),
+                'package': module if is_package else module.rpartition('.')[0],
+            }
+
+        # Scripts often import siblings by bare name ("from helpers import f")
+        # because their directory is on sys.path, not the package root
+        self._by_suffix: Dict[str, Optional[str]] = {}
+        for module in self._modules:
+            parts = module.split('.')
+            for i in range(1, len(parts)):
+                suffix = '.'.join(parts[i:])
+                self._by_suffix[suffix] = None if suffix in self._by_suffix else module
+
+        for module, info in self._modules.items():
+            for func in info['analysis'].functions:
+                qualname = func.qualname or func.name
+                caller = info['functions'][qualname]
+                for call_name in set(func.calls_made):
+                    callee = self._resolve_call(module, qualname, call_name)
+                    if callee:
+                        self.edges.setdefault(caller, set()).add(callee)
+                    else:
+                        self._external.setdefault(caller, set()).add(call_name)
+
+        self._rank()
+
+    def _absolute(self, module: str, target: str) -> str:
+        """Turn a relative import target (".mod.f") into an absolute one."""
+        level = len(target) - len(target.lstrip('.'))
+        if not level:
+            return target
+        package = self._modules[module]['package'].split('.')
+        base = package[:len(package) - (level - 1)] if level > 1 else package
+        return '.'.join(base + [target[level:]]).strip('.')
+
+    def _resolve_dotted(self, target: str, depth: int = 0) -> Optional[str]:
+        """Resolve "pkg.mod.Class.method" to a node, longest module prefix first."""
+        parts = target.split('.')
+        for i in range(len(parts) - 1, 0, -1):
+            module = '.'.join(parts[:i])
+            if module not in self._modules:
+                module = self._by_suffix.get(module)
+            if module:
+                return self._resolve_in(module, '.'.join(parts[i:]), depth)
+        return None
+
+    def _resolve_in(self, module: str, name: str, depth: int = 0) -> Optional[str]:
+        """Resolve a (possibly dotted) name as seen from module's namespace."""
+        info = self._modules[module]
+        if name in info['functions']:
+            return info['functions'][name]
+        if name in info['classes']:
+            return info['functions'].get(f"{name}.__init__")
+        head, _, rest = name.partition('.')
+        aliases = info['analysis'].import_aliases
+        if head in aliases and depth < 8:
+            target = self._absolute(module, aliases[head])
+            return self._resolve_dotted(f"{target}.{rest}" if rest else target, depth + 1)
+        return None
+
+    def _resolve_call(self, module: str, caller: str, call_name: str) -> Optional[str]:
+        head, _, rest = call_name.partition('.')
+        functions = self._modules[module]['functions']
+        if head in ('self', 'cls') and rest and '.' in caller:
+            owner = caller.rpartition('.')[0]
+            return functions.get(f"{owner}.{rest}")
+
+        # Enclosing function scopes first, innermost out (class bodies do
+        # not enclose their methods, so they are skipped)
+        scope = caller
+        while scope:
+            if scope in functions:
+                local = functions.get(f"{scope}.{call_name}")
+                if local is None and not rest and head in self._modules[module]['classes']:
+                    local = functions.get(f"{scope}.{head}.__init__")
+                if local:
+                    return local
+            scope = scope.rpartition('.')[0]
+        return self._resolve_in(module, call_name)
+
+    def _rank(self):
+        callers: Dict[str, Set[str]] = {}
+        for caller, callees in self.edges.items():
+            for callee in callees:
+                callers.setdefault(callee, set()).add(caller)
+
+        reaches = self._reach_counts(self.edges)
+        reached_by = self._reach_counts(callers)
+        for node_id, node in self.nodes.items():
+            node.callees = sorted(self.edges.get(node_id, ()))
+            node.callers = sorted(callers.get(node_id, ()))
+            node.fan_out = len(node.callees)
+            node.fan_in = len(node.callers)
+            node.external_calls = len(self._external.get(node_id, ()))
+            node.reaches = reaches[node_id]
+            node.reached_by = reached_by[node_id]
+
+    def _reach_counts(self, edges: Dict[str, Set[str]]) -> Dict[str, int]:
+        """
+        Number of other nodes reachable from each node.
+
+        Collapses strongly connected components (Tarjan, iterative) and
+        propagates reachability as int bitsets in reverse topological order,
+        so large graphs stay near-linear instead of one search per node.
+        """
+        ids = list(self.nodes)
+        index_of = {node_id: i for i, node_id in enumerate(ids)}
+        successors = [[index_of[c] for c in edges.get(node_id, ())] for node_id in ids]
+
+        index = [-1] * len(ids)
+        lowlink = [0] * len(ids)
+        on_stack = [False] * len(ids)
+        component = [-1] * len(ids)
+        components: List[List[int]] = []
+        stack: List[int] = []
+        counter = 0
+
+        for start in range(len(ids)):
+            if index[start] != -1:
+                continue
+            work = [(start, 0)]
+            while work:
+                v, i = work.pop()
+                if i == 0:
+                    index[v] = lowlink[v] = counter
+                    counter += 1
+                    stack.append(v)
+                    on_stack[v] = True
+                for j in range(i, len(successors[v])):
+                    w = successors[v][j]
+                    if index[w] == -1:
+                        work.append((v, j + 1))
+                        work.append((w, 0))
+                        break
+                    if on_stack[w]:
+                        lowlink[v] = min(lowlink[v], index[w])
+                else:
+                    if lowlink[v] == index[v]:
+                        members = []
+                        while True:
+                            w = stack.pop()
+                            on_stack[w] = False
+                            component[w] = len(components)
+                            members.append(w)
+                            if w == v:
+                                break
+                        components.append(members)
+                    if work:
+                        parent = work[-1][0]
+                        lowlink[parent] = min(lowlink[parent], lowlink[v])
+
+        # Tarjan emits components in reverse topological order: successors first
+        reach = [0] * len(components)
+        for c, members in enumerate(components):
+            bits = 0
+            for v in members:
+                bits |= 1 << v
+                for w in successors[v]:
+                    if component[w] != c:
+                        bits |= reach[component[w]]
+            reach[c] = bits
+
+        return {
+            node_id: bin(reach[component[v]]).count('1') - 1
+            for v, node_id in enumerate(ids)
+        }
+
+    def merge_profile(self, profile_path: str) -> int:
+        """
+        Attach cumulative time and call counts from a cProfile/pstats file.
+
+        Profile entries are matched by file and function name; when a name
+        occurs more than once in a file, the entry at or just above the def
+        line wins (decorated functions report their first decorator line).
+        Returns the number of functions matched.
+        """
+        import pstats
+
+        by_name: Dict[Tuple[str, str], List[tuple]] = {}
+        for (filename, lineno, funcname), stat in pstats.Stats(profile_path).stats.items():
+            by_name.setdefault((os.path.realpath(filename), funcname), []).append((lineno, stat))
+
+        matched = 0
+        for node in self.nodes.values():
+            name = node.qualname.rpartition('.')[2]
+            candidates = by_name.get((os.path.realpath(node.file_path), name))
+            if not candidates:
+                continue
+            at_or_above = [c for c in candidates if c[0] <= node.lineno]
+            _, (_, ncalls, _, cumtime, _) = max(at_or_above or candidates, key=lambda c: c[0])
+            node.ncalls = ncalls
+            node.cumtime = cumtime
+            matched += 1
+        return matched
+
+    def ranked(self) -> List[FunctionRank]:
+        """Hottest first: measured cumulative time, then fan-in, then reach."""
+        return sorted(self.nodes.values(), key=lambda n: (
+            -(n.cumtime or 0.0), -n.fan_in, -n.reached_by, -n.reaches, n.id,
+        ))
+
+    def to_dict(self) -> dict:
+        return {
+            'functions': [asdict(node) for node in self.ranked()],
+            'edges': sorted([caller, callee]
+                            for caller, callees in self.edges.items() for callee in callees),
+        }
+
+
+def format_call_graph_table(graph: CallGraph, top: int = 25) -> str:
+    """Format the ranked functions as a Markdown table."""
+    ranked = graph.ranked()
+    profiled = any(node.cumtime is not None for node in ranked)
+    edge_count = sum(len(callees) for callees in graph.edges.values())
+
+    lines = []
+    lines.append("# Characterization Priority: Call Graph")
+    lines.append("")
+    lines.append(f"Functions: {len(ranked)}  Call edges: {edge_count}")
+    lines.append("")
+    header = "| Rank | Function | Fan-in | Fan-out | Reached by | Reaches |"
+    divider = "|------|----------|--------|---------|------------|---------|"
+    if profiled:
+        header += " Cum time (s) | Calls |"
+        divider += "--------------|-------|"
+    lines.append(header)
+    lines.append(divider)
+    for rank, node in enumerate(ranked[:top] if top else ranked, 1):
+        row = (f"| {rank} | {node.id} (line {node.lineno}) | {node.fan_in} | {node.fan_out}"
+               f" | {node.reached_by} | {node.reaches} |")
+        if profiled:
+            cumtime = f"{node.cumtime:.4f}" if node.cumtime is not None else "-"
+            ncalls = node.ncalls if node.ncalls is not None else "-"
+            row += f" {cumtime} | {ncalls} |"
+        lines.append(row)
+    if top and len(ranked) > top:
+        lines.append("")
+        lines.append(f"  ... {len(ranked) - top} more (use --top 0 to list all)")
+
+    return '\n'.join(lines)
+
+
+def print_call_graph(graph: CallGraph, args):
+    if args.profile:
+        try:
+            matched = graph.merge_profile(args.profile)
+        except Exception as e:
+            print(f"Error: Cannot read profile {args.profile}: {e}", file=sys.stderr)
+            sys.exit(1)
+        print(f"Profile: matched {matched} of {len(graph.nodes)} functions", file=sys.stderr)
+
+    if args.json:
+        print(json.dumps(graph.to_dict(), indent=2))
+    else:
+        print(format_call_graph_table(graph, args.top))
+
+
 def main():
     parser = argparse.ArgumentParser(
         description="Analyze Python file for characterization testing"
     )
-    parser.add_argument("target", help="Path to Python file to analyze")
+    parser.add_argument("target", nargs="?", help="Path to Python file to analyze")
     parser.add_argument("--json", action="store_true", help="Output as JSON")
+    parser.add_argument("--recursive", metavar="DIR",
+                        help="Analyze every .py file under DIR, output as NDJSON")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Worker processes for --recursive (default: CPU count)")
+    parser.add_argument("--cache-dir", metavar="DIR",
+                        help="Reuse analyses of unchanged files stored in DIR")
+    parser.add_argument("--cache-max-mb", type=int, default=256,
+                        help="Evict least recently used cache entries past this size")
+    parser.add_argument("--call-graph", action="store_true",
+                        help="Rank functions by call graph fan-in/fan-out and reach")
+    parser.add_argument("--profile", metavar="PSTATS",
+                        help="cProfile/pstats file to rank by cumulative time (implies --call-graph)")
+    parser.add_argument("--top", type=int, default=25,
+                        help="Rows in the ranked call graph table (0 for all, default: 25)")
 
     args = parser.parse_args()
 
+    if args.profile:
+        args.call_graph = True
+        if not Path(args.profile).is_file():
+            print(f"Error: Profile not found: {args.profile}", file=sys.stderr)
+            sys.exit(1)
+
+    if args.cache_max_mb < 0:
+        parser.error("--cache-max-mb must not be negative")
+
+    cache = None
+    if args.cache_dir:
+        cache = AnalysisCache(args.cache_dir, max_bytes=args.cache_max_mb * 1024 * 1024)
+
+    if args.recursive:
+        if args.target:
+            parser.error("give either a target file or --recursive DIR, not both")
+        if not Path(args.recursive).is_dir():
+            print(f"Error: Directory not found: {args.recursive}", file=sys.stderr)
+            sys.exit(1)
+        if args.workers is not None and args.workers < 1:
+            parser.error("--workers must be at least 1")
+
+        results = []
+        files = discover_python_files(args.recursive)
+        for result in analyze_project(files, args.workers, args.cache_dir):
+            if not args.call_graph:
+                print(json.dumps(result), flush=True)
+            results.append(result)
+        if cache:
+            cache.prune()
+        if args.call_graph:
+            analyses = [analysis_from_dict(result) for result in results]
+            print_call_graph(CallGraph(analyses, root=args.recursive), args)
+        else:
+            print(json.dumps({"summary": summarize(results)}))
+        return
+
+    if not args.target:
+        parser.error("a target file is required unless --recursive is given")
+
     if not Path(args.target).exists():
         print(f"Error: File not found: {args.target}", file=sys.stderr)
         sys.exit(1)
 
-    analyzer = TargetAnalyzer()
-    analysis = analyzer.analyze_file(args.target)
+    analysis = analyze_cached(args.target, cache)
+    if cache:
+        cache.prune()
+
+    if args.call_graph:
+        print_call_graph(CallGraph([analysis]), args)
+        return
 
     if args.json:
         # Convert to JSON-serializable dict
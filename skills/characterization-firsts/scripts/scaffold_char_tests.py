@@ -5,6 +5,8 @@ Used in the CAPTURE phase of characterization-first workflow.
 
 Usage:
     python scaffold_char_tests.py <target_file.py> [--output <test_file.py>]
+    python scaffold_char_tests.py <package_dir> [--output-dir tests/characterization]
+                                  [--workers N] [--force]
 
 Output:
     A pytest test file skeleton with:
@@ -12,14 +14,52 @@ Output:
     - Placeholder tests for each function
     - Mock setup for identified seams
     - Docstrings explaining characterization testing
+
+    Given a directory, every module under it is scaffolded in a process
+    pool into a mirrored tree (test_<stem>_char.py per module, with
+    __init__.py files so same-named modules in different packages do not
+    collide). Test modules (test_*.py, conftest.py) and anything under
+    the output directory are not scaffolded. Each scaffold records its
+    target's source hash and a hash of its own generated content in the
+    header: scaffolds whose source hash still matches are skipped, and a
+    changed target is regenerated only if its scaffold has not been edited
+    since generation. Edited scaffolds (reported as stale) and test files
+    without a recorded hash (kept) are left alone unless --force.
+
+    The target is parsed once with analyze_target.py's TargetAnalyzer, so
+    this script must live next to analyze_target.py.
 """
 
-import ast
+import os
+import re
 import sys
+import hashlib
 import argparse
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 from pathlib import Path
 from datetime import datetime
-from typing import List, Set
+from typing import List, Optional, Set, Tuple, Union
+
+from analyze_target import TargetAnalysis, TargetAnalyzer, discover_python_files
+
+# Imports worth a mock fixture in the generated skeleton
+MOCK_CANDIDATES = {
+    'requests', 'httpx', 'aiohttp', 'urllib',
+    'os', 'pathlib', 'open',
+    'datetime', 'time',
+    'sqlite3', 'psycopg2', 'pymongo', 'redis',
+    'subprocess', 'shutil',
+}
+
+DEFAULT_OUTPUT_DIR = 'tests/characterization'
+
+# Header line recording which source a scaffold was generated from
+SOURCE_HASH_RE = re.compile(r'^Source hash: sha256:([0-9a-f]{64})$', re.MULTILINE)
+
+# Header line recording the hash of the scaffold as generated (excluding this line)
+SCAFFOLD_HASH_RE = re.compile(r'^Scaffold hash: sha256:([0-9a-f]{64})\n', re.MULTILINE)
 
 
 def get_module_path(file_path: str) -> str:
@@ -34,84 +74,72 @@ def get_module_path(file_path: str) -> str:
     return '.'.join(parts)
 
 
-def extract_functions(file_path: str) -> List[dict]:
-    """Extract function definitions from a Python file."""
-    functions = []
+def source_hash(source: bytes) -> str:
+    return hashlib.sha256(source).hexdigest()
 
-    try:
-        with open(file_path, 'r') as f:
-            source = f.read()
-        tree = ast.parse(source)
-    except Exception as e:
-        print(f"Error parsing {file_path}: {e}", file=sys.stderr)
-        return functions
-
-    for node in ast.walk(tree):
-        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
-            # Skip private/dunder methods for initial scaffold
-            if node.name.startswith('__') and node.name.endswith('__'):
-                continue
-
-            functions.append({
-                'name': node.name,
-                'lineno': node.lineno,
-                'params': [arg.arg for arg in node.args.args if arg.arg != 'self'],
-                'is_async': isinstance(node, ast.AsyncFunctionDef),
-                'is_method': any(arg.arg == 'self' for arg in node.args.args),
-            })
 
-    return functions
+def scaffold_hash(content: str) -> str:
+    """Hash of a scaffold's content, ignoring its own Scaffold hash line."""
+    return hashlib.sha256(SCAFFOLD_HASH_RE.sub('', content, count=1).encode()).hexdigest()
 
 
-def extract_classes(file_path: str) -> List[str]:
-    """Extract class names from a Python file."""
-    classes = []
+def scaffold_state(test_path: Path) -> Tuple[Optional[str], bool]:
+    """
+    Read an existing scaffold's header.
 
+    Returns the recorded source hash (None for a hand-written test file)
+    and whether the file is still exactly as generated.
+    """
     try:
-        with open(file_path, 'r') as f:
-            source = f.read()
-        tree = ast.parse(source)
-    except Exception:
-        return classes
+        content = test_path.read_text()
+    except (OSError, UnicodeDecodeError):
+        return None, False
+    header = content[:2048]
+    source_match = SOURCE_HASH_RE.search(header)
+    if not source_match:
+        return None, False
+    scaffold_match = SCAFFOLD_HASH_RE.search(header)
+    pristine = bool(scaffold_match) and scaffold_match.group(1) == scaffold_hash(content)
+    return source_match.group(1), pristine
+
+
+def load_target(file_path: str, source: Optional[Union[str, bytes]] = None) -> TargetAnalysis:
+    """Parse and walk the target once, via the SELECT-phase analyzer."""
+    if source is None:
+        analysis = TargetAnalyzer().analyze_file(file_path)
+    else:
+        analysis = TargetAnalyzer().analyze_source(source, file_path)
+    for warning in analysis.warnings:
+        print(f"Error parsing {file_path}: {warning}", file=sys.stderr)
+    return analysis
 
-    for node in ast.walk(tree):
-        if isinstance(node, ast.ClassDef):
-            classes.append(node.name)
 
-    return classes
+def extract_functions(analysis: TargetAnalysis) -> List[dict]:
+    """Functions to scaffold tests for, in source order."""
+    functions = []
 
+    for func in sorted(analysis.functions, key=lambda f: f.lineno):
+        # Skip private/dunder methods for initial scaffold
+        if func.name.startswith('__') and func.name.endswith('__'):
+            continue
 
-def extract_imports(file_path: str) -> Set[str]:
-    """Extract imports that might need mocking."""
-    mockable = set()
-    mock_candidates = {
-        'requests', 'httpx', 'aiohttp', 'urllib',
-        'os', 'pathlib', 'open',
-        'datetime', 'time',
-        'sqlite3', 'psycopg2', 'pymongo', 'redis',
-        'subprocess', 'shutil',
-    }
+        functions.append({
+            'name': func.name,
+            'lineno': func.lineno,
+            'params': [param for param in func.parameters if param != 'self'],
+            'is_async': func.is_async,
+            'is_method': 'self' in func.parameters,
+        })
 
-    try:
-        with open(file_path, 'r') as f:
-            source = f.read()
-        tree = ast.parse(source)
-    except Exception:
-        return mockable
+    return functions
 
-    for node in ast.walk(tree):
-        if isinstance(node, ast.Import):
-            for alias in node.names:
-                base = alias.name.split('.')[0]
-                if base in mock_candidates:
-                    mockable.add(base)
-        elif isinstance(node, ast.ImportFrom):
-            if node.module:
-                base = node.module.split('.')[0]
-                if base in mock_candidates:
-                    mockable.add(base)
 
-    return mockable
+def extract_imports(analysis: TargetAnalysis) -> Set[str]:
+    """Extract imports that might need mocking."""
+    return {
+        imp.split('.')[0] for imp in analysis.imports
+        if imp.split('.')[0] in MOCK_CANDIDATES
+    }
 
 
 def generate_test_file(
@@ -119,6 +147,7 @@ def generate_test_file(
     functions: List[dict],
     classes: List[str],
     mockable_imports: Set[str],
+    target_hash: Optional[str] = None,
 ) -> str:
     """Generate the test file content."""
     module_path = get_module_path(target_path)
@@ -136,6 +165,8 @@ def generate_test_file(
     lines.append("")
     lines.append(f"Generated: {timestamp}")
     lines.append(f"Target: {target_path}")
+    if target_hash:
+        lines.append(f"Source hash: sha256:{target_hash}")
     lines.append("")
     lines.append("Before modifying target code:")
     lines.append("1. Run these tests - they should all pass")
@@ -287,6 +318,142 @@ def generate_test_file(
     lines.append("        pytest.skip('No known bugs documented yet')")
     lines.append("")
 
+    content = '\n'.join(lines)
+    if target_hash:
+        # Stamped last so later runs can tell whether the scaffold was edited
+        source_line = f"Source hash: sha256:{target_hash}\n"
+        content = content.replace(
+            source_line,
+            f"{source_line}Scaffold hash: sha256:{scaffold_hash(content)}\n",
+            1,
+        )
+    return content
+
+
+def package_output_path(target: Path, root: Path, output_dir: Path) -> Path:
+    """Mirror target's place under root into output_dir."""
+    relative = target.relative_to(root)
+    return output_dir / relative.parent / f"test_{target.stem}_char.py"
+
+
+def ensure_package_dirs(output_path: Path, output_dir: Path):
+    """Create output_path's directories with __init__.py up to output_dir.
+
+    Without them pytest imports every test_<stem>_char.py by basename, and
+    same-named modules from different packages collide.
+    """
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    directory = output_path.parent
+    while True:
+        (directory / '__init__.py').touch(exist_ok=True)
+        if directory == output_dir or output_dir not in directory.parents:
+            break
+        directory = directory.parent
+
+
+def scaffold_module(target: str, root: str, output_dir: str, force: bool = False) -> dict:
+    """
+    Scaffold one module of a package (process-pool entry point).
+
+    Returns a result dict whose status is one of created, updated,
+    unchanged, stale (target changed but the scaffold was edited since
+    generation), kept (hand-written test file), empty or error.
+    """
+    result = {'target': target, 'output': None, 'status': 'error', 'functions': 0}
+    output_path = package_output_path(Path(target), Path(root), Path(output_dir))
+    result['output'] = str(output_path)
+
+    try:
+        with open(target, 'rb') as f:
+            source = f.read()
+    except OSError as e:
+        result['error'] = str(e)
+        return result
+
+    digest = source_hash(source)
+    if output_path.exists() and not force:
+        existing, pristine = scaffold_state(output_path)
+        if existing == digest:
+            result['status'] = 'unchanged'
+            return result
+        if existing is None:
+            result['status'] = 'kept'
+            return result
+        if not pristine:
+            result['status'] = 'stale'
+            return result
+
+    analysis = load_target(target, source)
+    if analysis.warnings:
+        result['error'] = '; '.join(analysis.warnings)
+        return result
+
+    functions = extract_functions(analysis)
+    result['functions'] = len(functions)
+    if not functions and not analysis.classes:
+        result['status'] = 'empty'
+        return result
+
+    test_content = generate_test_file(
+        target,
+        functions,
+        analysis.classes,
+        extract_imports(analysis),
+        digest,
+    )
+    ensure_package_dirs(output_path, Path(output_dir))
+    result['status'] = 'updated' if output_path.exists() else 'created'
+    output_path.write_text(test_content)
+    return result
+
+
+def is_test_module(path: Path) -> bool:
+    return path.name == 'conftest.py' or path.name.startswith('test_')
+
+
+def scaffold_package(
+    root: str,
+    output_dir: str,
+    workers: Optional[int] = None,
+    force: bool = False,
+) -> List[dict]:
+    """Scaffold every module under root across a process pool."""
+    output = Path(output_dir).resolve()
+    targets = [
+        target for target in discover_python_files(root)
+        if not is_test_module(Path(target)) and output not in Path(target).resolve().parents
+    ]
+    if not targets:
+        return []
+    workers = min(workers or os.cpu_count() or 1, len(targets))
+    chunksize = max(1, len(targets) // (workers * 4))
+    scaffold = partial(scaffold_module, root=root, output_dir=output_dir, force=force)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(scaffold, targets, chunksize=chunksize))
+
+
+def format_package_summary(results: List[dict]) -> str:
+    statuses = Counter(r['status'] for r in results)
+    lines = []
+    for r in results:
+        if r['status'] in ('created', 'updated'):
+            lines.append(f"{r['status'].capitalize()}: {r['output']}")
+    for r in results:
+        if r['status'] == 'stale':
+            lines.append(f"Stale: {r['output']} (edited since generation; target changed)")
+    for r in results:
+        if r['status'] == 'error':
+            lines.append(f"Error: {r['target']}: {r.get('error', 'unknown error')}")
+    lines.append("")
+    lines.append(f"Modules: {len(results)}")
+    for status in ('created', 'updated', 'unchanged', 'stale', 'kept', 'empty', 'error'):
+        lines.append(f"  {status.capitalize()}: {statuses.get(status, 0)}")
+    lines.append(f"  Functions scaffolded: "
+                 f"{sum(r['functions'] for r in results if r['status'] in ('created', 'updated'))}")
+    if statuses.get('stale'):
+        lines.append("  (stale: edited scaffolds of changed targets; use --force to overwrite)")
+    if statuses.get('kept'):
+        lines.append("  (kept: existing test files without a source hash; use --force to overwrite)")
     return '\n'.join(lines)
 
 
@@ -294,11 +461,20 @@ def main():
     parser = argparse.ArgumentParser(
         description="Scaffold characterization tests for a Python file"
     )
-    parser.add_argument("target", help="Path to Python file to characterize")
+    parser.add_argument("target", help="Path to Python file (or package directory) to characterize")
     parser.add_argument(
         "--output", "-o",
         help="Output path for test file (default: tests/characterization/test_<name>_char.py)"
     )
+    parser.add_argument(
+        "--output-dir",
+        default=DEFAULT_OUTPUT_DIR,
+        help=f"Root of the mirrored test tree for a package (default: {DEFAULT_OUTPUT_DIR})"
+    )
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Worker processes for a package (default: CPU count)")
+    parser.add_argument("--force", action="store_true",
+                        help="Regenerate up-to-date, edited and hand-written test files in a package")
 
     args = parser.parse_args()
 
@@ -307,14 +483,27 @@ def main():
         print(f"Error: File not found: {args.target}", file=sys.stderr)
         sys.exit(1)
 
+    if target_path.is_dir():
+        if args.output:
+            parser.error("--output applies to a single file; use --output-dir for a package")
+        if args.workers is not None and args.workers < 1:
+            parser.error("--workers must be at least 1")
+        results = scaffold_package(str(target_path), args.output_dir, args.workers, args.force)
+        print(format_package_summary(results))
+        if any(r['status'] == 'error' for r in results):
+            sys.exit(1)
+        return
+
     if not target_path.suffix == '.py':
         print(f"Error: Target must be a Python file: {args.target}", file=sys.stderr)
         sys.exit(1)
 
-    # Extract information from target
-    functions = extract_functions(str(target_path))
-    classes = extract_classes(str(target_path))
-    mockable = extract_imports(str(target_path))
+    # Extract information from target (one parse, one traversal)
+    source = target_path.read_bytes()
+    analysis = load_target(str(target_path), source)
+    functions = extract_functions(analysis)
+    classes = analysis.classes
+    mockable = extract_imports(analysis)
 
     # Generate test file
     test_content = generate_test_file(
@@ -322,13 +511,14 @@ def main():
         functions,
         classes,
         mockable,
+        source_hash(source),
     )
 
     # Determine output path
     if args.output:
         output_path = Path(args.output)
     else:
-        output_path = Path(f"tests/characterization/test_{target_path.stem}_char.py")
+        output_path = Path(f"{DEFAULT_OUTPUT_DIR}/test_{target_path.stem}_char.py")
 
     # Create directory if needed
     output_path.parent.mkdir(parents=True, exist_ok=True)
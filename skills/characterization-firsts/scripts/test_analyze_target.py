@@ -0,0 +1,404 @@
+"""Unit tests for analyze_target.py"""
+
+import json
+import os
+import random
+import subprocess
+import sys
+from dataclasses import asdict
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+import analyze_target  # noqa: E402
+from analyze_target import (  # noqa: E402
+    AnalysisCache,
+    CallGraph,
+    TargetAnalyzer,
+    analyze_cached,
+    analyze_path,
+    analyze_project,
+    discover_python_files,
+    module_name_for,
+    summarize,
+)
+
+_SCRIPT = Path(__file__).parent / "analyze_target.py"
+
+
+def _write(root: Path, relative: str, source: str) -> Path:
+    path = root / relative
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(source)
+    return path
+
+
+@pytest.fixture
+def package(tmp_path):
+    """A small package with modules, a seam, a syntax error and skippable dirs."""
+    root = tmp_path / "pkg"
+    _write(root, "__init__.py", "")
+    _write(root, "core.py", "import os\n\nclass Engine:\n    def run(self):\n        return os.getcwd()\n")
+    _write(root, "sub/util.py", "import requests\n\ndef fetch(url):\n    return requests.get(url)\n")
+    _write(root, "sub/broken.py", "def broken(:\n")
+    _write(root, ".hidden/secret.py", "def hidden():\n    pass\n")
+    _write(root, "venv/lib/site.py", "def vendored():\n    pass\n")
+    _write(root, "__pycache__/core.py", "def cached():\n    pass\n")
+    return root
+
+
+# =============================================================================
+# --recursive
+# =============================================================================
+
+class TestDiscoverPythonFiles:
+    """Tests for discover_python_files."""
+
+    def test_sorted_and_skips_hidden_venv_and_cache_dirs(self, package):
+        files = discover_python_files(str(package))
+        assert [Path(f).relative_to(package).as_posix() for f in files] == [
+            "__init__.py", "core.py", "sub/broken.py", "sub/util.py",
+        ]
+
+    def test_skip_dirs_apply_below_root_only(self, tmp_path):
+        """A root that itself sits under e.g. build/ is still walked."""
+        root = tmp_path / "build" / "pkg"
+        _write(root, "mod.py", "x = 1\n")
+        assert discover_python_files(str(root)) == [str(root / "mod.py")]
+
+
+class TestAnalyzeProject:
+    """Tests for the process-pool analysis."""
+
+    def test_results_follow_input_order(self, package):
+        files = discover_python_files(str(package))
+        results = list(analyze_project(files, workers=2))
+        assert [r["file_path"] for r in results] == files
+        assert results == [analyze_path(f) for f in files]
+
+    def test_no_files_starts_no_pool(self):
+        assert list(analyze_project([], workers=2)) == []
+
+
+class TestSummarize:
+    """Tests for the aggregated summary."""
+
+    def test_counts_across_files(self, package):
+        results = [analyze_path(f) for f in discover_python_files(str(package))]
+        summary = summarize(results)
+        assert summary["files"] == 4
+        assert summary["functions"] == 2
+        assert summary["classes"] == 1
+        assert summary["seam_types"] == {"env_var": 2, "network": 1}
+        assert summary["seams"] == 3
+        assert summary["top_imports"] == {"os": 1, "requests": 1}
+        assert summary["files_with_warnings"] == [str(package / "sub" / "broken.py")]
+
+
+class TestMainRecursive:
+    """Tests for the --recursive command line."""
+
+    def _run(self, *args):
+        return subprocess.run(
+            [sys.executable, str(_SCRIPT), *map(str, args)],
+            capture_output=True, text=True
+        )
+
+    def test_streams_ndjson_then_summary(self, package):
+        result = self._run("--recursive", package, "--workers", "2")
+        assert result.returncode == 0
+        records = [json.loads(line) for line in result.stdout.splitlines()]
+        assert [r["file_path"] for r in records[:-1]] == discover_python_files(str(package))
+        assert list(records[-1]) == ["summary"]
+        assert records[-1]["summary"]["files"] == 4
+
+    def test_rejects_zero_workers(self, package):
+        result = self._run("--recursive", package, "--workers", "0")
+        assert result.returncode == 2
+        assert "--workers must be at least 1" in result.stderr
+
+    def test_rejects_target_with_recursive(self, package):
+        result = self._run(package / "core.py", "--recursive", package)
+        assert result.returncode == 2
+        assert "not both" in result.stderr
+
+    def test_missing_directory_returns_1(self, tmp_path):
+        result = self._run("--recursive", tmp_path / "nope")
+        assert result.returncode == 1
+        assert "Directory not found" in result.stderr
+
+
+# =============================================================================
+# Analysis cache
+# =============================================================================
+
+class TestAnalysisCache:
+    """Tests for the content-addressed AnalysisCache."""
+
+    def test_key_depends_on_source_analyzer_and_python_version(self, monkeypatch):
+        base = AnalysisCache.key(b"x = 1\n")
+        assert base == AnalysisCache.key(b"x = 1\n")
+        assert base != AnalysisCache.key(b"x = 2\n")
+
+        monkeypatch.setattr(analyze_target, "ANALYZER_VERSION", analyze_target.ANALYZER_VERSION + 1)
+        assert AnalysisCache.key(b"x = 1\n") != base
+        monkeypatch.undo()
+
+        monkeypatch.setattr(sys, "version_info", (3, 99, 0))
+        assert AnalysisCache.key(b"x = 1\n") != base
+
+    def test_round_trip_rewrites_file_path(self, tmp_path):
+        """A hit is keyed by content, so it reports the path that was asked for."""
+        source = "import os\n\ndef f(a):\n    return os.getenv(a)\n"
+        first = _write(tmp_path, "a.py", source)
+        copy = _write(tmp_path, "b.py", source)
+        cache = AnalysisCache(tmp_path / "cache")
+
+        fresh = analyze_cached(str(first), cache)
+        with patch.object(TargetAnalyzer, "analyze_source", side_effect=AssertionError("parsed")):
+            cached = analyze_cached(str(copy), cache)
+
+        assert cached.file_path == str(copy)
+        assert asdict(cached) == {**asdict(fresh), "file_path": str(copy)}
+        assert len(list((tmp_path / "cache").glob("*.json"))) == 1
+
+    def test_changed_source_misses(self, tmp_path):
+        path = _write(tmp_path, "mod.py", "def f():\n    pass\n")
+        cache = AnalysisCache(tmp_path / "cache")
+        analyze_cached(str(path), cache)
+        path.write_text("def g():\n    pass\n")
+        assert [f.name for f in analyze_cached(str(path), cache).functions] == ["g"]
+        assert len(list((tmp_path / "cache").glob("*.json"))) == 2
+
+    def test_corrupt_entry_is_a_miss(self, tmp_path):
+        cache = AnalysisCache(tmp_path)
+        (tmp_path / "abc.json").write_text("not json")
+        (tmp_path / "def.json").write_text('{"file_path": "x"}')
+        assert cache.get("abc", "x.py") is None
+        assert cache.get("def", "x.py") is None
+
+    def test_put_is_atomic(self, tmp_path):
+        """A failed write leaves the previous entry intact and no temp file."""
+        path = _write(tmp_path, "mod.py", "def f():\n    pass\n")
+        cache = AnalysisCache(tmp_path / "cache")
+        analysis = analyze_cached(str(path), cache)
+        key = AnalysisCache.key(path.read_bytes())
+        before = (tmp_path / "cache" / f"{key}.json").read_bytes()
+
+        with patch.object(analyze_target.json, "dump", side_effect=OSError("disk full")):
+            cache.put(key, analysis)
+
+        assert (tmp_path / "cache" / f"{key}.json").read_bytes() == before
+        assert list((tmp_path / "cache").glob("*.tmp")) == []
+
+    def test_prune_evicts_least_recently_used(self, tmp_path):
+        """Over budget, the entry read least recently is removed first."""
+        cache = AnalysisCache(tmp_path / "cache")
+        keys = []
+        for name in ("a", "b", "c"):
+            path = _write(tmp_path, f"{name}.py", f"def {name}():\n    pass\n")
+            analyze_cached(str(path), cache)
+            keys.append(AnalysisCache.key(path.read_bytes()))
+        entries = [tmp_path / "cache" / f"{key}.json" for key in keys]
+        for age, entry in enumerate(entries, 1):
+            os.utime(entry, ns=(age, age))
+        assert cache.get(keys[0], "a.py") is not None  # a is now the most recent
+
+        cache.max_bytes = sum(entry.stat().st_size for entry in entries[:2])
+        cache.prune()
+        assert sorted(p.name for p in (tmp_path / "cache").glob("*.json")) == sorted(
+            entry.name for entry in (entries[0], entries[2])
+        )
+
+    def test_missing_file_is_not_cached(self, tmp_path):
+        cache = AnalysisCache(tmp_path / "cache")
+        analysis = analyze_cached(str(tmp_path / "nope.py"), cache)
+        assert analysis.warnings == [f"File not found: {tmp_path / 'nope.py'}"]
+        assert list((tmp_path / "cache").glob("*.json")) == []
+
+    def test_recursive_workers_share_the_cache(self, package, tmp_path):
+        files = discover_python_files(str(package))
+        cache_dir = tmp_path / "cache"
+        first = list(analyze_project(files, workers=2, cache_dir=str(cache_dir)))
+        assert len(list(cache_dir.glob("*.json"))) == len(files)
+        assert list(analyze_project(files, workers=2, cache_dir=str(cache_dir))) == first
+
+    def test_cli_rejects_negative_size(self, package):
+        result = subprocess.run(
+            [sys.executable, str(_SCRIPT), str(package / "core.py"), "--cache-max-mb", "-1"],
+            capture_output=True, text=True
+        )
+        assert result.returncode == 2
+        assert "--cache-max-mb must not be negative" in result.stderr
+
+
+# =============================================================================
+# Call graph
+# =============================================================================
+
+@pytest.fixture
+def graph_package(tmp_path):
+    """A package whose modules call each other through absolute, relative and nested names."""
+    root = tmp_path / "pkg"
+    _write(root, "__init__.py", "from .core import run\n")
+    _write(root, "util.py", "def helper(x):\n    return len(str(x))\n")
+    _write(root, "core.py", (
+        "from pkg.util import helper\n"
+        "from . import util\n"
+        "\n"
+        "def run(x):\n"
+        "    return step(x) + helper(x)\n"
+        "\n"
+        "def step(x):\n"
+        "    def inner(y):\n"
+        "        return util.helper(y)\n"
+        "    return inner(x)\n"
+        "\n"
+        "class Engine:\n"
+        "    def start(self):\n"
+        "        return self.stop()\n"
+        "\n"
+        "    def stop(self):\n"
+        "        return run(1) + run(2)\n"
+    ))
+    _write(root, "scopes.py", (
+        "def inner():\n"
+        "    pass\n"
+        "\n"
+        "def outer():\n"
+        "    def inner():\n"
+        "        pass\n"
+        "    class Local:\n"
+        "        def __init__(self):\n"
+        "            pass\n"
+        "    Local()\n"
+        "    return inner()\n"
+        "\n"
+        "class Box:\n"
+        "    def helper(self):\n"
+        "        pass\n"
+        "\n"
+        "    def use(self):\n"
+        "        return helper()\n"
+    ))
+    return root
+
+
+def _graph(root) -> CallGraph:
+    files = discover_python_files(str(root))
+    return CallGraph([TargetAnalyzer().analyze_file(f) for f in files], root=str(root))
+
+
+class TestModuleNameFor:
+    """Tests for module_name_for."""
+
+    def test_package_root_is_prefixed(self, graph_package):
+        assert module_name_for(str(graph_package / "core.py"), str(graph_package)) == ("pkg.core", False)
+        assert module_name_for(str(graph_package / "__init__.py"), str(graph_package)) == ("pkg", True)
+
+    def test_enclosing_packages_are_prefixed(self, tmp_path):
+        _write(tmp_path, "outer/__init__.py", "")
+        mod = _write(tmp_path, "outer/inner/sub/mod.py", "")
+        _write(tmp_path, "outer/inner/__init__.py", "")
+        root = str(tmp_path / "outer" / "inner")
+        assert module_name_for(str(mod), root) == ("outer.inner.sub.mod", False)
+
+    def test_plain_directory_is_not_prefixed(self, tmp_path):
+        mod = _write(tmp_path, "scripts/tool.py", "")
+        assert module_name_for(str(mod), str(tmp_path / "scripts")) == ("tool", False)
+
+    def test_single_file_in_package(self, graph_package):
+        assert module_name_for(str(graph_package / "util.py")) == ("pkg.util", False)
+
+
+class TestCallGraph:
+    """Tests for CallGraph edge resolution and ranking."""
+
+    def test_resolves_absolute_relative_and_method_calls(self, graph_package):
+        edges = _graph(graph_package).edges
+        assert edges["pkg.core:run"] == {"pkg.core:step", "pkg.util:helper"}
+        assert edges["pkg.core:step"] == {"pkg.core:step.inner"}
+        assert edges["pkg.core:step.inner"] == {"pkg.util:helper"}
+        assert edges["pkg.core:Engine.start"] == {"pkg.core:Engine.stop"}
+        assert edges["pkg.core:Engine.stop"] == {"pkg.core:run"}
+
+    def test_nested_defs_shadow_module_names(self, graph_package):
+        edges = _graph(graph_package).edges
+        assert edges["pkg.scopes:outer"] == {"pkg.scopes:outer.inner", "pkg.scopes:outer.Local.__init__"}
+
+    def test_class_body_does_not_enclose_methods(self, graph_package):
+        graph = _graph(graph_package)
+        assert "pkg.scopes:Box.use" not in graph.edges
+        assert graph.nodes["pkg.scopes:Box.use"].external_calls == 1
+
+    def test_fan_in_fan_out_and_reach(self, graph_package):
+        nodes = _graph(graph_package).nodes
+        helper, run = nodes["pkg.util:helper"], nodes["pkg.core:run"]
+        assert (helper.fan_in, helper.fan_out) == (2, 0)
+        assert helper.callers == ["pkg.core:run", "pkg.core:step.inner"]
+        assert (run.fan_in, run.fan_out) == (1, 2)
+        assert run.reaches == 3  # step, step.inner, helper
+        assert run.reached_by == 2  # Engine.stop, Engine.start
+        assert helper.reached_by == 5
+
+    def test_ranked_by_fan_in_then_reach(self, graph_package):
+        ranked = [node.id for node in _graph(graph_package).ranked()]
+        assert ranked[:4] == [
+            "pkg.util:helper", "pkg.core:step.inner", "pkg.core:step", "pkg.core:run",
+        ]
+
+    def test_merge_profile_from_cprofile_dump(self, graph_package, tmp_path):
+        profile = tmp_path / "prof.out"
+        script = (
+            "import cProfile, sys\n"
+            f"sys.path.insert(0, {str(graph_package.parent)!r})\n"
+            "import pkg.core\n"
+            f"cProfile.run('pkg.core.Engine().start()', {str(profile)!r})\n"
+        )
+        subprocess.run([sys.executable, "-c", script], check=True)
+
+        graph = _graph(graph_package)
+        assert graph.merge_profile(str(profile)) == 6
+        nodes = graph.nodes
+        assert nodes["pkg.core:run"].ncalls == 2
+        assert nodes["pkg.util:helper"].ncalls == 4
+        assert nodes["pkg.scopes:outer"].ncalls is None
+        assert nodes["pkg.core:Engine.start"].cumtime >= nodes["pkg.core:run"].cumtime
+        assert graph.ranked()[0].id == "pkg.core:Engine.start"
+
+    @pytest.mark.parametrize("seed", range(5))
+    def test_reach_counts_match_brute_force(self, seed):
+        """SCC-collapsed bitset reachability equals a search per node, cycles included."""
+        rng = random.Random(seed)
+        graph = CallGraph([])
+        ids = [f"m:f{i}" for i in range(40)]
+        graph.nodes = dict.fromkeys(ids)
+        edges = {}
+        for node_id in ids:
+            targets = set(rng.sample(ids, rng.randint(0, 3)))
+            if targets:
+                edges[node_id] = targets
+        edges.setdefault("m:f0", set()).update({"m:f0", "m:f1"})
+        edges.setdefault("m:f1", set()).add("m:f0")
+
+        def brute_force(start):
+            seen, todo = set(), [start]
+            while todo:
+                for callee in edges.get(todo.pop(), ()):
+                    if callee not in seen:
+                        seen.add(callee)
+                        todo.append(callee)
+            return len(seen - {start})
+
+        assert graph._reach_counts(edges) == {node_id: brute_force(node_id) for node_id in ids}
+
+    def test_cli_json_uses_package_names(self, graph_package):
+        result = subprocess.run(
+            [sys.executable, str(_SCRIPT), "--recursive", str(graph_package), "--call-graph", "--json"],
+            capture_output=True, text=True
+        )
+        assert result.returncode == 0
+        assert ["pkg.core:run", "pkg.util:helper"] in json.loads(result.stdout)["edges"]
@@ -0,0 +1,245 @@
+"""Unit tests for scaffold_char_tests.py"""
+
+import ast
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from scaffold_char_tests import (  # noqa: E402
+    MOCK_CANDIDATES,
+    extract_functions,
+    extract_imports,
+    format_package_summary,
+    load_target,
+    scaffold_package,
+    scaffold_state,
+)
+
+_SCRIPT = Path(__file__).parent / "scaffold_char_tests.py"
+
+
+def _write(root: Path, relative: str, source: str) -> Path:
+    path = root / relative
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(source)
+    return path
+
+
+# =============================================================================
+# Single-pass extraction
+# =============================================================================
+
+def _three_pass(file_path: str):
+    """The functions, classes and imports the former per-item ast walks found."""
+    tree = ast.parse(Path(file_path).read_text())
+    functions, classes, mockable = [], [], set()
+    for node in ast.walk(tree):
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            if node.name.startswith('__') and node.name.endswith('__'):
+                continue
+            functions.append({
+                'name': node.name,
+                'lineno': node.lineno,
+                'params': [arg.arg for arg in node.args.args if arg.arg != 'self'],
+                'is_async': isinstance(node, ast.AsyncFunctionDef),
+                'is_method': any(arg.arg == 'self' for arg in node.args.args),
+            })
+        elif isinstance(node, ast.ClassDef):
+            classes.append(node.name)
+        elif isinstance(node, ast.Import):
+            for alias in node.names:
+                if alias.name.split('.')[0] in MOCK_CANDIDATES:
+                    mockable.add(alias.name.split('.')[0])
+        elif isinstance(node, ast.ImportFrom) and node.module:
+            if node.module.split('.')[0] in MOCK_CANDIDATES:
+                mockable.add(node.module.split('.')[0])
+    return functions, classes, mockable
+
+
+TARGET = '''\
+import os
+import os.path
+import json
+from datetime import datetime
+from urllib.parse import urlparse
+from . import sibling
+
+
+class Client:
+    def __init__(self, base):
+        self.base = base
+
+    def get(self, path, *, timeout=5):
+        return urlparse(self.base + path)
+
+    async def fetch(self, path):
+        def inner(value):
+            return value
+        return inner(path)
+
+    class Config:
+        def load(self, name):
+            return os.getenv(name)
+
+
+def helper(a, b, /, c=1, *args, **kwargs):
+    return datetime.now()
+
+
+async def main():
+    import subprocess
+    return subprocess.run(["true"])
+'''
+
+
+class TestSinglePassExtraction:
+    """extract_* over one TargetAnalysis match the former three-pass output."""
+
+    @pytest.mark.parametrize("source", [TARGET, "x = 1\n", "def only():\n    pass\n"])
+    def test_matches_three_pass_output(self, tmp_path, source):
+        path = _write(tmp_path, "target.py", source)
+        functions, classes, mockable = _three_pass(str(path))
+        analysis = load_target(str(path))
+
+        def by_position(items):
+            return sorted(items, key=lambda f: (f['lineno'], f['name']))
+
+        assert extract_functions(analysis) == by_position(functions)
+        assert sorted(analysis.classes) == sorted(classes)
+        assert extract_imports(analysis) == mockable
+
+    def test_functions_follow_source_order(self, tmp_path):
+        path = _write(tmp_path, "target.py", TARGET)
+        names = [f['name'] for f in extract_functions(load_target(str(path)))]
+        assert names == ['get', 'fetch', 'inner', 'load', 'helper', 'main']
+
+    def test_syntax_error_yields_nothing(self, tmp_path, capsys):
+        path = _write(tmp_path, "broken.py", "def broken(:\n")
+        analysis = load_target(str(path))
+        assert extract_functions(analysis) == []
+        assert extract_imports(analysis) == set()
+        assert "Error parsing" in capsys.readouterr().err
+
+
+# =============================================================================
+# Package mode
+# =============================================================================
+
+@pytest.fixture
+def project(tmp_path):
+    """A package with two same-named modules, a test module and a conftest."""
+    root = tmp_path / "src" / "app"
+    _write(root, "__init__.py", "")
+    _write(root, "core.py", "def run(job):\n    return job\n")
+    _write(root, "api/utils.py", "def parse(raw):\n    return raw\n")
+    _write(root, "db/utils.py", "def connect(url):\n    return url\n")
+    _write(root, "test_core.py", "def test_run():\n    pass\n")
+    _write(root, "conftest.py", "def fixture():\n    pass\n")
+    return root
+
+
+class TestScaffoldPackage:
+    """Tests for scaffolding a package into a mirrored test tree."""
+
+    def _scaffold(self, project, output, force=False):
+        results = scaffold_package(str(project), str(output), workers=2, force=force)
+        return {Path(r['target']).relative_to(project).as_posix(): r['status'] for r in results}
+
+    def test_mirrors_package_and_skips_test_modules(self, project, tmp_path):
+        output = tmp_path / "tests"
+        assert self._scaffold(project, output) == {
+            "__init__.py": "empty",
+            "api/utils.py": "created",
+            "core.py": "created",
+            "db/utils.py": "created",
+        }
+        assert sorted(p.relative_to(output).as_posix() for p in output.rglob("*.py")) == [
+            "__init__.py",
+            "api/__init__.py", "api/test_utils_char.py",
+            "db/__init__.py", "db/test_utils_char.py",
+            "test_core_char.py",
+        ]
+
+    def test_same_named_modules_get_separate_scaffolds(self, project, tmp_path):
+        output = tmp_path / "tests"
+        self._scaffold(project, output)
+        assert "def test_parse_basic" in (output / "api" / "test_utils_char.py").read_text()
+        assert "def test_connect_basic" in (output / "db" / "test_utils_char.py").read_text()
+
+    def test_unchanged_targets_are_skipped(self, project, tmp_path):
+        output = tmp_path / "tests"
+        self._scaffold(project, output)
+        before = (output / "test_core_char.py").stat().st_mtime_ns
+        assert self._scaffold(project, output)["core.py"] == "unchanged"
+        assert (output / "test_core_char.py").stat().st_mtime_ns == before
+
+    def test_untouched_scaffold_of_changed_target_is_updated(self, project, tmp_path):
+        output = tmp_path / "tests"
+        self._scaffold(project, output)
+        (project / "core.py").write_text("def run(job):\n    return job\n\ndef stop():\n    pass\n")
+        assert self._scaffold(project, output)["core.py"] == "updated"
+        assert "def test_stop_basic" in (output / "test_core_char.py").read_text()
+
+    def test_edited_scaffold_of_changed_target_is_stale(self, project, tmp_path):
+        """Hand-filled assertions survive a regeneration."""
+        output = tmp_path / "tests"
+        self._scaffold(project, output)
+        scaffold = output / "test_core_char.py"
+        edited = scaffold.read_text().replace(
+            "pytest.skip('TODO: Implement characterization')", "assert run(1) == 1", 1
+        )
+        scaffold.write_text(edited)
+        (project / "core.py").write_text("def run(job):\n    return job * 2\n")
+
+        assert self._scaffold(project, output)["core.py"] == "stale"
+        assert scaffold.read_text() == edited
+        assert self._scaffold(project, output, force=True)["core.py"] == "updated"
+        assert "assert run(1) == 1" not in scaffold.read_text()
+
+    def test_hand_written_test_file_is_kept(self, project, tmp_path):
+        output = tmp_path / "tests"
+        _write(output, "test_core_char.py", "def test_mine():\n    pass\n")
+        assert self._scaffold(project, output)["core.py"] == "kept"
+        assert (output / "test_core_char.py").read_text() == "def test_mine():\n    pass\n"
+
+    def test_output_dir_inside_package_is_not_scaffolded(self, project):
+        output = project / "tests"
+        self._scaffold(project, output)
+        assert set(self._scaffold(project, output)) == {
+            "__init__.py", "api/utils.py", "core.py", "db/utils.py",
+        }
+        assert not list(output.rglob("test_test_*"))
+
+    def test_scaffold_records_source_and_scaffold_hashes(self, project, tmp_path):
+        output = tmp_path / "tests"
+        self._scaffold(project, output)
+        scaffold = output / "test_core_char.py"
+        recorded, pristine = scaffold_state(scaffold)
+        assert recorded is not None and pristine
+        scaffold.write_text(scaffold.read_text() + "# note\n")
+        assert scaffold_state(scaffold) == (recorded, False)
+
+    def test_summary_reports_stale_files(self):
+        summary = format_package_summary([
+            {'target': 'a.py', 'output': 'tests/test_a_char.py', 'status': 'stale', 'functions': 0},
+        ])
+        assert "Stale: tests/test_a_char.py" in summary
+        assert "  Stale: 1" in summary
+
+
+class TestMainPackage:
+    """Tests for the package command line."""
+
+    def test_scaffolds_package(self, project, tmp_path):
+        output = tmp_path / "tests"
+        result = subprocess.run(
+            [sys.executable, str(_SCRIPT), str(project), "--output-dir", str(output), "--workers", "2"],
+            capture_output=True, text=True
+        )
+        assert result.returncode == 0
+        assert "Modules: 4" in result.stdout
+        assert "  Created: 3" in result.stdout
@@ -6,3 +6,8 @@ def pytest_configure(config):
         "markers",
         "costly: tests that call paid APIs (OpenAI, etc.) — run with: pytest -m costly",
     )
+    config.addinivalue_line(
+        "markers",
+        "benchmark: throughput tests on large synthetic inputs — run with: "
+        "RUN_BENCHMARKS=1 pytest -m benchmark",
+    )
@@ -16,19 +16,86 @@ Usage:
         --ux-flows .charter/UX-FLOWS.md \
         --output .charter/design-os-export/manifest.json
 
+    # Batch mode: every project root (or glob) in one process
+    python3 generate-section-manifest.py \
+        --projects ~/work/*/ --summary manifest-report.json
+
+Matching backends (--matcher):
+    hybrid  (default) UX elements that lexically match exactly one section
+            (character-trigram TF-IDF over section names and READMEs) are
+            assigned locally; only the ambiguous rows go to the LLM, and no
+            request is made when none remain.
+    openai  Every row goes to the LLM.
+    local   Fully offline and deterministic: each row goes to its best
+            lexical + README keyword match. Needs no OPENAI_API_KEY.
+
+Large traceability matrices are split into shards of rows
+(--rows-per-shard) that are matched concurrently (--concurrency) and
+merged, so no single JSON answer outgrows the token limit.
+
+Re-runs are incremental: the manifest records a hash of every section's
+README and each traceability row's sections, and the next run against the
+same --output re-matches only new rows and rows tied to changed sections.
+Pass --full to re-match everything.
+
+Each request is planned before it is sent: input and output tokens are
+estimated locally (with tiktoken when installed, otherwise ~4 characters
+per token) and logged, README excerpts are trimmed in proportion to their
+size when the prompt would exceed --prompt-token-budget, and a request
+that cannot fit the model's context window fails immediately.
+
+Batch mode (--projects) handles many project roots in one process, with
+--export-dir, --ux-flows and --output taken relative to each root
+(defaulting to the .charter/ layout). Projects run concurrently
+(--project-concurrency) over one HTTP client. --concurrency caps the LLM
+requests in flight across all of them. Identical prompts from different
+projects are sent once. A JSON summary lists each project's status.
+
+With --batch-api the LLM requests of the whole run (all projects in batch
+mode) are first collected, written as one JSONL file and submitted to the
+OpenAI Batch API; the script polls until the batch completes (or resumes
+one with --resume-batch) and then assembles the manifests from its
+results. Meant for nightly regeneration where cost matters more than
+latency.
+
+Requests run on asyncio. Each attempt is bounded by --request-timeout,
+failures back off exponentially with full jitter (or as long as a
+Retry-After header asks), and with --hedge-percentile a duplicate request
+is sent once the first outlives that percentile of recent latencies; the
+faster answer wins.
+
+LLM responses are cached on disk, keyed by a hash of the model, system
+prompt, user prompt and temperature, so re-running on unchanged inputs
+makes no API call. Pass --no-cache to always call the model.
+
 Environment:
-    OPENAI_API_KEY: Required. OpenAI API key for GPT-4.1-mini calls.
+    OPENAI_API_KEY: OpenAI API key for GPT-4.1-mini calls. Required unless
+        --matcher local, which also runs without the openai package installed.
+    XDG_CACHE_HOME: Base of the default response cache directory
+        (claude-forge/section-manifest under it, or ~/.cache).
 """
 
 import argparse
+import asyncio
+import copy
+import glob
+import hashlib
+import inspect
 import json
 import logging
+import math
 import os
+import random
 import re
 import sys
+import threading
 import time
+from abc import ABC, abstractmethod
+from collections import Counter, deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from email.utils import parsedate_to_datetime
 from pathlib import Path
-from typing import TypedDict
+from typing import Any, Awaitable, Callable, Iterable, Iterator, TypedDict
 
 # Load .env.local file if present (Next.js convention for local secrets)
 try:
@@ -38,15 +105,64 @@ try:
 except ImportError:
     pass  # dotenv not installed, rely on environment variables
 
-from openai import OpenAI, APIError, RateLimitError
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None  # Token counts fall back to estimate_tokens()
+
+try:
+    from openai import OpenAI, APIError, RateLimitError
+except ImportError:
+    OpenAI = None  # Only --matcher local works without the SDK
+
+    class APIError(Exception):
+        """Stand-in so retry handlers still compile without the openai package."""
+
+    class RateLimitError(APIError):
+        """Stand-in so retry handlers still compile without the openai package."""
 
 # -----------------------------------------------------------------------------
 # Configuration
 # -----------------------------------------------------------------------------
 
 MODEL = "gpt-4.1-mini"
+TEMPERATURE = 0.0  # Deterministic output
+MAX_TOKENS = 2048
+CONTEXT_WINDOW_TOKENS = 1_047_576  # GPT-4.1-mini input + output limit
+PROMPT_TOKEN_BUDGET = 24_000  # Input tokens per request; README excerpts shrink to fit
+OUTPUT_TOKENS_PER_ROW = 4  # One quoted "US-XXX" entry in the JSON answer
 MAX_RETRIES = 3
-RETRY_DELAY_SECONDS = 2
+RETRY_DELAY_SECONDS = 2  # Base of the exponential backoff
+RETRY_MAX_DELAY_SECONDS = 30  # Backoff ceiling (a server's Retry-After may exceed it)
+REQUEST_TIMEOUT_SECONDS = 60  # Per attempt, hedged duplicates included
+HEDGE_MIN_SAMPLES = 5  # Latencies observed before hedging starts
+LATENCY_WINDOW = 100  # Recent latencies the hedging percentile is taken over
+CACHE_MAX_BYTES = 16 * 1024 * 1024  # Least recently used responses are evicted beyond this
+README_MAX_LINES = 50  # Lines of each section README shown to the matcher
+README_MAX_CHARS = 256 * 1024  # Hard cap per README, whatever its line lengths
+README_LOAD_WORKERS = 16  # Concurrent README reads (helps on network filesystems)
+CHARS_PER_TOKEN = 4  # Heuristic for English/markdown with GPT tokenizers
+ROWS_PER_SHARD = 40  # Keeps each JSON answer well under MAX_TOKENS
+MAX_CONCURRENT_REQUESTS = 4
+MAX_CONCURRENT_PROJECTS = 4  # Batch mode: projects processed at once
+
+# OpenAI Batch API (--batch-api)
+BATCH_ENDPOINT = "/v1/chat/completions"
+BATCH_COMPLETION_WINDOW = "24h"
+BATCH_POLL_SECONDS = 60
+BATCH_FAILED_STATUSES = {"failed", "expired", "cancelling", "cancelled"}
+
+# Batch mode: where each project root keeps its inputs and manifest
+DEFAULT_EXPORT_DIR = Path(".charter/design-os-export")
+DEFAULT_UX_FLOWS = Path(".charter/UX-FLOWS.md")
+DEFAULT_OUTPUT = DEFAULT_EXPORT_DIR / "manifest.json"
+
+# Lexical pre-matching: a row is assigned without the LLM only when its best
+# section scores at least PREMATCH_MIN_SCORE (cosine similarity) and beats
+# the runner-up by PREMATCH_MIN_MARGIN
+PREMATCH_MIN_SCORE = 0.25
+PREMATCH_MIN_MARGIN = 0.15
+SECTION_NAME_WEIGHT = 3  # Directory names count this many times over README text
 
 logging.basicConfig(
     level=logging.INFO,
@@ -68,73 +184,92 @@ class TraceabilityRow(TypedDict):
 class SectionManifest(TypedDict):
     """Maps section directory names to their associated US-XXX story IDs."""
     sections: dict[str, list[str]]  # {"landing-and-hero": ["US-001", "US-002"], ...}
-    metadata: dict[str, str]
+    stories: dict[str, list[str]]  # Inverse of sections: {"US-001": ["landing-and-hero"], ...}
+    metadata: dict[str, Any]  # String fields, plus the hash maps used for incremental runs
+
+
+class PromptPlan(TypedDict):
+    """A matching request sized before it is sent."""
+    section_readmes: dict[str, str]  # Excerpts, trimmed to fit the budget
+    input_tokens: int  # System + user prompt
+    output_tokens: int  # Expected JSON answer
+    readmes_trimmed: int
 
 
 # -----------------------------------------------------------------------------
 # Traceability Parser
 # -----------------------------------------------------------------------------
 
-def parse_traceability_matrix(ux_flows_path: Path) -> list[TraceabilityRow]:
-    """
-    Parse UX-FLOWS.md Section 11 to extract UX Element → Story ID mappings.
+_TRACEABILITY_HEADING_RE = re.compile(
+    r"##\s*(?:Section\s*)?11[:\.]?\s*Traceability", re.IGNORECASE
+)
+_STORY_ID_RE = re.compile(r"US-(\d{3})")
 
-    Expected table format:
-    | UX Element | Plan Section | Source ID | Source Description |
-    |------------|--------------|-----------|-------------------|
-    | Hero headline | S1, S3 | SM-001 / US-001 | Description... |
 
-    Returns:
-        List of TraceabilityRow dicts with ux_element and story_id (US-XXX).
+def _is_section_heading(line: str) -> bool:
+    """True for a level-2 heading ("## ..."), which ends the matrix section."""
+    return line.startswith("##") and (len(line) == 2 or line[2].isspace())
+
+
+def iter_traceability_rows(lines: Iterable[str]) -> Iterator[TraceabilityRow]:
     """
-    content = ux_flows_path.read_text(encoding="utf-8")
+    Stream TraceabilityRows from UX-FLOWS.md lines.
 
-    # Find Section 11 (Traceability Matrix)
-    section_match = re.search(
-        r"##\s*(?:Section\s*)?11[:\.]?\s*Traceability.*?\n(.*?)(?=\n##\s|\Z)",
-        content,
-        re.DOTALL | re.IGNORECASE
-    )
+    A small state machine: skip lines until the Section 11 (Traceability)
+    heading, yield rows from its table, and stop at the next "## " heading
+    without reading further. Deeper headings ("### ...") stay inside.
+    """
+    lines = iter(lines)
 
-    if not section_match:
+    # Scanning: the cheap substring checks skip nearly every line before the regex
+    for line in lines:
+        if "11" in line and "##" in line and _TRACEABILITY_HEADING_RE.search(line):
+            break
+    else:
         logger.warning("Could not find Section 11 (Traceability) in UX-FLOWS.md")
-        return []
+        return
 
-    section_content = section_match.group(1)
-    rows: list[TraceabilityRow] = []
+    # In section: parse table rows until the next level-2 heading
+    for line in lines:
+        if _is_section_heading(line):
+            return
 
-    for line in section_content.split("\n"):
+        # Rows without a story ID contribute nothing (this also skips blank
+        # lines and most header rows); then skip separators and non-table lines
+        if "US-" not in line or "---" in line:
+            continue
         line = line.strip()
-
-        # Skip empty lines, header rows, and separator rows
-        if not line or line.startswith("|--") or "---" in line:
+        if not line.startswith("|") or line.startswith("|--"):
             continue
-        if not line.startswith("|"):
+
+        # Parse table cells, dropping the empty strings around the pipes
+        cells = [c for c in map(str.strip, line.split("|")) if c]
+        if len(cells) < 3 or cells[0].lower() == "ux element":
             continue
 
-        # Parse table cells
-        cells = [cell.strip() for cell in line.split("|")]
-        # Remove empty strings from split
-        cells = [c for c in cells if c]
+        # Extract all US-XXX from source ID (may contain multiple, e.g. "SM-007, US-017, US-018")
+        ux_element = cells[0]
+        for us_num in _STORY_ID_RE.findall(cells[2]):
+            yield TraceabilityRow(ux_element=ux_element, story_id=f"US-{us_num}")
 
-        if len(cells) < 3:
-            continue
 
-        # Skip header row
-        if cells[0].lower() == "ux element":
-            continue
+def parse_traceability_matrix(ux_flows_path: Path) -> list[TraceabilityRow]:
+    """
+    Parse UX-FLOWS.md Section 11 to extract UX Element → Story ID mappings.
 
-        ux_element = cells[0]
-        source_id = cells[2] if len(cells) > 2 else ""
+    Expected table format:
+    | UX Element | Plan Section | Source ID | Source Description |
+    |------------|--------------|-----------|-------------------|
+    | Hero headline | S1, S3 | SM-001 / US-001 | Description... |
 
-        # Extract all US-XXX from source ID (may contain multiple, e.g. "SM-007, US-017, US-018")
-        us_matches = re.findall(r"US-(\d{3})", source_id)
-        for us_num in us_matches:
-            story_id = f"US-{us_num}"
-            rows.append(TraceabilityRow(
-                ux_element=ux_element,
-                story_id=story_id
-            ))
+    The file is read line by line and reading stops at the end of the
+    section, so memory does not grow with the size of UX-FLOWS.md.
+
+    Returns:
+        List of TraceabilityRow dicts with ux_element and story_id (US-XXX).
+    """
+    with open(ux_flows_path, encoding="utf-8") as f:
+        rows = list(iter_traceability_rows(f))
 
     logger.info(f"Parsed {len(rows)} traceability rows from UX-FLOWS.md")
     return rows
@@ -154,22 +289,381 @@ def list_export_sections(export_dir: Path) -> list[str]:
     ])
 
 
-def load_section_readmes(export_dir: Path, section_names: list[str]) -> dict[str, str]:
-    """Load README.md content for each section to provide context to the LLM."""
-    readmes: dict[str, str] = {}
+def estimate_tokens(text: str) -> int:
+    """Cheap, tokenizer-free token estimate (about CHARS_PER_TOKEN chars each)."""
+    return -(-len(text) // CHARS_PER_TOKEN)
+
+
+def read_readme_excerpt(
+    readme_path: Path,
+    max_lines: int = README_MAX_LINES,
+    token_budget: int | None = None
+) -> str:
+    """
+    Read the first max_lines lines of a README without loading the rest.
+
+    Same text as read_text().split("\n")[:max_lines] joined back, but
+    streamed: reading stops after the last needed line (or README_MAX_CHARS).
+    With token_budget, lines stop once the estimate would exceed it.
+    """
+    lines: list[str] = []
+    tokens = 0
+    remaining = README_MAX_CHARS
+    with open(readme_path, encoding="utf-8") as f:
+        while len(lines) < max_lines and remaining > 0:
+            line = f.readline(remaining)
+            if not line:
+                break
+            if token_budget is not None:
+                line_tokens = estimate_tokens(line)
+                if tokens + line_tokens > token_budget:
+                    if not lines:
+                        # Not even one line fits — keep what the budget allows
+                        lines.append(line[:token_budget * CHARS_PER_TOKEN])
+                    break
+                tokens += line_tokens
+            lines.append(line)
+            remaining -= len(line)
+
+    text = "".join(lines)
+    # split("\n")[:n] drops the terminator after the last kept line
+    if len(lines) == max_lines and text.endswith("\n"):
+        text = text[:-1]
+    return text
+
+
+def load_section_readmes(
+    export_dir: Path,
+    section_names: list[str],
+    max_lines: int = README_MAX_LINES,
+    token_budget: int | None = None,
+    max_workers: int = README_LOAD_WORKERS
+) -> dict[str, str]:
+    """
+    Load README.md content for each section to provide context to the LLM.
+
+    Each README is read only up to max_lines (and, if given, token_budget
+    estimated tokens), and files are read concurrently. The result keeps
+    section_names order.
+    """
     sections_dir = export_dir / "sections"
 
-    for section in section_names:
+    def load(section: str) -> str:
         readme_path = sections_dir / section / "README.md"
         if readme_path.exists():
-            # Load first 50 lines to keep context manageable
-            content = readme_path.read_text(encoding="utf-8")
-            lines = content.split("\n")[:50]
-            readmes[section] = "\n".join(lines)
+            # First lines only, to keep context manageable
+            return read_readme_excerpt(readme_path, max_lines, token_budget)
+        return f"No README found for {section}"
+
+    if len(section_names) <= 1:
+        return {section: load(section) for section in section_names}
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(section_names)))) as executor:
+        return dict(zip(section_names, executor.map(load, section_names)))
+
+
+# -----------------------------------------------------------------------------
+# Lexical Pre-Matching
+# -----------------------------------------------------------------------------
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+
+def _char_ngrams(text: str, n: int = 3) -> Counter:
+    """Character n-gram counts over the words of text, padded at word edges."""
+    grams: Counter = Counter()
+    for word in _WORD_RE.findall(text.lower()):
+        padded = f" {word} "
+        if len(padded) <= n:
+            grams[padded] += 1
+            continue
+        for i in range(len(padded) - n + 1):
+            grams[padded[i:i + n]] += 1
+    return grams
+
+
+def _word_stems(text: str) -> set[str]:
+    """First four letters of each word of 3+ characters ("filtering" → "filt")."""
+    return {word[:4] for word in _WORD_RE.findall(text.lower()) if len(word) >= 3}
+
+
+class LexicalMatcher:
+    """
+    TF-IDF over character trigrams of each section's name and README.
+
+    Trigrams tolerate plurals and word forms ("filter" vs "filtering"), and
+    IDF discounts text every section shares, so a UX element such as
+    "Hero headline" lands on `landing-and-hero` without any network call.
+    """
+
+    def __init__(self, section_names: list[str], section_readmes: dict[str, str]):
+        self.section_names = list(section_names)
+        self._stems: dict[str, set[str]] = {}
+
+        documents = []
+        for name in self.section_names:
+            name_text = re.sub(r"[-_]", " ", name)
+            readme = section_readmes.get(name, "")
+            grams = Counter({
+                gram: count * SECTION_NAME_WEIGHT
+                for gram, count in _char_ngrams(name_text).items()
+            })
+            grams.update(_char_ngrams(readme))
+            documents.append(grams)
+            self._stems[name] = _word_stems(name_text) | _word_stems(readme)
+
+        document_frequency = Counter(gram for grams in documents for gram in grams)
+        total = len(documents)
+        self._idf = {
+            gram: math.log((1 + total) / (1 + df)) + 1
+            for gram, df in document_frequency.items()
+        }
+        self._vectors = [self._vector(grams) for grams in documents]
+
+    def _vector(self, grams: Counter) -> dict[str, float]:
+        weights = {
+            gram: (1 + math.log(count)) * self._idf[gram]
+            for gram, count in grams.items() if gram in self._idf
+        }
+        norm = math.sqrt(sum(w * w for w in weights.values())) or 1.0
+        return {gram: w / norm for gram, w in weights.items()}
+
+    def rank(self, text: str) -> list[tuple[str, float]]:
+        """Sections ordered by cosine similarity to text, best first (ties by name)."""
+        query = self._vector(_char_ngrams(text))
+        scores = [
+            (name, sum(w * vector.get(gram, 0.0) for gram, w in query.items()))
+            for name, vector in zip(self.section_names, self._vectors)
+        ]
+        return sorted(scores, key=lambda item: (-item[1], item[0]))
+
+    def keyword_score(self, section: str, text: str) -> float:
+        """Fraction of text's word stems that appear in the section's name/README."""
+        stems = _word_stems(text)
+        if not stems:
+            return 0.0
+        return len(stems & self._stems.get(section, set())) / len(stems)
+
+    def shares_word(self, section: str, text: str) -> bool:
+        """Whether text and the section's name/README have a word stem in common.
+
+        Guards against scores built only from incidental trigrams
+        ("Button" and "section" share just "on ").
+        """
+        return self.keyword_score(section, text) > 0.0
+
+
+def prematch_rows(
+    traceability_rows: list[TraceabilityRow],
+    matcher: LexicalMatcher,
+    min_score: float = PREMATCH_MIN_SCORE,
+    min_margin: float = PREMATCH_MIN_MARGIN
+) -> tuple[dict[str, list[str]], list[TraceabilityRow]]:
+    """
+    Assign rows whose best section is an unambiguous lexical match.
+
+    Returns:
+        (section → story IDs for the confident rows, rows left for the LLM)
+    """
+    assigned: dict[str, set[str]] = {}
+    ambiguous: list[TraceabilityRow] = []
+    best_by_element: dict[str, str | None] = {}
+
+    for row in traceability_rows:
+        element = row["ux_element"]
+        if element not in best_by_element:
+            ranked = matcher.rank(element)
+            best = None
+            if ranked:
+                top_name, top_score = ranked[0]
+                runner_up = ranked[1][1] if len(ranked) > 1 else 0.0
+                if (top_score >= min_score and top_score - runner_up >= min_margin
+                        and matcher.shares_word(top_name, element)):
+                    best = top_name
+            best_by_element[element] = best
+
+        section = best_by_element[element]
+        if section is None:
+            ambiguous.append(row)
         else:
-            readmes[section] = f"No README found for {section}"
+            assigned.setdefault(section, set()).add(row["story_id"])
+
+    logger.info(
+        f"Pre-matched {len(traceability_rows) - len(ambiguous)} of "
+        f"{len(traceability_rows)} rows lexically"
+    )
+    return {section: sorted(ids) for section, ids in assigned.items()}, ambiguous
+
+
+# -----------------------------------------------------------------------------
+# LLM Response Cache
+# -----------------------------------------------------------------------------
+
+def default_cache_dir() -> Path:
+    """Directory holding cached LLM responses ($XDG_CACHE_HOME or ~/.cache)."""
+    cache_home = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(cache_home) / "claude-forge" / "section-manifest"
+
+
+class ResponseCache:
+    """
+    Content-addressed store of validated LLM matching results.
+
+    One JSON file per request, named by the hash of everything that
+    determines the response. Reads refresh a file's mtime, and writes evict
+    the least recently used files once the directory exceeds max_bytes.
+    Disk errors are logged and treated as misses — the cache is never
+    required for a correct run.
+    """
+
+    def __init__(self, cache_dir: Path, max_bytes: int = CACHE_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()  # Shards look up concurrently
+
+    @staticmethod
+    def key(model: str, system_prompt: str, user_prompt: str, temperature: float) -> str:
+        """Hash of the request inputs that determine the model's answer."""
+        payload = json.dumps([model, system_prompt, user_prompt, temperature])
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.json"
+
+    def get(self, key: str) -> dict[str, list[str]] | None:
+        """Return the cached result for key, or None (counted as a miss)."""
+        path = self._path(key)
+        try:
+            result = json.loads(path.read_text(encoding="utf-8"))
+            os.utime(path)  # Mark as recently used
+        except (OSError, ValueError):
+            result = None
+
+        with self._lock:
+            if not isinstance(result, dict):
+                self.misses += 1
+                return None
+            self.hits += 1
+        return result
+
+    def put(self, key: str, result: dict[str, list[str]]) -> None:
+        """Store a result atomically, then evict old entries if over budget."""
+        path = self._path(key)
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+            tmp_path.write_text(json.dumps(result), encoding="utf-8")
+            os.replace(tmp_path, path)
+            self._evict()
+        except OSError as e:
+            logger.warning(f"Could not write LLM response cache: {e}")
+
+    def _evict(self) -> None:
+        entries = []
+        for entry in self.cache_dir.glob("*.json"):
+            try:
+                st = entry.stat()
+            except OSError:
+                continue
+            entries.append((st.st_mtime_ns, st.st_size, entry))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, entry in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            entry.unlink(missing_ok=True)
+            total -= size
+
+
+# -----------------------------------------------------------------------------
+# Prompt Token Budget
+# -----------------------------------------------------------------------------
+
+_tiktoken_encoding = None
+
+
+def count_tokens(text: str) -> int:
+    """Count tokens with tiktoken when it is installed, else estimate them."""
+    global _tiktoken_encoding
+    if tiktoken is None:
+        return estimate_tokens(text)
+    if _tiktoken_encoding is None:
+        try:
+            _tiktoken_encoding = tiktoken.encoding_for_model(MODEL)
+        except KeyError:
+            _tiktoken_encoding = tiktoken.get_encoding("o200k_base")
+    return len(_tiktoken_encoding.encode(text, disallowed_special=()))
+
 
-    return readmes
+def trim_to_token_budget(text: str, token_budget: int) -> str:
+    """
+    Keep the leading lines of text that fit within token_budget.
+
+    READMEs open with their title and overview, so the head is the part
+    worth keeping. A first line longer than the budget is cut mid-line.
+    """
+    if count_tokens(text) <= token_budget:
+        return text
+    kept: list[str] = []
+    tokens = 0
+    for line in text.splitlines(keepends=True):
+        line_tokens = count_tokens(line)
+        if tokens + line_tokens > token_budget:
+            break
+        kept.append(line)
+        tokens += line_tokens
+    if not kept:
+        return text[:token_budget * CHARS_PER_TOKEN]
+    return "".join(kept).rstrip("\n")
+
+
+def estimate_output_tokens(
+    traceability_rows: list[TraceabilityRow],
+    section_names: list[str]
+) -> int:
+    """Expected size of the JSON answer: every section key plus each row's story ID."""
+    keys = sum(count_tokens(f'  "{name}": [],\n') for name in section_names)
+    return 2 + keys + OUTPUT_TOKENS_PER_ROW * len(traceability_rows)
+
+
+def plan_matching_prompt(
+    traceability_rows: list[TraceabilityRow],
+    section_names: list[str],
+    section_readmes: dict[str, str],
+    token_budget: int | None = PROMPT_TOKEN_BUDGET
+) -> PromptPlan:
+    """
+    Size a matching request and fit its README excerpts to token_budget.
+
+    The prompt without README text is fixed cost. When the excerpts do not
+    fit in what is left, each one is trimmed to the same fraction of its
+    size, so long READMEs give up the most and every section keeps some
+    context. token_budget=None disables trimming.
+    """
+    fixed = count_tokens(SYSTEM_PROMPT) + count_tokens(build_matching_prompt(
+        traceability_rows, section_names, dict.fromkeys(section_readmes, "")
+    ))
+    readme_tokens = {section: count_tokens(readme) for section, readme in section_readmes.items()}
+    total = sum(readme_tokens.values())
+    available = max(0, token_budget - fixed) if token_budget is not None else total
+
+    readmes = dict(section_readmes)
+    trimmed = 0
+    if total > available:
+        share = available / total
+        for section, readme in section_readmes.items():
+            readmes[section] = trim_to_token_budget(readme, int(readme_tokens[section] * share))
+            trimmed += readmes[section] != readme
+        total = sum(count_tokens(readme) for readme in readmes.values())
+
+    return PromptPlan(
+        section_readmes=readmes,
+        input_tokens=fixed + total,
+        output_tokens=estimate_output_tokens(traceability_rows, section_names),
+        readmes_trimmed=trimmed,
+    )
 
 
 # -----------------------------------------------------------------------------
@@ -210,15 +704,16 @@ def build_matching_prompt(
     """Construct the user prompt for section matching."""
 
     # Format traceability as a simple table
-    traceability_text = "UX Element | Story ID\n"
-    traceability_text += "----------|----------\n"
-    for row in traceability_rows:
-        traceability_text += f"{row['ux_element']} | {row['story_id']}\n"
+    traceability_text = "".join([
+        "UX Element | Story ID\n",
+        "----------|----------\n",
+        *(f"{row['ux_element']} | {row['story_id']}\n" for row in traceability_rows),
+    ])
 
     # Format section READMEs
-    sections_text = ""
-    for section, readme in section_readmes.items():
-        sections_text += f"\n### {section}\n{readme}\n"
+    sections_text = "".join(
+        f"\n### {section}\n{readme}\n" for section, readme in section_readmes.items()
+    )
 
     return f"""\
 Match the UX elements to their corresponding section directories.
@@ -249,84 +744,918 @@ Example output format:
 """
 
 
+def backoff_delay(attempt: int, retry_after: float | None = None) -> float:
+    """
+    Seconds to wait before retrying after the given failed attempt.
+
+    Full jitter: uniform in [0, RETRY_DELAY_SECONDS * 2^(attempt-1)], capped
+    at RETRY_MAX_DELAY_SECONDS, so concurrent shards do not retry in lockstep.
+    Never shorter than a server-provided retry_after.
+    """
+    ceiling = min(RETRY_MAX_DELAY_SECONDS, RETRY_DELAY_SECONDS * 2 ** (attempt - 1))
+    delay = random.uniform(0, ceiling)
+    return delay if retry_after is None else max(delay, retry_after)
+
+
+def retry_after_seconds(error: Exception) -> float | None:
+    """Read Retry-After (seconds or HTTP date) or retry-after-ms from an API error."""
+    headers = getattr(getattr(error, "response", None), "headers", None)
+    if not headers:
+        return None
+    try:
+        if headers.get("retry-after-ms"):
+            return max(0.0, float(headers["retry-after-ms"]) / 1000)
+        value = headers.get("retry-after")
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class _AbandonedRequest(Exception):
+    """The request a duplicate was waiting on was cancelled."""
+
+
+class _InFlightGate:
+    """
+    A counting semaphore awaited from any number of event loops.
+
+    Waiters queue on their own loop, so waiting for a slot holds no thread,
+    and a released slot is handed to the oldest waiter still waiting. Both
+    acquire() and try_acquire() may be called from any loop; release() from
+    any thread.
+    """
+
+    def __init__(self, slots: int):
+        self._slots = slots
+        self._waiters: deque[tuple[asyncio.AbstractEventLoop, asyncio.Future]] = deque()
+        self._lock = threading.Lock()
+
+    def try_acquire(self) -> bool:
+        with self._lock:
+            if self._slots > 0 and not self._waiters:
+                self._slots -= 1
+                return True
+            return False
+
+    async def acquire(self) -> None:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self._slots > 0 and not self._waiters:
+                self._slots -= 1
+                return
+            waiter = loop.create_future()
+            self._waiters.append((loop, waiter))
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            with self._lock:
+                queued = (loop, waiter) in self._waiters
+                if queued:
+                    self._waiters.remove((loop, waiter))
+            if not queued and waiter.done() and not waiter.cancelled():
+                self.release()  # The slot arrived just as we were cancelled
+            raise
+
+    def release(self) -> None:
+        with self._lock:
+            if not self._waiters:
+                self._slots += 1
+                return
+            loop, waiter = self._waiters.popleft()
+        loop.call_soon_threadsafe(self._hand_over, waiter)
+
+    def _hand_over(self, waiter: asyncio.Future) -> None:
+        if waiter.cancelled():
+            self.release()  # Its owner gave up in transit; pass the slot on
+        else:
+            waiter.set_result(None)
+
+
+class LatencyTracker:
+    """Recent request latencies, and the percentile that triggers a hedge."""
+
+    def __init__(self, percentile: float, window: int = LATENCY_WINDOW):
+        self.percentile = percentile
+        self.samples: deque[float] = deque(maxlen=window)
+
+    def record(self, seconds: float) -> None:
+        self.samples.append(seconds)
+
+    def threshold(self) -> float | None:
+        """Latency above which to hedge, or None until enough samples exist."""
+        if len(self.samples) < HEDGE_MIN_SAMPLES:
+            return None
+        ordered = sorted(self.samples)
+        index = math.ceil(self.percentile / 100 * len(ordered)) - 1
+        return ordered[max(0, min(index, len(ordered) - 1))]
+
+
+class AsyncLLMClient:
+    """
+    Issues chat completions from asyncio, with timeouts and optional hedging.
+
+    Sync clients (openai.OpenAI, test stubs) run on a private thread pool so
+    a slow response never blocks the event loop; async clients
+    (openai.AsyncOpenAI, whose create is a coroutine function) are awaited
+    directly. Call close() when done.
+
+    One instance may be shared by event loops in several threads (batch
+    mode): max_in_flight then caps client calls across all of them, and
+    once() answers identical requests with a single call. Waiting for a
+    free slot happens before an attempt's timeout starts, and a slot stays
+    taken until its call returns, even if the attempt was abandoned.
+    """
+
+    def __init__(
+        self,
+        client: Any,
+        request_timeout: float = REQUEST_TIMEOUT_SECONDS,
+        hedge_percentile: float | None = None,
+        max_workers: int = MAX_CONCURRENT_REQUESTS,
+        max_in_flight: int | None = None
+    ):
+        self.client = client
+        self.request_timeout = request_timeout
+        self.latency = LatencyTracker(hedge_percentile) if hedge_percentile else None
+        self.hedged_requests = 0
+        self.deduplicated_requests = 0
+        # Room for a hedge per concurrent request
+        self._executor = ThreadPoolExecutor(max_workers=max(1, max_workers) * 2 + 1)
+        self._in_flight = _InFlightGate(max_in_flight) if max_in_flight else None
+        self._responses: dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+    def close(self) -> None:
+        # Abandoned (timed-out or out-hedged) calls finish in the background
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    async def once(self, key: str, request: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Await request() unless a request with the same key ran or is running.
+
+        Results are kept for the client's lifetime; failures are not, so a
+        later caller tries again. Followers of a request whose owner was
+        cancelled take over instead of failing with it.
+        """
+        while True:
+            with self._lock:
+                future = self._responses.get(key)
+                owner = future is None
+                if owner:
+                    future = self._responses[key] = Future()
+
+            if not owner:
+                try:
+                    result = await asyncio.wrap_future(future)
+                except _AbandonedRequest:
+                    continue
+                with self._lock:
+                    self.deduplicated_requests += 1
+                return copy.deepcopy(result)
+
+            try:
+                result = await request()
+            except BaseException as e:
+                with self._lock:
+                    del self._responses[key]
+                future.set_exception(e if isinstance(e, Exception) else _AbandonedRequest())
+                raise
+            future.set_result(result)
+            return result
+
+    async def complete(
+        self,
+        key: str,
+        request: dict[str, Any],
+        cache: ResponseCache | None = None
+    ) -> dict[str, list[str]]:
+        """
+        Section matches for one matching request (key is its cache key).
+
+        Identical requests (e.g. from several projects in one batch) share
+        one call; successful answers are written to cache.
+        """
+        return await self.once(key, lambda: _request_section_matches(self, request, cache, key))
+
+    def _call(self, kwargs: dict[str, Any], holds_slot: bool = False) -> asyncio.Future:
+        """
+        Start one client call; with holds_slot, its in-flight slot is released when it ends.
+
+        A sync call cancelled while still queued for a worker thread never
+        runs (nothing is sent or billed); one already running keeps its slot
+        until it returns, even after its attempt was abandoned.
+        """
+        create = self.client.chat.completions.create
+        if inspect.iscoroutinefunction(create):
+            call = asyncio.ensure_future(create(**kwargs))
+        else:
+            call = asyncio.wrap_future(self._executor.submit(create, **kwargs))
+        if holds_slot:
+            call.add_done_callback(lambda _: self._in_flight.release())
+        return call
+
+    async def sleep(self, seconds: float) -> None:
+        """Wait out a backoff delay on the event loop; no worker thread is held."""
+        await asyncio.sleep(seconds)
+
+    async def create(self, **kwargs: Any) -> Any:
+        """
+        One attempt: the first successful response within request_timeout.
+
+        With hedging on and enough latency history, a duplicate request is
+        sent when the first is slower than the tracked percentile; whichever
+        answers first is used. Raises TimeoutError, or the request's own
+        error once every in-flight request has failed.
+        """
+        gated = self._in_flight is not None
+        if gated:
+            await self._in_flight.acquire()  # Queueing does not count against the timeout
+
+        start = time.monotonic()
+        deadline = start + self.request_timeout
+        threshold = self.latency.threshold() if self.latency is not None else None
+        hedge_at = start + threshold if threshold is not None else None
+        kwargs.setdefault("timeout", self.request_timeout)  # Lets abandoned SDK calls end too
+        pending = {self._call(kwargs, holds_slot=gated)}
+        error: BaseException | None = None
+
+        try:
+            while True:
+                now = time.monotonic()
+                if now >= deadline:
+                    raise TimeoutError(f"No response within {self.request_timeout}s")
+                wait = deadline - now
+                if hedge_at is not None:
+                    wait = min(wait, max(0.0, hedge_at - now))
+
+                done, pending = await asyncio.wait(
+                    pending, timeout=wait, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    if task.exception() is None:
+                        if self.latency is not None:
+                            self.latency.record(time.monotonic() - start)
+                        return task.result()
+                    error = error or task.exception()
+
+                if hedge_at is not None and time.monotonic() >= hedge_at:
+                    hedge_at = None
+                    # A hedge only uses a slot that is free right now
+                    if not gated or self._in_flight.try_acquire():
+                        self.hedged_requests += 1
+                        logger.info(f"Hedging a request slower than {threshold:.1f}s")
+                        pending.add(self._call(kwargs, holds_slot=gated))
+                    if not pending:
+                        raise error
+                elif not pending:
+                    raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+
 def match_sections_with_llm(
     traceability_rows: list[TraceabilityRow],
     section_names: list[str],
     section_readmes: dict[str, str],
-    client: OpenAI
+    client: OpenAI,
+    cache: ResponseCache | None = None,
+    token_budget: int | None = PROMPT_TOKEN_BUDGET,
+    request_timeout: float = REQUEST_TIMEOUT_SECONDS
 ) -> dict[str, list[str]]:
     """
     Use LLM to semantically match UX elements to section directories.
 
+    Synchronous entry point to match_sections_with_llm_async().
+
     Args:
         traceability_rows: Parsed rows from UX-FLOWS.md traceability matrix
         section_names: Directory names from Design OS export
         section_readmes: README.md content for each section
         client: OpenAI client instance
+        cache: Optional response cache; a hit skips the API call entirely
+        token_budget: Input tokens to fit the prompt into by trimming README
+            excerpts (None sends them untrimmed)
+        request_timeout: Seconds each attempt may take
 
     Returns:
         Dict mapping directory names to lists of US-XXX story IDs
 
     Raises:
-        RuntimeError: If LLM call fails after retries
+        RuntimeError: If LLM call fails after retries, or the request cannot
+            fit the model's context window
+    """
+    llm = AsyncLLMClient(client, request_timeout=request_timeout)
+    try:
+        return asyncio.run(match_sections_with_llm_async(
+            traceability_rows, section_names, section_readmes, llm, cache, token_budget
+        ))
+    finally:
+        llm.close()
+
+
+async def match_sections_with_llm_async(
+    traceability_rows: list[TraceabilityRow],
+    section_names: list[str],
+    section_readmes: dict[str, str],
+    llm: AsyncLLMClient,
+    cache: ResponseCache | None = None,
+    token_budget: int | None = PROMPT_TOKEN_BUDGET
+) -> dict[str, list[str]]:
     """
+    Match UX elements to section directories, retrying failed attempts.
+
+    Rate limits, API errors, timeouts and invalid answers are retried up to
+    MAX_RETRIES times with jittered exponential backoff; rate limits wait at
+    least as long as the server's Retry-After. Arguments and errors are as
+    for match_sections_with_llm(), with llm wrapping the OpenAI client.
+    """
+    plan = plan_matching_prompt(traceability_rows, section_names, section_readmes, token_budget)
+    logger.info(
+        f"Prompt plan: ~{plan['input_tokens']} input tokens, "
+        f"~{plan['output_tokens']} output tokens (max_tokens={MAX_TOKENS})"
+    )
+    if plan["readmes_trimmed"]:
+        logger.info(f"Trimmed {plan['readmes_trimmed']} README excerpts to fit {token_budget} tokens")
+    if token_budget is not None and plan["input_tokens"] > token_budget:
+        logger.warning(
+            f"Prompt still exceeds the {token_budget}-token budget without READMEs; "
+            f"lower --rows-per-shard"
+        )
+    if plan["output_tokens"] > MAX_TOKENS:
+        logger.warning(
+            f"Expected answer exceeds max_tokens={MAX_TOKENS} and may be cut off; "
+            f"lower --rows-per-shard"
+        )
+    if plan["input_tokens"] + MAX_TOKENS > CONTEXT_WINDOW_TOKENS:
+        raise RuntimeError(
+            f"Prompt of ~{plan['input_tokens']} tokens does not fit the "
+            f"{CONTEXT_WINDOW_TOKENS}-token context window of {MODEL}"
+        )
+
     user_prompt = build_matching_prompt(
         traceability_rows,
         section_names,
-        section_readmes
+        plan["section_readmes"]
     )
 
-    for attempt in range(1, MAX_RETRIES + 1):
-        try:
-            logger.info(f"Calling {MODEL} for section matching (attempt {attempt})")
+    cache_key = ResponseCache.key(MODEL, SYSTEM_PROMPT, user_prompt, TEMPERATURE)
+    if cache is not None:
+        cached = cache.get(cache_key)
+        if cached is not None:
+            logger.info(f"Using cached {MODEL} response for section matching")
+            return cached
 
-            response = client.chat.completions.create(
-                model=MODEL,
-                messages=[
-                    {"role": "system", "content": SYSTEM_PROMPT},
-                    {"role": "user", "content": user_prompt}
-                ],
-                response_format={"type": "json_object"},
-                temperature=0.0,  # Deterministic output
-                max_tokens=2048
-            )
+    return await llm.complete(cache_key, matching_request(user_prompt), cache)
 
-            result = json.loads(response.choices[0].message.content)
 
-            # Validate structure
-            if not isinstance(result, dict):
-                raise ValueError("Response is not a dictionary")
+def matching_request(user_prompt: str) -> dict[str, Any]:
+    """Chat completion parameters for one matching prompt."""
+    return {
+        "model": MODEL,
+        "messages": [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": user_prompt}
+        ],
+        "response_format": {"type": "json_object"},
+        "temperature": TEMPERATURE,
+        "max_tokens": MAX_TOKENS,
+    }
+
+
+def parse_section_matches(content: str) -> dict[str, list[str]]:
+    """
+    Parse and validate the model's JSON answer.
+
+    Raises:
+        json.JSONDecodeError: If content is not JSON
+        ValueError: If it is not a section → US-XXX list mapping
+    """
+    result = json.loads(content)
+
+    # Validate structure
+    if not isinstance(result, dict):
+        raise ValueError("Response is not a dictionary")
+
+    for key, value in result.items():
+        if not isinstance(value, list):
+            raise ValueError(f"Value for '{key}' is not a list")
+        for item in value:
+            if not isinstance(item, str) or not item.startswith("US-"):
+                raise ValueError(f"Invalid story ID: {item}")
+
+    return result
+
+
+async def _request_section_matches(
+    llm: AsyncLLMClient,
+    request: dict[str, Any],
+    cache: ResponseCache | None,
+    cache_key: str
+) -> dict[str, list[str]]:
+    """The retry loop behind AsyncLLMClient.complete()."""
+    for attempt in range(1, MAX_RETRIES + 1):
+        try:
+            logger.info(f"Calling {MODEL} for section matching (attempt {attempt})")
 
-            for key, value in result.items():
-                if not isinstance(value, list):
-                    raise ValueError(f"Value for '{key}' is not a list")
-                for item in value:
-                    if not isinstance(item, str) or not item.startswith("US-"):
-                        raise ValueError(f"Invalid story ID: {item}")
+            response = await llm.create(**request)
+            result = parse_section_matches(response.choices[0].message.content)
 
             logger.info(f"Successfully matched sections: {list(result.keys())}")
+            if cache is not None:
+                cache.put(cache_key, result)
             return result
 
-        except RateLimitError:
-            wait_time = RETRY_DELAY_SECONDS * attempt
-            logger.warning(f"Rate limited, waiting {wait_time}s")
-            time.sleep(wait_time)
+        except RateLimitError as e:
+            wait_time = backoff_delay(attempt, retry_after_seconds(e))
+            logger.warning(f"Rate limited, waiting {wait_time:.1f}s")
+            await llm.sleep(wait_time)
 
         except APIError as e:
             logger.error(f"API error: {e}")
             if attempt == MAX_RETRIES:
                 raise RuntimeError(f"LLM matching failed after {MAX_RETRIES} attempts") from e
-            time.sleep(RETRY_DELAY_SECONDS)
+            await llm.sleep(backoff_delay(attempt, retry_after_seconds(e)))
+
+        except TimeoutError as e:
+            logger.error(f"Request timed out: {e}")
+            if attempt == MAX_RETRIES:
+                raise RuntimeError(f"LLM matching timed out after {MAX_RETRIES} attempts") from e
+            await llm.sleep(backoff_delay(attempt))
 
         except (json.JSONDecodeError, ValueError) as e:
             logger.error(f"Invalid response: {e}")
             if attempt == MAX_RETRIES:
                 raise RuntimeError(f"LLM returned invalid response: {e}") from e
-            time.sleep(RETRY_DELAY_SECONDS)
+            await llm.sleep(backoff_delay(attempt))
 
     raise RuntimeError("LLM matching failed")
 
 
+def shard_traceability_rows(
+    traceability_rows: list[TraceabilityRow],
+    rows_per_shard: int = ROWS_PER_SHARD
+) -> list[list[TraceabilityRow]]:
+    """
+    Split rows into consecutive batches for separate matching requests.
+
+    Every shard is matched against all sections, so the prompt stays
+    complete while the JSON answer (which grows with the rows) stays small.
+    Returns at least one shard, even for no rows.
+    """
+    if rows_per_shard < 1:
+        raise ValueError(f"rows_per_shard must be at least 1, got {rows_per_shard}")
+    return [
+        traceability_rows[i:i + rows_per_shard]
+        for i in range(0, len(traceability_rows), rows_per_shard)
+    ] or [[]]
+
+
+def match_sections_sharded(
+    traceability_rows: list[TraceabilityRow],
+    section_names: list[str],
+    section_readmes: dict[str, str],
+    client: OpenAI,
+    cache: ResponseCache | None = None,
+    rows_per_shard: int = ROWS_PER_SHARD,
+    max_concurrency: int = MAX_CONCURRENT_REQUESTS,
+    token_budget: int | None = PROMPT_TOKEN_BUDGET,
+    request_timeout: float = REQUEST_TIMEOUT_SECONDS,
+    hedge_percentile: float | None = None,
+    llm: AsyncLLMClient | None = None
+) -> list[dict[str, list[str]]]:
+    """
+    Match row shards concurrently with match_sections_with_llm_async().
+
+    At most max_concurrency requests are in flight at once (plus any
+    hedged duplicates). Results are returned in shard order regardless of
+    completion order; the first failing shard's RuntimeError is raised.
+    Latencies are shared across shards, so hedging (hedge_percentile, e.g.
+    95) kicks in once enough shards have answered. Pass llm to share one
+    AsyncLLMClient (and its settings) across calls; it is left open.
+    """
+    shards = shard_traceability_rows(traceability_rows, rows_per_shard)
+    if len(shards) > 1:
+        logger.info(
+            f"Matching {len(traceability_rows)} rows in {len(shards)} shards "
+            f"({max_concurrency} concurrent)"
+        )
+
+    owns_llm = llm is None
+    if llm is None:
+        llm = AsyncLLMClient(client, request_timeout, hedge_percentile, max_concurrency)
+    semaphore = asyncio.Semaphore(max(1, max_concurrency))
+
+    async def match_shard(shard: list[TraceabilityRow]) -> dict[str, list[str]]:
+        async with semaphore:
+            return await match_sections_with_llm_async(
+                shard, section_names, section_readmes, llm, cache, token_budget
+            )
+
+    async def match_all() -> list[dict[str, list[str]]]:
+        return list(await asyncio.gather(*(match_shard(shard) for shard in shards)))
+
+    try:
+        return asyncio.run(match_all())
+    finally:
+        if owns_llm:
+            llm.close()
+            if llm.hedged_requests:
+                logger.info(f"Hedged {llm.hedged_requests} slow requests")
+
+
+def merge_section_matches(
+    shard_results: list[dict[str, list[str]]]
+) -> dict[str, list[str]]:
+    """
+    Union shard results per section into one sorted, deduplicated mapping.
+
+    The output depends only on the set of (section, story) pairs, never on
+    shard order or on which shard finished first.
+    """
+    merged: dict[str, set[str]] = {}
+    for result in shard_results:
+        for section, stories in result.items():
+            merged.setdefault(section, set()).update(stories)
+    return {section: sorted(merged[section]) for section in sorted(merged)}
+
+
+# -----------------------------------------------------------------------------
+# Matcher Backends
+# -----------------------------------------------------------------------------
+
+class SectionMatcher(ABC):
+    """
+    A strategy for mapping traceability rows to section directories.
+
+    match() returns section → US-XXX IDs in the shape generate_manifest()
+    expects. Afterwards `stats` holds string counts for the manifest
+    metadata, and `cache` is the response cache used (if any).
+    """
+
+    name = ""
+    model = MODEL
+
+    def __init__(self):
+        self.stats: dict[str, str] = {}
+        self.cache: ResponseCache | None = None
+
+    @abstractmethod
+    def match(
+        self,
+        traceability_rows: list[TraceabilityRow],
+        section_names: list[str],
+        section_readmes: dict[str, str]
+    ) -> dict[str, list[str]]:
+        """Map rows to sections; see the class docstring for the contract."""
+
+
+class LocalMatcher(SectionMatcher):
+    """
+    Deterministic, offline matching: no API key and no network.
+
+    Each UX element goes to the section with the highest trigram cosine
+    plus README/name keyword overlap. Elements sharing no word with any
+    section stay unmatched and show up in metadata["unmapped_stories"].
+    """
+
+    name = "local"
+    model = "none"
+
+    def match(self, traceability_rows, section_names, section_readmes):
+        lexical = LexicalMatcher(section_names, section_readmes)
+        assigned: dict[str, set[str]] = {}
+        best_by_element: dict[str, str | None] = {}
+        matched_rows = 0
+
+        for row in traceability_rows:
+            element = row["ux_element"]
+            if element not in best_by_element:
+                candidates = [
+                    (score + lexical.keyword_score(name, element), name)
+                    for name, score in lexical.rank(element)
+                    if lexical.shares_word(name, element)
+                ]
+                # Highest combined score; ties go to the alphabetically first section
+                best_by_element[element] = (
+                    min(candidates, key=lambda c: (-c[0], c[1]))[1] if candidates else None
+                )
+
+            section = best_by_element[element]
+            if section is not None:
+                assigned.setdefault(section, set()).add(row["story_id"])
+                matched_rows += 1
+
+        self.stats = {
+            "rows_prematched": str(matched_rows),
+            "rows_sent_to_llm": "0",
+        }
+        return {section: sorted(ids) for section, ids in assigned.items()}
+
+
+class OpenAIMatcher(SectionMatcher):
+    """Every row goes to the LLM, in concurrent shards."""
+
+    name = "openai"
+
+    def __init__(
+        self,
+        client: OpenAI,
+        cache: ResponseCache | None = None,
+        rows_per_shard: int = ROWS_PER_SHARD,
+        max_concurrency: int = MAX_CONCURRENT_REQUESTS,
+        token_budget: int | None = PROMPT_TOKEN_BUDGET,
+        request_timeout: float = REQUEST_TIMEOUT_SECONDS,
+        hedge_percentile: float | None = None,
+        llm: AsyncLLMClient | None = None
+    ):
+        super().__init__()
+        self.client = client
+        self.cache = cache
+        self.rows_per_shard = rows_per_shard
+        self.max_concurrency = max_concurrency
+        self.token_budget = token_budget
+        self.request_timeout = request_timeout
+        self.hedge_percentile = hedge_percentile
+        self.llm = llm  # Shared across matchers in batch mode
+
+    def _match_with_llm(self, traceability_rows, section_names, section_readmes):
+        if not traceability_rows:
+            return {}
+        return merge_section_matches(match_sections_sharded(
+            traceability_rows=traceability_rows,
+            section_names=section_names,
+            section_readmes=section_readmes,
+            client=self.client,
+            cache=self.cache,
+            rows_per_shard=self.rows_per_shard,
+            max_concurrency=self.max_concurrency,
+            token_budget=self.token_budget,
+            request_timeout=self.request_timeout,
+            hedge_percentile=self.hedge_percentile,
+            llm=self.llm
+        ))
+
+    def match(self, traceability_rows, section_names, section_readmes):
+        self.stats = {
+            "rows_prematched": "0",
+            "rows_sent_to_llm": str(len(traceability_rows)),
+        }
+        return self._match_with_llm(traceability_rows, section_names, section_readmes)
+
+
+class HybridMatcher(OpenAIMatcher):
+    """Lexically obvious rows are assigned locally; the rest go to the LLM."""
+
+    name = "hybrid"
+
+    def match(self, traceability_rows, section_names, section_readmes):
+        prematched, llm_rows = prematch_rows(
+            traceability_rows, LexicalMatcher(section_names, section_readmes)
+        )
+        self.stats = {
+            "rows_prematched": str(len(traceability_rows) - len(llm_rows)),
+            "rows_sent_to_llm": str(len(llm_rows)),
+        }
+        matched = self._match_with_llm(llm_rows, section_names, section_readmes)
+        return merge_section_matches([prematched, matched])
+
+
+MATCHERS = {
+    "hybrid": HybridMatcher,
+    "openai": OpenAIMatcher,
+    "local": LocalMatcher,
+}
+
+
+# -----------------------------------------------------------------------------
+# OpenAI Batch API
+# -----------------------------------------------------------------------------
+
+class BatchRequestCollector(AsyncLLMClient):
+    """
+    Records matching requests instead of sending them.
+
+    Used for the first of two passes in --batch-api mode: each request is
+    kept by cache key (so identical prompts are submitted once) and
+    answered with no matches, and the manifests of that pass are discarded.
+    """
+
+    def __init__(self):
+        super().__init__(client=None)
+        self.requests: dict[str, dict[str, Any]] = {}
+
+    async def complete(self, key, request, cache=None):
+        with self._lock:
+            self.requests.setdefault(key, request)
+        return {}
+
+
+class BatchResultsClient(AsyncLLMClient):
+    """Answers matching requests from finished Batch API results (the second pass)."""
+
+    def __init__(self, results: dict[str, dict[str, str]]):
+        super().__init__(client=None)
+        self.results = results
+
+    async def complete(self, key, request, cache=None):
+        entry = self.results.get(key)
+        if entry is None:
+            raise RuntimeError("Batch API returned no result for a matching request")
+        if "error" in entry:
+            raise RuntimeError(f"Batch API request failed: {entry['error']}")
+        try:
+            result = parse_section_matches(entry["content"])
+        except (json.JSONDecodeError, ValueError) as e:
+            raise RuntimeError(f"LLM returned invalid response: {e}") from e
+        if cache is not None:
+            cache.put(key, result)
+        return result
+
+
+def write_batch_requests(requests: dict[str, dict[str, Any]], path: Path) -> None:
+    """Write requests as Batch API input JSONL, one line per custom_id."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        for custom_id, body in requests.items():
+            f.write(json.dumps({
+                "custom_id": custom_id,
+                "method": "POST",
+                "url": BATCH_ENDPOINT,
+                "body": body,
+            }) + "\n")
+
+
+def parse_batch_output(lines: Iterable[str]) -> dict[str, dict[str, str]]:
+    """
+    Read Batch API output (or error) JSONL into custom_id → result.
+
+    Each result is {"content": <message text>} or {"error": <reason>}.
+    """
+    results: dict[str, dict[str, str]] = {}
+    for line in lines:
+        if not line.strip():
+            continue
+        record = json.loads(line)
+        response = record.get("response") or {}
+        body = response.get("body") or {}
+        if record.get("error") or response.get("status_code", 200) != 200:
+            error = record.get("error") or body.get("error") or f"HTTP {response.get('status_code')}"
+            results[record["custom_id"]] = {"error": json.dumps(error) if not isinstance(error, str) else error}
+        else:
+            results[record["custom_id"]] = {"content": body["choices"][0]["message"]["content"]}
+    return results
+
+
+class BatchBackend(ABC):
+    """
+    Where a Batch API input file is sent and its results fetched.
+
+    status() returns the OpenAI batch status names; "completed" means
+    results() is ready, and BATCH_FAILED_STATUSES are final failures.
+    """
+
+    @abstractmethod
+    def submit(self, requests_path: Path) -> str:
+        """Start a batch from an input JSONL file; returns its ID."""
+
+    @abstractmethod
+    def status(self, batch_id: str) -> str:
+        """Current OpenAI status name of the batch."""
+
+    @abstractmethod
+    def results(self, batch_id: str) -> dict[str, dict[str, str]]:
+        """custom_id → {"content": ...} or {"error": ...}, as parse_batch_output()."""
+
+
+class OpenAIBatchBackend(BatchBackend):
+    """The OpenAI Batch API: half the price of interactive calls, done within 24h."""
+
+    def __init__(self, client: OpenAI):
+        self.client = client
+
+    def submit(self, requests_path: Path) -> str:
+        with open(requests_path, "rb") as f:
+            input_file = self.client.files.create(file=f, purpose="batch")
+        batch = self.client.batches.create(
+            input_file_id=input_file.id,
+            endpoint=BATCH_ENDPOINT,
+            completion_window=BATCH_COMPLETION_WINDOW,
+            metadata={"generated_by": "generate-section-manifest.py"}
+        )
+        return batch.id
+
+    def status(self, batch_id: str) -> str:
+        return self.client.batches.retrieve(batch_id).status
+
+    def results(self, batch_id: str) -> dict[str, dict[str, str]]:
+        batch = self.client.batches.retrieve(batch_id)
+        results: dict[str, dict[str, str]] = {}
+        for file_id in (batch.error_file_id, batch.output_file_id):
+            if file_id:
+                results.update(parse_batch_output(
+                    self.client.files.content(file_id).text.splitlines()
+                ))
+        return results
+
+
+class LocalBatchBackend(BatchBackend):
+    """
+    File-based stand-in for the Batch API, for tests and offline dry runs.
+
+    Each batch is a directory holding input.jsonl. The batch stays
+    "in_progress" for polls_until_done status checks, then respond(body)
+    answers every request into output.jsonl in the Batch API format
+    (an exception becomes that request's error).
+    """
+
+    def __init__(
+        self,
+        directory: Path,
+        respond: Callable[[dict[str, Any]], str],
+        polls_until_done: int = 1
+    ):
+        self.directory = directory
+        self.respond = respond
+        self.polls_until_done = polls_until_done
+        self._polls: Counter[str] = Counter()
+
+    def submit(self, requests_path: Path) -> str:
+        batch_id = f"batch_{hashlib.sha256(requests_path.read_bytes()).hexdigest()[:16]}"
+        batch_dir = self.directory / batch_id
+        batch_dir.mkdir(parents=True, exist_ok=True)
+        (batch_dir / "input.jsonl").write_bytes(requests_path.read_bytes())
+        return batch_id
+
+    def status(self, batch_id: str) -> str:
+        batch_dir = self.directory / batch_id
+        if not (batch_dir / "input.jsonl").exists():
+            return "failed"
+        if (batch_dir / "output.jsonl").exists():
+            return "completed"
+        self._polls[batch_id] += 1
+        if self._polls[batch_id] < self.polls_until_done:
+            return "in_progress"
+
+        with open(batch_dir / "input.jsonl", encoding="utf-8") as f_in:
+            lines = []
+            for line in f_in:
+                request = json.loads(line)
+                try:
+                    content = self.respond(request["body"])
+                    record = {"response": {"status_code": 200, "body": {
+                        "choices": [{"message": {"role": "assistant", "content": content}}]
+                    }}, "error": None}
+                except Exception as e:
+                    record = {"response": None, "error": {"message": str(e)}}
+                lines.append(json.dumps({"custom_id": request["custom_id"], **record}) + "\n")
+        (batch_dir / "output.jsonl").write_text("".join(lines), encoding="utf-8")
+        return "completed"
+
+    def results(self, batch_id: str) -> dict[str, dict[str, str]]:
+        with open(self.directory / batch_id / "output.jsonl", encoding="utf-8") as f:
+            return parse_batch_output(f)
+
+
+def run_batch_job(
+    backend: BatchBackend,
+    requests: dict[str, dict[str, Any]],
+    requests_path: Path,
+    poll_seconds: float = BATCH_POLL_SECONDS,
+    batch_id: str | None = None
+) -> dict[str, dict[str, str]]:
+    """
+    Submit requests (unless resuming batch_id), wait for the batch, return its results.
+
+    Raises:
+        RuntimeError: If the batch ends failed, expired or cancelled
+    """
+    if batch_id is None:
+        write_batch_requests(requests, requests_path)
+        batch_id = backend.submit(requests_path)
+        logger.info(f"Submitted {len(requests)} requests as batch {batch_id} ({requests_path})")
+    else:
+        logger.info(f"Resuming batch {batch_id}")
+
+    while True:
+        status = backend.status(batch_id)
+        if status == "completed":
+            break
+        if status in BATCH_FAILED_STATUSES:
+            raise RuntimeError(f"Batch {batch_id} ended with status '{status}'")
+        logger.info(f"Batch {batch_id} is {status}; checking again in {poll_seconds}s")
+        time.sleep(poll_seconds)
+
+    results = backend.results(batch_id)
+    logger.info(f"Batch {batch_id} completed with {len(results)} results")
+    return results
+
+
 # -----------------------------------------------------------------------------
 # Manifest Generation
 # -----------------------------------------------------------------------------
@@ -334,18 +1663,27 @@ def match_sections_with_llm(
 def generate_manifest(
     section_to_stories: dict[str, list[str]],
     traceability_rows: list[TraceabilityRow],
-    section_names: list[str]
+    section_names: list[str],
+    cache: ResponseCache | None = None,
+    extra_metadata: dict[str, str] | None = None,
+    section_readmes: dict[str, str] | None = None
 ) -> SectionManifest:
     """
     Generate the final manifest from LLM matching results.
 
     Args:
-        section_to_stories: From match_sections_with_llm()
+        section_to_stories: From match_sections_with_llm() or merge_section_matches()
         traceability_rows: Original parsed rows (for metadata)
         section_names: Original directory names (for validation)
+        cache: Response cache used for matching (hit/miss counts go in metadata)
+        extra_metadata: Further string fields to record, e.g. pre-match counts
+        section_readmes: README excerpts the match was based on; when given,
+            their hashes, each row's sections and each story's row set are
+            recorded so the next run can re-match only what changed
 
     Returns:
-        SectionManifest ready for JSON serialization
+        SectionManifest ready for JSON serialization, with the inverted
+        story → sections map manifest_lookup.py reads
     """
     # Ensure all sections are present (even if LLM missed some)
     sections: dict[str, list[str]] = {}
@@ -354,10 +1692,15 @@ def generate_manifest(
         # Sort and deduplicate
         sections[name] = sorted(set(stories))
 
+    # Invert for O(1) story → sections lookups (sections keep export order)
+    story_sections: dict[str, list[str]] = {}
+    for name, stories in sections.items():
+        for story_id in stories:
+            story_sections.setdefault(story_id, []).append(name)
+    story_sections = {story_id: story_sections[story_id] for story_id in sorted(story_sections)}
+
     # Count total unique stories mapped
-    all_stories = set()
-    for stories in sections.values():
-        all_stories.update(stories)
+    all_stories = set(story_sections)
 
     # Count stories from traceability
     traceability_stories = set(row["story_id"] for row in traceability_rows)
@@ -366,19 +1709,448 @@ def generate_manifest(
     if unmapped:
         logger.warning(f"Stories in traceability but not mapped to any section: {unmapped}")
 
-    return SectionManifest(
-        sections=sections,
-        metadata={
-            "generated_by": "generate-section-manifest.py",
-            "model": MODEL,
-            "traceability_rows_parsed": str(len(traceability_rows)),
-            "unique_stories_in_traceability": str(len(traceability_stories)),
-            "unique_stories_mapped": str(len(all_stories)),
-            "sections_in_export": str(len(section_names)),
-            "unmapped_stories": ", ".join(sorted(unmapped)) if unmapped else "none"
+    metadata = {
+        "generated_by": "generate-section-manifest.py",
+        "model": MODEL,
+        "traceability_rows_parsed": str(len(traceability_rows)),
+        "unique_stories_in_traceability": str(len(traceability_stories)),
+        "unique_stories_mapped": str(len(all_stories)),
+        "sections_in_export": str(len(section_names)),
+        "unmapped_stories": ", ".join(sorted(unmapped)) if unmapped else "none"
+    }
+    if cache is not None:
+        metadata["llm_cache_hits"] = str(cache.hits)
+        metadata["llm_cache_misses"] = str(cache.misses)
+    if extra_metadata:
+        metadata.update(extra_metadata)
+    if section_readmes is not None:
+        metadata["section_readme_hashes"] = section_readme_hashes(section_readmes)
+        # Matches come back per story ID, so a row records its story's sections;
+        # story_rows lets the next run re-match a story whose rows changed
+        metadata["row_sections"] = {
+            row_hash(row): list(story_sections.get(row["story_id"], []))
+            for row in traceability_rows
         }
+        metadata["story_rows"] = story_row_hashes(traceability_rows)
+
+    return SectionManifest(sections=sections, stories=story_sections, metadata=metadata)
+
+
+# -----------------------------------------------------------------------------
+# Incremental Regeneration
+# -----------------------------------------------------------------------------
+
+def _short_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+
+
+def section_readme_hashes(section_readmes: dict[str, str]) -> dict[str, str]:
+    """Hash of each section's README excerpt, as shown to the matcher."""
+    return {section: _short_hash(readme) for section, readme in sorted(section_readmes.items())}
+
+
+def row_hash(row: TraceabilityRow) -> str:
+    """Identity of a traceability row: its UX element and story ID."""
+    return _short_hash(f"{row['ux_element']}\0{row['story_id']}")
+
+
+def story_row_hashes(traceability_rows: list[TraceabilityRow]) -> dict[str, str]:
+    """Hash of the set of rows carrying each story ID."""
+    rows_by_story: dict[str, set[str]] = {}
+    for row in traceability_rows:
+        rows_by_story.setdefault(row["story_id"], set()).add(row_hash(row))
+    return {
+        story_id: _short_hash("\0".join(sorted(hashes)))
+        for story_id, hashes in sorted(rows_by_story.items())
+    }
+
+
+def load_previous_manifest(path: Path) -> SectionManifest | None:
+    """Read an existing manifest that recorded incremental hashes, else None."""
+    try:
+        manifest = json.loads(path.read_text(encoding="utf-8"))
+        metadata = manifest["metadata"]
+        if not (isinstance(manifest["sections"], dict)
+                and isinstance(metadata["section_readme_hashes"], dict)
+                and isinstance(metadata["row_sections"], dict)):
+            return None
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+    return manifest
+
+
+def plan_incremental_update(
+    previous: SectionManifest,
+    traceability_rows: list[TraceabilityRow],
+    section_readmes: dict[str, str]
+) -> tuple[dict[str, list[str]], list[TraceabilityRow]]:
+    """
+    Split rows into those whose previous assignment still holds and those to re-match.
+
+    A row is re-matched when it is new, when a section it was assigned to
+    was removed or its README changed, when it was unmatched and any
+    section was added or changed (it may fit there now), or when a row
+    sharing its story ID was added or removed: rows record their story's
+    sections, so a deleted row's sections would otherwise live on through
+    its siblings. Every other row keeps its previous sections.
+
+    Returns:
+        (section → story IDs carried over from previous, rows to re-match)
+    """
+    old_hashes = previous["metadata"]["section_readme_hashes"]
+    old_row_sections = previous["metadata"]["row_sections"]
+    new_hashes = section_readme_hashes(section_readmes)
+    changed = {name for name, digest in new_hashes.items() if old_hashes.get(name) != digest}
+    changed |= set(old_hashes) - set(new_hashes)  # Removed sections
+
+    # Manifests written before story_rows existed re-match every story once
+    old_story_rows = previous["metadata"].get("story_rows")
+    if not isinstance(old_story_rows, dict):
+        old_story_rows = {}
+    regrouped = {
+        story_id for story_id, digest in story_row_hashes(traceability_rows).items()
+        if old_story_rows.get(story_id) != digest
+    }
+
+    preserved: dict[str, set[str]] = {}
+    rematch: list[TraceabilityRow] = []
+    for row in traceability_rows:
+        sections = old_row_sections.get(row_hash(row))
+        if (sections is None or row["story_id"] in regrouped
+                or changed.intersection(sections) or (not sections and changed)):
+            rematch.append(row)
+            continue
+        for name in sections:
+            preserved.setdefault(name, set()).add(row["story_id"])
+
+    logger.info(
+        f"Incremental run: {len(changed)} changed sections, "
+        f"{len(rematch)} of {len(traceability_rows)} rows to re-match"
+    )
+    return {name: sorted(ids) for name, ids in preserved.items()}, rematch
+
+
+def generate_project_manifest(
+    export_dir: Path,
+    ux_flows: Path,
+    output: Path,
+    matcher: SectionMatcher,
+    full: bool = False,
+    readme_token_budget: int | None = None
+) -> SectionManifest:
+    """
+    Build one project's manifest: parse, list sections, match, assemble.
+
+    The manifest at output (if any) is reused for incremental matching
+    unless full is set; nothing is written.
+
+    Raises:
+        ValueError: If there are no traceability rows or no sections
+        RuntimeError: If LLM matching fails
+    """
+    # Step 1: Parse traceability matrix
+    logger.info(f"Parsing traceability matrix from {ux_flows}")
+    traceability_rows = parse_traceability_matrix(ux_flows)
+
+    if not traceability_rows:
+        raise ValueError("No traceability data found — cannot generate manifest")
+
+    # Step 2: List export sections
+    section_names = list_export_sections(export_dir)
+    logger.info(f"Found {len(section_names)} section directories: {section_names}")
+
+    if not section_names:
+        raise ValueError("No section directories found in export")
+
+    # Step 3: Load section READMEs for context
+    section_readmes = load_section_readmes(
+        export_dir, section_names, token_budget=readme_token_budget
     )
 
+    # Step 4: Reuse assignments from the existing manifest where nothing changed
+    previous = None if full else load_previous_manifest(output)
+    if previous is not None and previous["metadata"].get("matcher") != matcher.name:
+        previous = None  # A different backend may assign differently — start over
+
+    preserved: dict[str, list[str]] = {}
+    rows_to_match = traceability_rows
+    if previous is not None:
+        preserved, rows_to_match = plan_incremental_update(
+            previous, traceability_rows, section_readmes
+        )
+
+    # Step 5: Match rows to sections (even none, so every run reports the
+    # matcher's counters and the metadata keys do not depend on what changed)
+    matched = matcher.match(rows_to_match, section_names, section_readmes)
+    section_to_stories = merge_section_matches([preserved, matched])
+
+    # Step 6: Generate manifest
+    return generate_manifest(
+        section_to_stories=section_to_stories,
+        traceability_rows=traceability_rows,
+        section_names=section_names,
+        cache=matcher.cache,
+        extra_metadata={
+            "matcher": matcher.name,
+            "model": matcher.model,
+            **matcher.stats,
+            "rows_reused": str(len(traceability_rows) - len(rows_to_match)),
+        },
+        section_readmes=section_readmes
+    )
+
+
+# -----------------------------------------------------------------------------
+# Batch Mode
+# -----------------------------------------------------------------------------
+
+class ProjectResult(TypedDict):
+    """One project's line in the batch summary report."""
+    project: str
+    status: str  # "ok" or "failed"
+    output: str
+    stories_mapped: int
+    unmapped_stories: str
+    seconds: float
+    error: str
+
+
+def discover_projects(patterns: list[str]) -> list[Path]:
+    """
+    Expand project roots and glob patterns into distinct directories.
+
+    Order follows the arguments (glob matches sorted); a root named twice,
+    directly or through a pattern, appears once.
+    """
+    roots: list[Path] = []
+    seen: set[Path] = set()
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern)) if any(c in pattern for c in "*?[") else [pattern]
+        for match in matches:
+            root = Path(match)
+            if root.is_dir() and root.resolve() not in seen:
+                seen.add(root.resolve())
+                roots.append(root)
+    return roots
+
+
+def generate_batch(
+    roots: list[Path],
+    make_matcher: Callable[[], SectionMatcher],
+    export_dir: Path = DEFAULT_EXPORT_DIR,
+    ux_flows: Path = DEFAULT_UX_FLOWS,
+    output: Path = DEFAULT_OUTPUT,
+    full: bool = False,
+    readme_token_budget: int | None = None,
+    dry_run: bool = False,
+    max_projects: int = MAX_CONCURRENT_PROJECTS
+) -> list[ProjectResult]:
+    """
+    Generate a manifest for every project root, max_projects at a time.
+
+    export_dir, ux_flows and output are resolved against each root.
+    make_matcher builds each project's matcher, typically around one shared
+    client so connections, the global request limit and deduplication span
+    the whole batch. A failing project is reported, not raised.
+    """
+    def run(root: Path) -> ProjectResult:
+        start = time.monotonic()
+        project_output = root / output
+        result = ProjectResult(
+            project=str(root), status="failed", output=str(project_output),
+            stories_mapped=0, unmapped_stories="", seconds=0.0, error=""
+        )
+        try:
+            project_export = root / export_dir
+            project_ux_flows = root / ux_flows
+            if not project_export.exists():
+                raise ValueError(f"Export directory not found: {project_export}")
+            if not project_ux_flows.exists():
+                raise ValueError(f"UX-FLOWS.md not found: {project_ux_flows}")
+
+            manifest = generate_project_manifest(
+                project_export, project_ux_flows, project_output,
+                make_matcher(), full, readme_token_budget
+            )
+            if not dry_run:
+                project_output.parent.mkdir(parents=True, exist_ok=True)
+                project_output.write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+            result.update(
+                status="ok",
+                stories_mapped=len(manifest["stories"]),
+                unmapped_stories=manifest["metadata"]["unmapped_stories"],
+            )
+        except (ValueError, RuntimeError, OSError) as e:
+            logger.error(f"{root}: {e}")
+            result["error"] = str(e)
+        result["seconds"] = round(time.monotonic() - start, 3)
+        return result
+
+    with ThreadPoolExecutor(max_workers=max(1, max_projects)) as executor:
+        return list(executor.map(run, roots))
+
+
+def run_batch(
+    args: argparse.Namespace,
+    make_matcher: Callable[[], SectionMatcher],
+    shared_llm: AsyncLLMClient | None
+) -> int:
+    """Batch half of main(): run every project and report. 1 if any failed."""
+    roots = discover_projects(args.projects)
+    if not roots:
+        logger.error(f"No project directories match: {' '.join(args.projects)}")
+        return 1
+
+    logger.info(f"Generating manifests for {len(roots)} projects")
+    start = time.monotonic()
+    try:
+        results = generate_batch(
+            roots, make_matcher,
+            export_dir=args.export_dir or DEFAULT_EXPORT_DIR,
+            ux_flows=args.ux_flows or DEFAULT_UX_FLOWS,
+            output=args.output or DEFAULT_OUTPUT,
+            full=args.full,
+            readme_token_budget=args.readme_token_budget,
+            dry_run=args.dry_run,
+            max_projects=args.project_concurrency
+        )
+    finally:
+        if shared_llm is not None:
+            shared_llm.close()
+
+    failed = sum(result["status"] != "ok" for result in results)
+    summary = {
+        "projects": results,
+        "totals": {
+            "projects": len(results),
+            "ok": len(results) - failed,
+            "failed": failed,
+            "llm_requests_deduplicated": shared_llm.deduplicated_requests if shared_llm else 0,
+            "llm_requests_hedged": shared_llm.hedged_requests if shared_llm else 0,
+            "seconds": round(time.monotonic() - start, 3),
+        },
+    }
+    summary_json = json.dumps(summary, indent=2)
+    if args.summary is None:
+        print(summary_json)
+    else:
+        args.summary.parent.mkdir(parents=True, exist_ok=True)
+        args.summary.write_text(summary_json, encoding="utf-8")
+        logger.info(f"Batch summary written to {args.summary}")
+
+    logger.info(f"{len(results) - failed} of {len(results)} manifests generated")
+    return 1 if failed else 0
+
+
+def project_input_fingerprint(
+    export_dir: Path,
+    ux_flows: Path,
+    output: Path,
+    full: bool = False
+) -> str:
+    """Hash of every file generate_project_manifest() reads for one project."""
+    paths = [ux_flows]
+    if export_dir.is_dir():
+        paths += [export_dir / "sections" / name / "README.md" for name in list_export_sections(export_dir)]
+    if not full:
+        paths.append(output)  # the previous manifest drives incremental matching
+
+    digest = hashlib.sha256()
+    for path in paths:
+        digest.update(f"{path}\0".encode())
+        try:
+            digest.update(path.read_bytes())
+        except OSError:
+            digest.update(b"\0missing")
+    return digest.hexdigest()
+
+
+def answer_from_batch_api(
+    args: argparse.Namespace,
+    make_matcher: Callable[[AsyncLLMClient], SectionMatcher],
+    backend: BatchBackend
+) -> Callable[[], SectionMatcher]:
+    """
+    First pass of --batch-api: submit every request the run needs as one batch.
+
+    The projects are run once with a BatchRequestCollector in place of the
+    LLM (nothing is written), the collected requests are submitted and
+    awaited, and the returned matcher factory answers the same requests
+    from the batch results, so the normal run that follows makes no calls.
+    Projects that cannot be matched are left for that run to report.
+
+    Raises:
+        RuntimeError: If the batch fails, or any project's inputs changed
+            while it ran (its answers would no longer fit the rows read then)
+    """
+    collector = BatchRequestCollector()
+
+    if args.projects is None:
+        inputs = {"": (args.export_dir, args.ux_flows, args.output)}
+    else:
+        inputs = {
+            str(root): (
+                root / (args.export_dir or DEFAULT_EXPORT_DIR),
+                root / (args.ux_flows or DEFAULT_UX_FLOWS),
+                root / (args.output or DEFAULT_OUTPUT),
+            )
+            for root in discover_projects(args.projects)
+        }
+
+    def fingerprints() -> dict[str, str]:
+        return {
+            root: project_input_fingerprint(*paths, full=args.full)
+            for root, paths in inputs.items()
+        }
+
+    submitted = fingerprints()
+
+    def collecting_matcher() -> SectionMatcher:
+        return make_matcher(collector)
+
+    if args.projects is None:
+        try:
+            generate_project_manifest(
+                args.export_dir, args.ux_flows, args.output, collecting_matcher(),
+                args.full, args.readme_token_budget
+            )
+        except ValueError:
+            pass
+    else:
+        generate_batch(
+            [Path(root) for root in inputs], collecting_matcher,
+            export_dir=args.export_dir or DEFAULT_EXPORT_DIR,
+            ux_flows=args.ux_flows or DEFAULT_UX_FLOWS,
+            output=args.output or DEFAULT_OUTPUT,
+            full=args.full,
+            readme_token_budget=args.readme_token_budget,
+            dry_run=True,
+            max_projects=args.project_concurrency
+        )
+
+    results: dict[str, dict[str, str]] = {}
+    if collector.requests or args.resume_batch:
+        requests_path = (
+            (args.cache_dir or default_cache_dir()) / "batches"
+            / f"requests-{time.strftime('%Y%m%dT%H%M%S')}-{os.getpid()}.jsonl"
+        )
+        results = run_batch_job(
+            backend, collector.requests, requests_path,
+            args.batch_poll_seconds, args.resume_batch
+        )
+        changed = [root for root, digest in fingerprints().items() if submitted[root] != digest]
+        if changed:
+            raise RuntimeError(
+                "Inputs changed while waiting for the batch, so its answers no longer "
+                f"match them: {', '.join(changed) if args.projects is not None else args.ux_flows.parent}. "
+                "Re-run to submit a new batch."
+            )
+    else:
+        logger.info("Every matching request is cached or local — nothing to submit")
+
+    answers = BatchResultsClient(results)
+    return lambda: make_matcher(answers)
+
 
 # -----------------------------------------------------------------------------
 # Main
@@ -391,79 +2163,236 @@ def main() -> int:
     parser.add_argument(
         "--export-dir",
         type=Path,
-        required=True,
-        help="Path to .charter/design-os-export directory"
+        help=f"Path to .charter/design-os-export directory "
+             f"(with --projects: relative to each root, default {DEFAULT_EXPORT_DIR})"
     )
     parser.add_argument(
         "--ux-flows",
         type=Path,
-        required=True,
-        help="Path to UX-FLOWS.md"
+        help=f"Path to UX-FLOWS.md (with --projects: relative to each root, default {DEFAULT_UX_FLOWS})"
     )
     parser.add_argument(
         "--output",
         type=Path,
-        required=True,
-        help="Output path for manifest.json"
+        help=f"Output path for manifest.json (with --projects: relative to each root, default {DEFAULT_OUTPUT})"
+    )
+    parser.add_argument(
+        "--projects",
+        nargs="+",
+        metavar="ROOT_OR_GLOB",
+        help="Batch mode: generate a manifest for each project root (globs expanded), "
+             "sharing one client, request limit and response deduplication"
+    )
+    parser.add_argument(
+        "--project-concurrency",
+        type=int,
+        default=MAX_CONCURRENT_PROJECTS,
+        help=f"Batch mode: projects processed at once (default: {MAX_CONCURRENT_PROJECTS})"
+    )
+    parser.add_argument(
+        "--summary",
+        type=Path,
+        default=None,
+        help="Batch mode: write the JSON summary report here (default: stdout)"
     )
     parser.add_argument(
         "--dry-run",
         action="store_true",
         help="Print manifest without writing to file"
     )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Always call the LLM instead of reusing cached responses"
+    )
+    parser.add_argument(
+        "--cache-dir",
+        type=Path,
+        default=None,
+        help="LLM response cache directory (default: $XDG_CACHE_HOME/claude-forge/section-manifest)"
+    )
+    parser.add_argument(
+        "--full",
+        action="store_true",
+        help="Re-match every row instead of only rows affected by changes since the existing manifest"
+    )
+    parser.add_argument(
+        "--matcher",
+        choices=sorted(MATCHERS),
+        default="hybrid",
+        help="local: offline lexical matching (no API key); openai: every row to the LLM; "
+             "hybrid: obvious rows locally, the rest to the LLM (default)"
+    )
+    parser.add_argument(
+        "--readme-token-budget",
+        type=int,
+        default=None,
+        help=f"Cap each README excerpt at about this many tokens (default: first {README_MAX_LINES} lines)"
+    )
+    parser.add_argument(
+        "--prompt-token-budget",
+        type=int,
+        default=PROMPT_TOKEN_BUDGET,
+        help=f"Input tokens per LLM request; README excerpts are trimmed to fit "
+             f"(default: {PROMPT_TOKEN_BUDGET}, 0 disables trimming)"
+    )
+    parser.add_argument(
+        "--rows-per-shard",
+        type=int,
+        default=ROWS_PER_SHARD,
+        help=f"Traceability rows per LLM request (default: {ROWS_PER_SHARD})"
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=MAX_CONCURRENT_REQUESTS,
+        help=f"Maximum LLM requests in flight, across all projects in batch mode "
+             f"(default: {MAX_CONCURRENT_REQUESTS})"
+    )
+    parser.add_argument(
+        "--batch-api",
+        action="store_true",
+        help="Send all LLM requests as one OpenAI Batch API job (cheaper, may take hours) and "
+             "wait for it instead of calling the model interactively"
+    )
+    parser.add_argument(
+        "--batch-poll-seconds",
+        type=float,
+        default=BATCH_POLL_SECONDS,
+        help=f"With --batch-api: seconds between batch status checks (default: {BATCH_POLL_SECONDS})"
+    )
+    parser.add_argument(
+        "--resume-batch",
+        metavar="BATCH_ID",
+        default=None,
+        help="With --batch-api: wait for an already submitted batch instead of submitting a new one"
+    )
+    parser.add_argument(
+        "--request-timeout",
+        type=float,
+        default=REQUEST_TIMEOUT_SECONDS,
+        help=f"Seconds each LLM request may take before it is retried (default: {REQUEST_TIMEOUT_SECONDS})"
+    )
+    parser.add_argument(
+        "--hedge-percentile",
+        type=float,
+        default=None,
+        help="Send a duplicate request when one outlives this latency percentile "
+             "of recent requests, e.g. 95 (default: no hedging)"
+    )
 
     args = parser.parse_args()
 
     # Validate inputs
-    if not args.export_dir.exists():
-        logger.error(f"Export directory not found: {args.export_dir}")
+    if args.projects is None:
+        missing = [
+            flag for flag, value in
+            (("--export-dir", args.export_dir), ("--ux-flows", args.ux_flows), ("--output", args.output))
+            if value is None
+        ]
+        if missing:
+            parser.error(f"the following arguments are required: {', '.join(missing)} (or --projects)")
+
+        if not args.export_dir.exists():
+            logger.error(f"Export directory not found: {args.export_dir}")
+            return 1
+
+        if not args.ux_flows.exists():
+            logger.error(f"UX-FLOWS.md not found: {args.ux_flows}")
+            return 1
+
+    if args.rows_per_shard < 1 or args.concurrency < 1 or args.project_concurrency < 1:
+        logger.error("--rows-per-shard, --concurrency and --project-concurrency must be at least 1")
         return 1
 
-    if not args.ux_flows.exists():
-        logger.error(f"UX-FLOWS.md not found: {args.ux_flows}")
+    if args.readme_token_budget is not None and args.readme_token_budget < 1:
+        logger.error("--readme-token-budget must be at least 1")
         return 1
 
-    # Initialize OpenAI client
-    api_key = os.environ.get("OPENAI_API_KEY")
-    if not api_key:
-        logger.error("OPENAI_API_KEY environment variable not set")
+    if args.request_timeout <= 0:
+        logger.error("--request-timeout must be positive")
         return 1
 
-    client = OpenAI(api_key=api_key)
+    if args.hedge_percentile is not None and not 0 < args.hedge_percentile < 100:
+        logger.error("--hedge-percentile must be between 0 and 100")
+        return 1
 
-    # Step 1: Parse traceability matrix
-    logger.info(f"Parsing traceability matrix from {args.ux_flows}")
-    traceability_rows = parse_traceability_matrix(args.ux_flows)
+    if args.prompt_token_budget < 0:
+        logger.error("--prompt-token-budget must not be negative")
+        return 1
 
-    if not traceability_rows:
-        logger.error("No traceability data found — cannot generate manifest")
+    if args.batch_api and args.matcher == "local":
+        logger.error("--batch-api needs an LLM matcher (--matcher hybrid or openai)")
         return 1
 
-    # Step 2: List export sections
-    section_names = list_export_sections(args.export_dir)
-    logger.info(f"Found {len(section_names)} section directories: {section_names}")
+    if args.resume_batch and not args.batch_api:
+        logger.error("--resume-batch requires --batch-api")
+        return 1
 
-    if not section_names:
-        logger.error("No section directories found in export")
+    if args.batch_poll_seconds <= 0:
+        logger.error("--batch-poll-seconds must be positive")
         return 1
 
-    # Step 3: Load section READMEs for context
-    section_readmes = load_section_readmes(args.export_dir, section_names)
+    # Initialize the matcher factory (and the OpenAI client, unless matching locally)
+    shared_llm: AsyncLLMClient | None = None
+    if args.matcher == "local":
+        make_matcher: Callable[[], SectionMatcher] = LocalMatcher
+    else:
+        if OpenAI is None:
+            logger.error(
+                "The openai package is not installed (pip install openai); "
+                "use --matcher local to match offline"
+            )
+            return 1
 
-    # Step 4: Match with LLM
-    section_to_stories = match_sections_with_llm(
-        traceability_rows=traceability_rows,
-        section_names=section_names,
-        section_readmes=section_readmes,
-        client=client
-    )
+        api_key = os.environ.get("OPENAI_API_KEY")
+        if not api_key:
+            logger.error(
+                "OPENAI_API_KEY environment variable not set "
+                "(use --matcher local to match offline)"
+            )
+            return 1
+
+        # Retries, backoff and timeouts are ours; the SDK's own would stack on top
+        client = OpenAI(api_key=api_key, max_retries=0)
+        if args.projects is not None and not args.batch_api:
+            # One connection pool, request limit and dedupe table for the batch
+            shared_llm = AsyncLLMClient(
+                client, args.request_timeout, args.hedge_percentile,
+                max_workers=args.concurrency * args.project_concurrency,
+                max_in_flight=args.concurrency
+            )
 
-    # Step 5: Generate manifest
-    manifest = generate_manifest(
-        section_to_stories=section_to_stories,
-        traceability_rows=traceability_rows,
-        section_names=section_names
-    )
+        def make_matcher(llm: AsyncLLMClient | None = None) -> SectionMatcher:
+            return MATCHERS[args.matcher](
+                client=client,
+                cache=None if args.no_cache else ResponseCache(args.cache_dir or default_cache_dir()),
+                rows_per_shard=args.rows_per_shard,
+                max_concurrency=args.concurrency,
+                token_budget=args.prompt_token_budget or None,
+                request_timeout=args.request_timeout,
+                hedge_percentile=args.hedge_percentile,
+                llm=llm or shared_llm
+            )
+
+        if args.batch_api:
+            try:
+                make_matcher = answer_from_batch_api(args, make_matcher, OpenAIBatchBackend(client))
+            except RuntimeError as e:
+                logger.error(str(e))
+                return 1
+
+    if args.projects is not None:
+        return run_batch(args, make_matcher, shared_llm)
+
+    try:
+        manifest = generate_project_manifest(
+            args.export_dir, args.ux_flows, args.output, make_matcher(),
+            args.full, args.readme_token_budget
+        )
+    except ValueError as e:
+        logger.error(str(e))
+        return 1
 
     # Output
     manifest_json = json.dumps(manifest, indent=2)
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+manifest_lookup.py
+
+Answers "which Design OS sections hold these US-XXX stories?" from a
+manifest.json written by generate-section-manifest.py, in O(1) per story
+rather than by scanning every section's story list.
+
+Manifests carry an inverted "stories" map (US-XXX → section names) next to
+"sections". For manifests written before that map existed, it is rebuilt
+from "sections" once at load time.
+
+Unlike the hyphenated CLI scripts, this module is importable:
+
+    from manifest_lookup import load_manifest_index
+
+    index = load_manifest_index(".charter/design-os-export/manifest.json")
+    index.sections_covering(["US-001", "US-004"])    # ["landing-and-hero", ...]
+    index.sections_for_stories(["US-001", "US-099"])  # {"US-001": [...], "US-099": []}
+
+Usage:
+    python3 manifest_lookup.py <manifest.json> US-001 [US-004 ...]
+    python3 manifest_lookup.py <manifest.json> US-001,US-004
+
+Output:
+    JSON object with "sections" (every section holding at least one of the
+    stories, in export order), "stories" (each story's sections) and
+    "unmapped" (stories no section holds).
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+from typing import Any, Iterable
+
+
+class ManifestIndex:
+    """
+    Story ↔ section lookups over one manifest.
+
+    Lists returned are the index's own; copy them before mutating.
+    """
+
+    def __init__(
+        self,
+        sections: dict[str, list[str]],
+        stories: dict[str, list[str]] | None = None
+    ):
+        self.sections = sections
+        self._rank = {name: i for i, name in enumerate(sections)}
+        if stories is None:
+            stories = {}
+            for name, story_ids in sections.items():
+                for story_id in story_ids:
+                    stories.setdefault(story_id, []).append(name)
+        self.stories = stories
+
+    @classmethod
+    def from_manifest(cls, manifest: dict[str, Any]) -> "ManifestIndex":
+        """
+        Build from a parsed manifest.json, with or without a "stories" map.
+
+        Raises:
+            ValueError: If "sections" is missing, or "stories" names a section
+                that "sections" does not have (hand-edited or truncated files)
+        """
+        sections = manifest.get("sections")
+        if not isinstance(sections, dict):
+            raise ValueError("Manifest has no \"sections\" mapping")
+        stories = manifest.get("stories")
+        if not isinstance(stories, dict):
+            return cls(sections, None)
+        unknown = sorted({
+            name for names in stories.values() for name in names if name not in sections
+        })
+        if unknown:
+            raise ValueError(
+                f"\"stories\" names sections missing from \"sections\": {', '.join(unknown)}"
+            )
+        return cls(sections, stories)
+
+    def sections_for(self, story_id: str) -> list[str]:
+        """Sections holding story_id, in export order ([] if none)."""
+        return self.stories.get(story_id, [])
+
+    def sections_for_stories(self, story_ids: Iterable[str]) -> dict[str, list[str]]:
+        """Each story's sections, keyed in the order given."""
+        return {story_id: self.sections_for(story_id) for story_id in story_ids}
+
+    def sections_covering(self, story_ids: Iterable[str]) -> list[str]:
+        """Every section holding at least one of story_ids, in export order."""
+        found = {name for story_id in story_ids for name in self.sections_for(story_id)}
+        return sorted(found, key=self._rank.__getitem__)
+
+    def unmapped(self, story_ids: Iterable[str]) -> list[str]:
+        """The story_ids no section holds, in the order given."""
+        return [story_id for story_id in story_ids if story_id not in self.stories]
+
+    def stories_in(self, section: str) -> list[str]:
+        """Story IDs of one section ([] for unknown sections)."""
+        return self.sections.get(section, [])
+
+
+def load_manifest_index(path: Path | str) -> ManifestIndex:
+    """
+    Read manifest.json into a ManifestIndex.
+
+    Raises:
+        OSError: If the file cannot be read
+        ValueError: If it is not a manifest (json.JSONDecodeError included)
+    """
+    with open(path, encoding="utf-8") as f:
+        return ManifestIndex.from_manifest(json.load(f))
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description="Look up which Design OS sections hold the given US-XXX stories"
+    )
+    parser.add_argument("manifest", type=Path, help="Path to manifest.json")
+    parser.add_argument(
+        "story_ids",
+        nargs="+",
+        help="US-XXX IDs, space- or comma-separated"
+    )
+    args = parser.parse_args()
+
+    story_ids = list(dict.fromkeys(
+        part.strip() for arg in args.story_ids for part in arg.split(",") if part.strip()
+    ))
+
+    try:
+        index = load_manifest_index(args.manifest)
+    except (OSError, ValueError) as e:
+        print(f"Error: cannot read manifest {args.manifest}: {e}", file=sys.stderr)
+        return 1
+
+    print(json.dumps({
+        "sections": index.sections_covering(story_ids),
+        "stories": index.sections_for_stories(story_ids),
+        "unmapped": index.unmapped(story_ids),
+    }, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
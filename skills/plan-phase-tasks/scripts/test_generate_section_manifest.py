@@ -13,14 +13,18 @@ import re
 import pytest
 from pathlib import Path
 from typing import Any
-from unittest.mock import Mock, patch, MagicMock
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import AsyncMock, Mock, patch, MagicMock
 
 # Import the real module via importlib (hyphenated filename isn't a valid Python
-# module name). Mock openai first since the module has a top-level import.
+# module name). Mock openai first so the LLM backends can be exercised.
+import asyncio
 import importlib.util
 import os
 import sys
 import tempfile
+import threading
+import time
 
 sys.modules['openai'] = MagicMock()
 
@@ -30,16 +34,46 @@ _mod = importlib.util.module_from_spec(_spec)
 _spec.loader.exec_module(_mod)
 
 parse_traceability_matrix = _mod.parse_traceability_matrix
+iter_traceability_rows = _mod.iter_traceability_rows
 generate_manifest = _mod.generate_manifest
 list_export_sections = _mod.list_export_sections
 load_section_readmes = _mod.load_section_readmes
+read_readme_excerpt = _mod.read_readme_excerpt
+estimate_tokens = _mod.estimate_tokens
 build_matching_prompt = _mod.build_matching_prompt
+plan_matching_prompt = _mod.plan_matching_prompt
+trim_to_token_budget = _mod.trim_to_token_budget
+count_tokens = _mod.count_tokens
 match_sections_with_llm = _mod.match_sections_with_llm
+discover_projects = _mod.discover_projects
+LocalBatchBackend = _mod.LocalBatchBackend
+BatchResultsClient = _mod.BatchResultsClient
+parse_batch_output = _mod.parse_batch_output
+run_batch_job = _mod.run_batch_job
+AsyncLLMClient = _mod.AsyncLLMClient
+LatencyTracker = _mod.LatencyTracker
+backoff_delay = _mod.backoff_delay
+retry_after_seconds = _mod.retry_after_seconds
+ResponseCache = _mod.ResponseCache
+shard_traceability_rows = _mod.shard_traceability_rows
+match_sections_sharded = _mod.match_sections_sharded
+merge_section_matches = _mod.merge_section_matches
+LexicalMatcher = _mod.LexicalMatcher
+prematch_rows = _mod.prematch_rows
+plan_incremental_update = _mod.plan_incremental_update
+load_previous_manifest = _mod.load_previous_manifest
+row_hash = _mod.row_hash
 MAX_RETRIES = _mod.MAX_RETRIES
 RETRY_DELAY_SECONDS = _mod.RETRY_DELAY_SECONDS
 main = _mod.main
 
 
+@pytest.fixture(autouse=True)
+def _isolated_cache_home(tmp_path, monkeypatch):
+    """Keep the LLM response cache out of the real ~/.cache during tests."""
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "xdg-cache"))
+
+
 def _parse_from_string(content: str) -> list[dict]:
     """Test helper: the real parse_traceability_matrix takes a Path.
     This writes content to a temp file so unit tests can pass strings."""
@@ -235,6 +269,26 @@ class TestGenerateManifest:
         assert manifest["sections"]["hook-catalog"] == ["US-004", "US-006"]
         assert manifest["metadata"]["unmapped_stories"] == "none"
 
+    def test_emits_inverted_story_index(self):
+        """stories maps each US-XXX to its sections, in export order."""
+        section_to_stories = {
+            "hook-catalog": ["US-004", "US-001"],
+            "landing-and-hero": ["US-001"],
+            "filter-system": [],
+        }
+        rows = [{"ux_element": "Hero", "story_id": "US-001"}]
+        section_names = ["landing-and-hero", "hook-catalog", "filter-system"]
+
+        manifest = generate_manifest(section_to_stories, rows, section_names)
+
+        assert manifest["stories"] == {
+            "US-001": ["landing-and-hero", "hook-catalog"],
+            "US-004": ["hook-catalog"],
+        }
+        assert list(manifest["stories"]) == sorted(manifest["stories"])
+        for story_id, sections in manifest["stories"].items():
+            assert all(story_id in manifest["sections"][name] for name in sections)
+
     def test_includes_missing_sections(self):
         """Include sections with no story matches."""
         section_to_stories = {
@@ -564,6 +618,80 @@ class TestLoadSectionReadmes:
         assert lines[49] == "Line 49"
 
 
+class TestReadReadmeExcerpt:
+    """Tests for bounded, streamed README reading."""
+
+    @pytest.mark.parametrize("content", [
+        "",
+        "one line",
+        "a\nb\n",
+        "\n".join(f"Line {i}" for i in range(50)),
+        "\n".join(f"Line {i}" for i in range(50)) + "\n",
+        "\n".join(f"Line {i}" for i in range(51)),
+        "\r\n".join(f"Line {i}" for i in range(80)) + "\r\n",
+    ])
+    def test_matches_split_semantics(self, tmp_path, content):
+        """Excerpt equals the old read_text().split(newline)[:50] join."""
+        readme = tmp_path / "README.md"
+        readme.write_bytes(content.encode("utf-8"))
+
+        expected = "\n".join(readme.read_text(encoding="utf-8").split("\n")[:50])
+        assert read_readme_excerpt(readme) == expected
+
+    def test_does_not_read_past_needed_lines(self, tmp_path, monkeypatch):
+        """Only the first lines of a huge README are consumed."""
+        readme = tmp_path / "README.md"
+        readme.write_text("# Title\n" + "x" * 80 + "\n" * 200_000)
+        consumed = []
+        real_open = open
+
+        def tracking_open(*args, **kwargs):
+            f = real_open(*args, **kwargs)
+            real_close = f.close
+
+            def close():
+                consumed.append(f.buffer.raw.tell())
+                real_close()
+
+            f.close = close
+            return f
+
+        monkeypatch.setattr("builtins.open", tracking_open)
+        read_readme_excerpt(readme, max_lines=3)
+        assert consumed and consumed[0] < 64 * 1024
+
+    def test_token_budget_stops_early(self, tmp_path):
+        """Lines are dropped once the token estimate would exceed the budget."""
+        readme = tmp_path / "README.md"
+        readme.write_text("".join(f"{'w' * 39}\n" for _ in range(20)))  # 10 tokens per line
+
+        excerpt = read_readme_excerpt(readme, token_budget=35)
+        assert excerpt.count("\n") == 3
+        assert estimate_tokens(excerpt) <= 35
+
+    def test_token_budget_truncates_single_long_line(self, tmp_path):
+        """A first line larger than the budget is cut rather than dropped."""
+        readme = tmp_path / "README.md"
+        readme.write_text("y" * 1000)
+
+        assert read_readme_excerpt(readme, token_budget=10) == "y" * 40
+
+    def test_parallel_load_preserves_section_order(self, tmp_path):
+        """Concurrent loading returns sections in the requested order."""
+        sections_dir = tmp_path / "sections"
+        names = [f"section-{i:02d}" for i in range(40)]
+        for name in names[::2]:
+            (sections_dir / name).mkdir(parents=True)
+            (sections_dir / name / "README.md").write_text(f"# {name}")
+        for name in names[1::2]:
+            (sections_dir / name).mkdir(parents=True)
+
+        result = load_section_readmes(tmp_path, names, max_workers=8)
+        assert list(result) == names
+        assert result["section-00"] == "# section-00"
+        assert result["section-01"] == "No README found for section-01"
+
+
 # =============================================================================
 # Prompt Building Tests
 # =============================================================================
@@ -1019,6 +1147,139 @@ Note: Some elements may be derived from multiple sources.
         assert rows == []
 
 
+def _regex_traceability_baseline(content: str) -> list[dict]:
+    """The previous whole-document DOTALL regex parser, for comparison."""
+    section_match = re.search(
+        r"##\s*(?:Section\s*)?11[:\.]?\s*Traceability.*?\n(.*?)(?=\n##\s|\Z)",
+        content,
+        re.DOTALL | re.IGNORECASE
+    )
+    if not section_match:
+        return []
+    rows = []
+    for line in section_match.group(1).split("\n"):
+        line = line.strip()
+        if not line or line.startswith("|--") or "---" in line or not line.startswith("|"):
+            continue
+        cells = [c for c in (cell.strip() for cell in line.split("|")) if c]
+        if len(cells) < 3 or cells[0].lower() == "ux element":
+            continue
+        for us_num in re.findall(r"US-(\d{3})", cells[2]):
+            rows.append({"ux_element": cells[0], "story_id": f"US-{us_num}"})
+    return rows
+
+
+def _synthetic_ux_flows(prose_lines: int, table_rows: int) -> str:
+    """UX-FLOWS.md with long prose sections 1-10, the matrix, and a Section 12."""
+    parts = []
+    for section in range(1, 11):
+        parts.append(f"## Section {section}: Flow {section}\n\n")
+        parts.append("".join(
+            f"- Step {i}: the user opens panel {i} and sees US-{i % 1000:03d} mentioned | inline |\n"
+            for i in range(prose_lines // 10)
+        ))
+        parts.append(f"\n### {section}.1 Notes\n\nSM-{section:03d} applies here.\n\n")
+    parts.append("## Section 11: Traceability Matrix\n\n")
+    parts.append("| UX Element | Plan Section | Source ID | Source Description |\n")
+    parts.append("|------------|--------------|-----------|--------------------|\n")
+    for i in range(table_rows):
+        ids = f"SM-{i % 200:03d} / US-{i % 1000:03d}"
+        if i % 7 == 0:
+            ids += f", US-{(i + 1) % 1000:03d}"
+        parts.append(f"| Element {i} | S{i % 9} | {ids} | Does thing {i} |\n")
+        if i % 500 == 0:
+            parts.append(f"\n### 11.{i // 500} Group\n\n")
+    parts.append("\n## Section 12: Appendix\n\n| Late row | S1 | US-999 | never parsed |\n")
+    return "".join(parts)
+
+
+class TestStreamingTraceabilityParser:
+    """Tests for the line-streaming iter_traceability_rows state machine."""
+
+    def test_matches_regex_parser(self, tmp_path):
+        """Same rows as the previous regex parser, ### subheadings included."""
+        content = _synthetic_ux_flows(prose_lines=200, table_rows=1200)
+        path = tmp_path / "UX-FLOWS.md"
+        path.write_text(content, encoding="utf-8")
+
+        rows = parse_traceability_matrix(path)
+        assert rows == _regex_traceability_baseline(content)
+        assert len(rows) > 1200
+        assert {"ux_element": "Late row", "story_id": "US-999"} not in rows
+
+    def test_crlf_line_endings(self, tmp_path):
+        content = _synthetic_ux_flows(prose_lines=20, table_rows=30)
+        path = tmp_path / "UX-FLOWS.md"
+        path.write_bytes(content.replace("\n", "\r\n").encode("utf-8"))
+
+        assert parse_traceability_matrix(path) == _regex_traceability_baseline(content)
+
+    def test_stops_reading_at_next_section(self):
+        """Lines after the next level-2 heading are never pulled."""
+        def lines():
+            yield "## 11. Traceability\n"
+            yield "| Hero | S1 | US-001 | x |\n"
+            yield "## 12. Next\n"
+            raise AssertionError("read past the traceability section")
+
+        rows = list(iter_traceability_rows(lines()))
+        assert rows == [{"ux_element": "Hero", "story_id": "US-001"}]
+
+    def test_accepts_any_iterable_of_lines(self):
+        lines = ["# UX Flows\n", "## Traceability Matrix (Section 11)\n",
+                 "## Section 11: Traceability\n", "| Card | S2 | US-004, US-005 | y |\n"]
+        assert [r["story_id"] for r in iter_traceability_rows(lines)] == ["US-004", "US-005"]
+
+
+@pytest.mark.benchmark
+@pytest.mark.skipif(
+    not os.environ.get("RUN_BENCHMARKS"),
+    reason="Set RUN_BENCHMARKS=1 to run throughput benchmarks",
+)
+class TestTraceabilityParserBenchmark:
+    """Throughput and memory on a synthetic ~50 MB UX-FLOWS.md."""
+
+    @pytest.fixture(scope="class")
+    @classmethod
+    def big_ux_flows(cls, tmp_path_factory):
+        path = tmp_path_factory.mktemp("bench") / "UX-FLOWS.md"
+        path.write_text(_synthetic_ux_flows(prose_lines=560_000, table_rows=100_000), encoding="utf-8")
+        return path
+
+    def test_streaming_parser_vs_regex(self, big_ux_flows):
+        size_mb = big_ux_flows.stat().st_size / 1e6
+
+        start = time.perf_counter()
+        baseline = _regex_traceability_baseline(big_ux_flows.read_text(encoding="utf-8"))
+        baseline_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        rows = parse_traceability_matrix(big_ux_flows)
+        streaming_s = time.perf_counter() - start
+
+        print(
+            f"\n{size_mb:.0f} MB: regex {size_mb / baseline_s:.0f} MB/s, "
+            f"streaming {size_mb / streaming_s:.0f} MB/s ({baseline_s / streaming_s:.1f}x)"
+        )
+        assert size_mb >= 45
+        assert rows == baseline
+        assert streaming_s < baseline_s
+
+    def test_streaming_parser_memory(self, big_ux_flows):
+        """Peak memory is bounded by the rows, not by the file."""
+        import tracemalloc
+
+        with open(big_ux_flows, encoding="utf-8") as f:
+            tracemalloc.start()
+            row_count = sum(1 for _ in iter_traceability_rows(f))
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+        print(f"\n{row_count:,} rows streamed, peak {peak / 1e6:.2f} MB traced")
+        assert row_count > 100_000
+        assert peak < 1_000_000
+
+
 # =============================================================================
 # More Edge Cases for generate_manifest
 # =============================================================================
@@ -2521,7 +2782,7 @@ class TestMatchSectionsRetryLogic:
         assert result == {"main": ["US-001"]}
         assert client.chat.completions.create.call_count == 1
 
-    @patch("time.sleep")
+    @patch.object(AsyncLLMClient, "sleep", new_callable=AsyncMock)
     def test_retries_on_rate_limit_then_succeeds(self, mock_sleep):
         """Retries after RateLimitError, then succeeds."""
         valid_response = _make_mock_openai_response('{"main": ["US-001"]}')
@@ -2537,7 +2798,7 @@ class TestMatchSectionsRetryLogic:
         assert client.chat.completions.create.call_count == 2
         mock_sleep.assert_called()
 
-    @patch("time.sleep")
+    @patch.object(AsyncLLMClient, "sleep", new_callable=AsyncMock)
     def test_retries_on_api_error_then_succeeds(self, mock_sleep):
         """Retries after APIError, then succeeds."""
         valid_response = _make_mock_openai_response('{"main": ["US-001"]}')
@@ -2552,7 +2813,7 @@ class TestMatchSectionsRetryLogic:
         assert result == {"main": ["US-001"]}
         assert client.chat.completions.create.call_count == 2
 
-    @patch("time.sleep")
+    @patch.object(AsyncLLMClient, "sleep", new_callable=AsyncMock)
     def test_raises_after_max_retries_on_api_error(self, mock_sleep):
         """Raises RuntimeError after MAX_RETRIES consecutive API errors."""
         client = _make_mock_client([
@@ -2567,7 +2828,7 @@ class TestMatchSectionsRetryLogic:
             )
         assert client.chat.completions.create.call_count == MAX_RETRIES
 
-    @patch("time.sleep")
+    @patch.object(AsyncLLMClient, "sleep", new_callable=AsyncMock)
     def test_retries_on_invalid_json_then_succeeds(self, mock_sleep):
         """Retries when LLM returns invalid JSON, then succeeds."""
         bad_response = _make_mock_openai_response("not json at all")
@@ -2580,7 +2841,7 @@ class TestMatchSectionsRetryLogic:
         assert result == {"main": ["US-001"]}
         assert client.chat.completions.create.call_count == 2
 
-    @patch("time.sleep")
+    @patch.object(AsyncLLMClient, "sleep", new_callable=AsyncMock)
     def test_raises_after_max_retries_on_invalid_json(self, mock_sleep):
         """Raises RuntimeError after MAX_RETRIES of invalid JSON."""
         bad = _make_mock_openai_response("not json")
@@ -2591,7 +2852,7 @@ class TestMatchSectionsRetryLogic:
                 _MINIMAL_ROWS, _MINIMAL_SECTIONS, _MINIMAL_READMES, client
             )
 
-    @patch("time.sleep")
+    @patch.object(AsyncLLMClient, "sleep", new_callable=AsyncMock)
     def test_retries_on_validation_failure_then_succeeds(self, mock_sleep):
         """Retries when LLM returns wrong structure, then succeeds."""
         # Valid JSON but wrong structure (list instead of dict)
@@ -2604,7 +2865,7 @@ class TestMatchSectionsRetryLogic:
         )
         assert result == {"main": ["US-001"]}
 
-    @patch("time.sleep")
+    @patch.object(AsyncLLMClient, "sleep", new_callable=AsyncMock)
     def test_retries_on_non_us_prefix_ids(self, mock_sleep):
         """Retries when LLM returns SM-XXX instead of US-XXX."""
         bad_response = _make_mock_openai_response('{"main": ["SM-001"]}')
@@ -2616,7 +2877,7 @@ class TestMatchSectionsRetryLogic:
         )
         assert result == {"main": ["US-001"]}
 
-    @patch("time.sleep")
+    @patch.object(AsyncLLMClient, "sleep", new_callable=AsyncMock)
     def test_retries_on_non_list_values(self, mock_sleep):
         """Retries when LLM returns string values instead of lists."""
         bad_response = _make_mock_openai_response('{"main": "US-001"}')
@@ -2705,6 +2966,42 @@ class TestMainCLI:
         ]
         assert main() == 1
 
+    def _load_without_openai(self, monkeypatch):
+        """A fresh copy of the script, imported with the openai package absent."""
+        monkeypatch.setitem(sys.modules, "openai", None)  # makes `import openai` fail
+        spec = importlib.util.spec_from_file_location("gsm_without_openai", _script_path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        return module
+
+    def test_local_matcher_runs_without_openai(self, tmp_path, monkeypatch):
+        """--matcher local is the air-gapped path: no SDK, no key."""
+        module = self._load_without_openai(monkeypatch)
+        monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+        export = self._setup_export_dir(tmp_path)
+        output = tmp_path / "manifest.json"
+        sys.argv = [
+            "generate-section-manifest.py", "--matcher", "local",
+            "--export-dir", str(export),
+            "--ux-flows", str(self._setup_ux_flows(tmp_path)),
+            "--output", str(output),
+        ]
+        assert module.OpenAI is None
+        assert module.main() == 0
+        assert json.loads(output.read_text())["metadata"]["matcher"] == "local"
+
+    def test_llm_matcher_without_openai_returns_1(self, tmp_path, monkeypatch, caplog):
+        module = self._load_without_openai(monkeypatch)
+        monkeypatch.setenv("OPENAI_API_KEY", "fake-key")
+        sys.argv = [
+            "generate-section-manifest.py", "--matcher", "openai",
+            "--export-dir", str(self._setup_export_dir(tmp_path)),
+            "--ux-flows", str(self._setup_ux_flows(tmp_path)),
+            "--output", str(tmp_path / "manifest.json"),
+        ]
+        assert module.main() == 1
+        assert "pip install openai" in caplog.text
+
     def test_missing_api_key_returns_1(self, tmp_path, monkeypatch):
         """main() returns 1 when OPENAI_API_KEY is not set."""
         export = self._setup_export_dir(tmp_path)
@@ -2807,6 +3104,1492 @@ class TestMainCLI:
         assert manifest["sections"]["main-section"] == ["US-001"]
 
 
+# ===========================================================================
+# LLM response cache (mocked OpenAI)
+# ===========================================================================
+
+class TestResponseCache:
+    """Tests for the content-addressed ResponseCache."""
+
+    def test_key_depends_on_every_input(self):
+        """Changing model, prompts or temperature changes the key."""
+        base = ResponseCache.key("m", "sys", "user", 0.0)
+        assert base == ResponseCache.key("m", "sys", "user", 0.0)
+        assert base != ResponseCache.key("m2", "sys", "user", 0.0)
+        assert base != ResponseCache.key("m", "sys2", "user", 0.0)
+        assert base != ResponseCache.key("m", "sys", "user2", 0.0)
+        assert base != ResponseCache.key("m", "sys", "user", 0.5)
+
+    def test_round_trip_counts_hits_and_misses(self, tmp_path):
+        cache = ResponseCache(tmp_path / "cache")
+        assert cache.get("abc") is None
+        cache.put("abc", {"main": ["US-001"]})
+        assert cache.get("abc") == {"main": ["US-001"]}
+        assert (cache.hits, cache.misses) == (1, 1)
+
+    def test_corrupt_entry_is_a_miss(self, tmp_path):
+        cache = ResponseCache(tmp_path)
+        (tmp_path / "abc.json").write_text("not json")
+        (tmp_path / "def.json").write_text('["US-001"]')
+        assert cache.get("abc") is None
+        assert cache.get("def") is None
+        assert cache.misses == 2
+
+    def test_evicts_least_recently_used(self, tmp_path):
+        """Over budget, the entry read least recently is removed first."""
+        entry_size = len(json.dumps({"main": ["US-001"]}))
+        cache = ResponseCache(tmp_path, max_bytes=entry_size * 2)
+        cache.put("a", {"main": ["US-001"]})
+        cache.put("b", {"main": ["US-001"]})
+        os.utime(tmp_path / "a.json", ns=(1, 1))
+        os.utime(tmp_path / "b.json", ns=(2, 2))
+        assert cache.get("a") is not None  # a is now the most recent
+
+        cache.put("c", {"main": ["US-001"]})
+        assert sorted(p.name for p in tmp_path.glob("*.json")) == ["a.json", "c.json"]
+
+    def test_match_uses_cache_on_second_call(self, tmp_path):
+        """Identical inputs are answered from the cache without an API call."""
+        cache = ResponseCache(tmp_path)
+        client = _make_mock_client([_make_mock_openai_response('{"main": ["US-001"]}')])
+
+        first = match_sections_with_llm(
+            _MINIMAL_ROWS, _MINIMAL_SECTIONS, _MINIMAL_READMES, client, cache=cache
+        )
+        second = match_sections_with_llm(
+            _MINIMAL_ROWS, _MINIMAL_SECTIONS, _MINIMAL_READMES, client, cache=cache
+        )
+        assert first == second == {"main": ["US-001"]}
+        assert client.chat.completions.create.call_count == 1
+        assert (cache.hits, cache.misses) == (1, 1)
+
+    def test_changed_readme_misses(self, tmp_path):
+        cache = ResponseCache(tmp_path)
+        client = _make_mock_client([
+            _make_mock_openai_response('{"main": ["US-001"]}'),
+            _make_mock_openai_response('{"main": []}'),
+        ])
+        match_sections_with_llm(_MINIMAL_ROWS, _MINIMAL_SECTIONS, _MINIMAL_READMES, client, cache=cache)
+        result = match_sections_with_llm(
+            _MINIMAL_ROWS, _MINIMAL_SECTIONS, {"main": "# Renamed"}, client, cache=cache
+        )
+        assert result == {"main": []}
+        assert client.chat.completions.create.call_count == 2
+
+    @patch.object(AsyncLLMClient, "sleep", new_callable=AsyncMock)
+    def test_failed_call_is_not_cached(self, mock_sleep, tmp_path):
+        cache = ResponseCache(tmp_path)
+        bad = _make_mock_openai_response("not json")
+        client = _make_mock_client([bad, bad, bad])
+        with pytest.raises(RuntimeError):
+            match_sections_with_llm(
+                _MINIMAL_ROWS, _MINIMAL_SECTIONS, _MINIMAL_READMES, client, cache=cache
+            )
+        assert list(tmp_path.glob("*.json")) == []
+
+    def test_generate_manifest_reports_cache_stats(self, tmp_path):
+        cache = ResponseCache(tmp_path)
+        cache.hits, cache.misses = 2, 1
+        manifest = generate_manifest({"sec": ["US-001"]}, [{"ux_element": "A", "story_id": "US-001"}], ["sec"], cache=cache)
+        assert manifest["metadata"]["llm_cache_hits"] == "2"
+        assert manifest["metadata"]["llm_cache_misses"] == "1"
+
+        manifest = generate_manifest({"sec": ["US-001"]}, [{"ux_element": "A", "story_id": "US-001"}], ["sec"])
+        assert "llm_cache_hits" not in manifest["metadata"]
+
+
+class TestMainCLICache:
+    """main() with the response cache enabled and with --no-cache."""
+
+    def _run(self, tmp_path, client, *extra):
+        cli = TestMainCLI()
+        export = tmp_path / "export"
+        if not export.exists():
+            cli._setup_export_dir(tmp_path)
+        ux = cli._setup_ux_flows(tmp_path)
+        output = tmp_path / "manifest.json"
+        sys.argv = [
+            "generate-section-manifest.py",
+            "--export-dir", str(export),
+            "--ux-flows", str(ux),
+            "--output", str(output),
+            "--cache-dir", str(tmp_path / "cache"),
+            "--full",  # Re-match every run so the cache, not the previous manifest, answers
+            *extra,
+        ]
+        with patch.object(_mod, "OpenAI", return_value=client):
+            assert main() == 0
+        return json.loads(output.read_text())
+
+    def test_rerun_is_served_from_cache(self, tmp_path, monkeypatch):
+        monkeypatch.setenv("OPENAI_API_KEY", "fake-key")
+        client = Mock()
+        client.chat.completions.create = Mock(
+            return_value=_make_mock_openai_response('{"main-section": ["US-001"]}')
+        )
+
+        first = self._run(tmp_path, client)
+        second = self._run(tmp_path, client)
+
+        assert client.chat.completions.create.call_count == 1
+        assert first["sections"] == second["sections"]
+        assert (first["metadata"]["llm_cache_hits"], first["metadata"]["llm_cache_misses"]) == ("0", "1")
+        assert (second["metadata"]["llm_cache_hits"], second["metadata"]["llm_cache_misses"]) == ("1", "0")
+
+    def test_no_cache_always_calls_llm(self, tmp_path, monkeypatch):
+        monkeypatch.setenv("OPENAI_API_KEY", "fake-key")
+        client = Mock()
+        client.chat.completions.create = Mock(
+            return_value=_make_mock_openai_response('{"main-section": ["US-001"]}')
+        )
+
+        self._run(tmp_path, client)
+        manifest = self._run(tmp_path, client, "--no-cache")
+
+        assert client.chat.completions.create.call_count == 2
+        assert "llm_cache_hits" not in manifest["metadata"]
+
+
+# ===========================================================================
+# Sharded, concurrent matching (mocked OpenAI)
+# ===========================================================================
+
+def _rows(n: int) -> list[dict]:
+    return [{"ux_element": f"Element {i}", "story_id": f"US-{i:03d}"} for i in range(1, n + 1)]
+
+
+def _echo_client(delay: float = 0.0) -> Mock:
+    """Mock client that assigns every story ID in the prompt to section 'main'."""
+    def create(**kwargs):
+        time.sleep(delay)
+        prompt = kwargs["messages"][1]["content"]
+        ids = sorted(set(re.findall(r"US-\d{3}", prompt.split("## Section Directories")[0])))
+        return _make_mock_openai_response(json.dumps({"main": ids, "empty": []}))
+
+    client = Mock()
+    client.chat.completions.create = Mock(side_effect=create)
+    return client
+
+
+class TestShardTraceabilityRows:
+    """Tests for shard_traceability_rows."""
+
+    def test_splits_into_consecutive_batches(self):
+        shards = shard_traceability_rows(_rows(5), rows_per_shard=2)
+        assert [len(s) for s in shards] == [2, 2, 1]
+        assert [row for shard in shards for row in shard] == _rows(5)
+
+    def test_small_input_is_one_shard(self):
+        assert shard_traceability_rows(_rows(3), rows_per_shard=40) == [_rows(3)]
+
+    def test_empty_input_is_one_empty_shard(self):
+        assert shard_traceability_rows([], rows_per_shard=2) == [[]]
+
+    def test_rejects_non_positive_size(self):
+        with pytest.raises(ValueError):
+            shard_traceability_rows(_rows(3), rows_per_shard=0)
+
+
+class TestMergeSectionMatches:
+    """Tests for merge_section_matches."""
+
+    def test_unions_and_sorts(self):
+        merged = merge_section_matches([
+            {"b": ["US-003", "US-001"], "a": []},
+            {"b": ["US-001", "US-002"], "c": ["US-009"]},
+        ])
+        assert merged == {"a": [], "b": ["US-001", "US-002", "US-003"], "c": ["US-009"]}
+        assert list(merged) == ["a", "b", "c"]
+
+    def test_order_independent(self):
+        results = [{"x": ["US-002"]}, {"x": ["US-001"], "y": ["US-003"]}]
+        assert merge_section_matches(results) == merge_section_matches(results[::-1])
+
+    def test_empty(self):
+        assert merge_section_matches([]) == {}
+
+
+class TestMatchSectionsSharded:
+    """Tests for match_sections_sharded."""
+
+    def test_one_request_per_shard(self):
+        client = _echo_client()
+        results = match_sections_sharded(
+            _rows(5), _MINIMAL_SECTIONS, _MINIMAL_READMES, client, rows_per_shard=2
+        )
+        assert client.chat.completions.create.call_count == 3
+        assert [r["main"] for r in results] == [
+            ["US-001", "US-002"], ["US-003", "US-004"], ["US-005"]
+        ]
+
+    def test_single_shard_matches_unsharded_prompt(self):
+        client = _echo_client()
+        match_sections_sharded(_MINIMAL_ROWS, _MINIMAL_SECTIONS, _MINIMAL_READMES, client)
+        prompt = client.chat.completions.create.call_args.kwargs["messages"][1]["content"]
+        assert prompt == build_matching_prompt(_MINIMAL_ROWS, _MINIMAL_SECTIONS, _MINIMAL_READMES)
+
+    def test_respects_concurrency_limit(self):
+        in_flight = 0
+        peak = 0
+        lock = threading.Lock()
+        echo = _echo_client().chat.completions.create.side_effect
+
+        def create(**kwargs):
+            nonlocal in_flight, peak
+            with lock:
+                in_flight += 1
+                peak = max(peak, in_flight)
+            time.sleep(0.02)
+            with lock:
+                in_flight -= 1
+            return echo(**kwargs)
+
+        client = Mock()
+        client.chat.completions.create = Mock(side_effect=create)
+        match_sections_sharded(
+            _rows(8), _MINIMAL_SECTIONS, _MINIMAL_READMES, client,
+            rows_per_shard=1, max_concurrency=3
+        )
+        assert client.chat.completions.create.call_count == 8
+        assert 1 < peak <= 3
+
+    def test_merged_result_is_deterministic(self):
+        merged = [
+            merge_section_matches(match_sections_sharded(
+                _rows(9), _MINIMAL_SECTIONS, _MINIMAL_READMES, _echo_client(),
+                rows_per_shard=size, max_concurrency=4
+            ))
+            for size in (1, 2, 9)
+        ]
+        assert merged[0] == merged[1] == merged[2]
+        assert merged[0]["main"] == [f"US-{i:03d}" for i in range(1, 10)]
+
+    @patch.object(AsyncLLMClient, "sleep", new_callable=AsyncMock)
+    def test_failing_shard_raises(self, mock_sleep):
+        good = _make_mock_openai_response('{"main": ["US-001"]}')
+        bad = _make_mock_openai_response("not json")
+        client = _make_mock_client([good, bad, bad, bad])
+        with pytest.raises(RuntimeError, match="invalid response"):
+            match_sections_sharded(
+                _rows(2), _MINIMAL_SECTIONS, _MINIMAL_READMES, client,
+                rows_per_shard=1, max_concurrency=1
+            )
+
+    def test_shards_share_the_cache(self, tmp_path):
+        cache = ResponseCache(tmp_path)
+        client = _echo_client()
+        for _ in range(2):
+            match_sections_sharded(
+                _rows(4), _MINIMAL_SECTIONS, _MINIMAL_READMES, client,
+                cache=cache, rows_per_shard=2
+            )
+        assert client.chat.completions.create.call_count == 2
+        assert (cache.hits, cache.misses) == (2, 2)
+
+    def test_main_shards_and_merges(self, tmp_path, monkeypatch):
+        monkeypatch.setenv("OPENAI_API_KEY", "fake-key")
+        export = tmp_path / "export"
+        (export / "sections" / "main").mkdir(parents=True)
+        ux = tmp_path / "UX-FLOWS.md"
+        ux.write_text(
+            "## Section 11: Traceability Matrix\n\n"
+            "| UX Element | Plan Section | Source ID | Desc |\n"
+            "|---|---|---|---|\n"
+            + "".join(f"| Element {i} | S1 | US-{i:03d} | d |\n" for i in range(1, 6))
+        )
+        output = tmp_path / "manifest.json"
+        client = _echo_client()
+        sys.argv = [
+            "generate-section-manifest.py",
+            "--export-dir", str(export), "--ux-flows", str(ux), "--output", str(output),
+            "--no-cache", "--rows-per-shard", "2", "--concurrency", "2",
+        ]
+        with patch.object(_mod, "OpenAI", return_value=client):
+            assert main() == 0
+
+        manifest = json.loads(output.read_text())
+        assert client.chat.completions.create.call_count == 3
+        assert manifest["sections"] == {"main": [f"US-{i:03d}" for i in range(1, 6)]}
+        assert manifest["metadata"]["unmapped_stories"] == "none"
+
+    def test_main_rejects_zero_concurrency(self, tmp_path, monkeypatch):
+        monkeypatch.setenv("OPENAI_API_KEY", "fake-key")
+        cli = TestMainCLI()
+        sys.argv = [
+            "generate-section-manifest.py",
+            "--export-dir", str(cli._setup_export_dir(tmp_path)),
+            "--ux-flows", str(cli._setup_ux_flows(tmp_path)),
+            "--output", str(tmp_path / "manifest.json"),
+            "--concurrency", "0",
+        ]
+        assert main() == 1
+
+
+# ===========================================================================
+# Lexical pre-matching (offline)
+# ===========================================================================
+
+_HOOKHUB_READMES = {
+    "landing-and-hero": "# Landing and Hero\nThe hero section with headline and call to action.",
+    "hook-catalog": "# Hook Catalog\nGrid of hook cards with name and description.",
+    "filter-system": "# Filter System\nCategory chips and search filtering.",
+    "dark-and-light-mode": "# Theming\nDark and light mode toggle.",
+}
+
+
+class TestLexicalMatcher:
+    """Tests for LexicalMatcher ranking."""
+
+    @pytest.mark.parametrize("element, expected", [
+        ("Hero headline", "landing-and-hero"),
+        ("Category filter chips", "filter-system"),
+        ("Hook description", "hook-catalog"),
+        ("Theme toggle", "dark-and-light-mode"),
+    ])
+    def test_ranks_obvious_section_first(self, element, expected):
+        matcher = LexicalMatcher(list(_HOOKHUB_READMES), _HOOKHUB_READMES)
+        assert matcher.rank(element)[0][0] == expected
+
+    def test_section_name_alone_is_enough(self):
+        matcher = LexicalMatcher(["user-profile", "user-security"], {})
+        assert matcher.rank("Profile picture")[0][0] == "user-profile"
+
+    def test_scores_are_cosine_bounded(self):
+        matcher = LexicalMatcher(list(_HOOKHUB_READMES), _HOOKHUB_READMES)
+        for _, score in matcher.rank("Hero headline"):
+            assert 0.0 <= score <= 1.0 + 1e-9
+
+    def test_ties_break_by_name(self):
+        matcher = LexicalMatcher(["beta", "alpha"], {})
+        assert [name for name, _ in matcher.rank("zzz")] == ["alpha", "beta"]
+
+    def test_no_sections(self):
+        assert LexicalMatcher([], {}).rank("anything") == []
+
+
+class TestPrematchRows:
+    """Tests for prematch_rows."""
+
+    def test_splits_confident_and_ambiguous_rows(self):
+        rows = [
+            {"ux_element": "Hero headline", "story_id": "US-001"},
+            {"ux_element": "Category filter chips", "story_id": "US-013"},
+            {"ux_element": "Onboarding tour", "story_id": "US-020"},
+        ]
+        matcher = LexicalMatcher(list(_HOOKHUB_READMES), _HOOKHUB_READMES)
+        assigned, ambiguous = prematch_rows(rows, matcher)
+        assert assigned == {"landing-and-hero": ["US-001"], "filter-system": ["US-013"]}
+        assert ambiguous == [rows[2]]
+
+    def test_incidental_trigrams_do_not_match(self):
+        """'Button' shares only 'on ' with 'main-section' — left to the LLM."""
+        matcher = LexicalMatcher(["main-section"], {"main-section": "# Main Section\nDoes stuff."})
+        rows = [{"ux_element": "Button", "story_id": "US-001"}]
+        assert prematch_rows(rows, matcher) == ({}, rows)
+
+    def test_close_runner_up_is_ambiguous(self):
+        matcher = LexicalMatcher(["search-results", "search-filters"], {})
+        rows = [{"ux_element": "Search", "story_id": "US-001"}]
+        assert prematch_rows(rows, matcher) == ({}, rows)
+
+    def test_thresholds_are_configurable(self):
+        matcher = LexicalMatcher(list(_HOOKHUB_READMES), _HOOKHUB_READMES)
+        rows = [{"ux_element": "Hero headline", "story_id": "US-001"}]
+        assert prematch_rows(rows, matcher, min_score=1.01) == ({}, rows)
+
+    def test_deduplicates_story_ids(self):
+        matcher = LexicalMatcher(list(_HOOKHUB_READMES), _HOOKHUB_READMES)
+        rows = [
+            {"ux_element": "Hero headline", "story_id": "US-001"},
+            {"ux_element": "Hero headline", "story_id": "US-001"},
+            {"ux_element": "Hero subheadline", "story_id": "US-002"},
+        ]
+        assigned, ambiguous = prematch_rows(rows, matcher)
+        assert assigned == {"landing-and-hero": ["US-001", "US-002"]}
+        assert ambiguous == []
+
+
+class TestMainCLIPrematch:
+    """main() with lexical pre-matching."""
+
+    def _run(self, tmp_path, rows, client, *extra, exit_code=0):
+        export = tmp_path / "export"
+        for name, readme in _HOOKHUB_READMES.items():
+            (export / "sections" / name).mkdir(parents=True, exist_ok=True)
+            (export / "sections" / name / "README.md").write_text(readme)
+        ux = tmp_path / "UX-FLOWS.md"
+        ux.write_text(
+            "## Section 11: Traceability Matrix\n\n"
+            "| UX Element | Plan Section | Source ID | Desc |\n"
+            "|---|---|---|---|\n"
+            + "".join(f"| {element} | S1 | {story} | d |\n" for element, story in rows)
+        )
+        output = tmp_path / "manifest.json"
+        sys.argv = [
+            "generate-section-manifest.py",
+            "--export-dir", str(export), "--ux-flows", str(ux), "--output", str(output),
+            "--no-cache", *extra,
+        ]
+        with patch.object(_mod, "OpenAI", return_value=client):
+            assert main() == exit_code
+        return json.loads(output.read_text()) if exit_code == 0 else None
+
+    def test_all_rows_prematched_skips_llm(self, tmp_path, monkeypatch):
+        monkeypatch.setenv("OPENAI_API_KEY", "fake-key")
+        client = _echo_client()
+        manifest = self._run(tmp_path, [("Hero headline", "US-001"), ("Hook description", "US-004")], client)
+
+        assert client.chat.completions.create.call_count == 0
+        assert manifest["sections"]["landing-and-hero"] == ["US-001"]
+        assert manifest["sections"]["hook-catalog"] == ["US-004"]
+        assert manifest["metadata"]["rows_prematched"] == "2"
+        assert manifest["metadata"]["rows_sent_to_llm"] == "0"
+
+    def test_only_ambiguous_rows_reach_llm(self, tmp_path, monkeypatch):
+        monkeypatch.setenv("OPENAI_API_KEY", "fake-key")
+        client = Mock()
+        client.chat.completions.create = Mock(
+            return_value=_make_mock_openai_response('{"hook-catalog": ["US-020"]}')
+        )
+        manifest = self._run(tmp_path, [("Hero headline", "US-001"), ("Onboarding tour", "US-020")], client)
+
+        prompt = client.chat.completions.create.call_args.kwargs["messages"][1]["content"]
+        assert "Onboarding tour | US-020" in prompt
+        assert "Hero headline" not in prompt
+        assert manifest["sections"]["landing-and-hero"] == ["US-001"]
+        assert manifest["sections"]["hook-catalog"] == ["US-020"]
+        assert manifest["metadata"]["rows_sent_to_llm"] == "1"
+
+    def test_openai_matcher_sends_every_row(self, tmp_path, monkeypatch):
+        monkeypatch.setenv("OPENAI_API_KEY", "fake-key")
+        client = Mock()
+        client.chat.completions.create = Mock(
+            return_value=_make_mock_openai_response('{"landing-and-hero": ["US-001"]}')
+        )
+        manifest = self._run(tmp_path, [("Hero headline", "US-001")], client, "--matcher", "openai")
+
+        assert client.chat.completions.create.call_count == 1
+        assert manifest["metadata"]["rows_prematched"] == "0"
+        assert manifest["metadata"]["matcher"] == "openai"
+
+    def test_local_matcher_needs_no_api_key(self, tmp_path, monkeypatch):
+        monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+        client = _echo_client()
+        rows = [("Hero headline", "US-001"), ("Theme toggle", "US-030"), ("Onboarding tour", "US-020")]
+        manifest = self._run(tmp_path, rows, client, "--matcher", "local")
+
+        assert client.chat.completions.create.call_count == 0
+        assert set(manifest) == {"sections", "stories", "metadata"}
+        assert manifest["sections"]["landing-and-hero"] == ["US-001"]
+        assert manifest["sections"]["dark-and-light-mode"] == ["US-030"]
+        assert manifest["metadata"]["unmapped_stories"] == "US-020"
+        assert manifest["metadata"]["matcher"] == "local"
+        assert manifest["metadata"]["model"] == "none"
+        assert "llm_cache_hits" not in manifest["metadata"]
+
+    def test_hybrid_without_api_key_returns_1(self, tmp_path, monkeypatch):
+        monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+        self._run(tmp_path, [("Hero headline", "US-001")], _echo_client(), "--matcher", "hybrid", exit_code=1)
+
+
+class TestLocalMatcher:
+    """Tests for the offline LocalMatcher backend."""
+
+    def test_assigns_best_section_without_thresholds(self):
+        """Unlike pre-matching, a weak but unique match is still assigned."""
+        rows = [
+            {"ux_element": "Card title", "story_id": "US-006"},
+            {"ux_element": "Search bar", "story_id": "US-014"},
+        ]
+        result = _mod.LocalMatcher().match(rows, list(_HOOKHUB_READMES), _HOOKHUB_READMES)
+        assert result == {"hook-catalog": ["US-006"], "filter-system": ["US-014"]}
+
+    def test_matches_llm_behavior_cases(self):
+        """The clear-cut synthetic cases used for the LLM tests resolve offline too."""
+        rows = [
+            {"ux_element": "Invoice PDF generator", "story_id": "US-001"},
+            {"ux_element": "Payment form", "story_id": "US-002"},
+            {"ux_element": "Shipping address form", "story_id": "US-003"},
+            {"ux_element": "Product image gallery", "story_id": "US-004"},
+            {"ux_element": "Customer support chat", "story_id": "US-005"},
+        ]
+        readmes = {
+            "billing": "# Billing\nInvoices, receipts, billing history.",
+            "payments": "# Payments\nPayment processing, credit cards, refunds.",
+            "shipping": "# Shipping\nAddress management, delivery tracking.",
+            "product-catalog": "# Product Catalog\nProduct listings, images, descriptions.",
+            "support": "# Support\nCustomer service chat, tickets, FAQ.",
+        }
+        result = _mod.LocalMatcher().match(rows, list(readmes), readmes)
+        assert result == {
+            "billing": ["US-001"], "payments": ["US-002"], "shipping": ["US-003"],
+            "product-catalog": ["US-004"], "support": ["US-005"],
+        }
+
+    def test_deterministic(self):
+        rows = [{"ux_element": "Hero headline", "story_id": "US-001"}]
+        matcher = _mod.LocalMatcher()
+        first = matcher.match(rows, list(_HOOKHUB_READMES), _HOOKHUB_READMES)
+        assert first == matcher.match(rows, list(_HOOKHUB_READMES), _HOOKHUB_READMES)
+        assert matcher.stats == {"rows_prematched": "1", "rows_sent_to_llm": "0"}
+
+    def test_output_feeds_generate_manifest(self):
+        rows = [{"ux_element": "Hero headline", "story_id": "US-001"}]
+        sections = list(_HOOKHUB_READMES)
+        manifest = generate_manifest(
+            _mod.LocalMatcher().match(rows, sections, _HOOKHUB_READMES), rows, sections
+        )
+        assert list(manifest["sections"]) == sections
+        assert manifest["metadata"]["unmapped_stories"] == "none"
+
+
+class TestSectionMatcherBackends:
+    """OpenAIMatcher and HybridMatcher share the sharded LLM path."""
+
+    def test_hybrid_merges_local_and_llm_results(self):
+        client = Mock()
+        client.chat.completions.create = Mock(
+            return_value=_make_mock_openai_response('{"hook-catalog": ["US-020"]}')
+        )
+        rows = [
+            {"ux_element": "Hero headline", "story_id": "US-001"},
+            {"ux_element": "Onboarding tour", "story_id": "US-020"},
+        ]
+        matcher = _mod.HybridMatcher(client)
+        result = matcher.match(rows, list(_HOOKHUB_READMES), _HOOKHUB_READMES)
+        assert result == {"hook-catalog": ["US-020"], "landing-and-hero": ["US-001"]}
+        assert matcher.stats == {"rows_prematched": "1", "rows_sent_to_llm": "1"}
+
+    def test_openai_matcher_uses_cache(self, tmp_path):
+        cache = ResponseCache(tmp_path)
+        client = _echo_client()
+        matcher = _mod.OpenAIMatcher(client, cache=cache, rows_per_shard=1)
+        for _ in range(2):
+            matcher.match(_rows(2), _MINIMAL_SECTIONS, _MINIMAL_READMES)
+        assert client.chat.completions.create.call_count == 2
+        assert matcher.cache is cache and cache.hits == 2
+
+    def test_registry_names(self):
+        assert {name: cls.name for name, cls in _mod.MATCHERS.items()} == {
+            "hybrid": "hybrid", "openai": "openai", "local": "local",
+        }
+
+    def test_section_matcher_is_abstract(self):
+        with pytest.raises(TypeError, match="match"):
+            _mod.SectionMatcher()
+
+
+# ===========================================================================
+# Incremental manifest regeneration
+# ===========================================================================
+
+_INC_READMES = {"main": "# Main\nPrimary screen.", "other": "# Other\nSecondary screen."}
+
+
+def _previous_manifest(rows, section_to_stories, readmes=_INC_READMES):
+    return generate_manifest(section_to_stories, rows, list(readmes), section_readmes=readmes)
+
+
+class TestPlanIncrementalUpdate:
+    """Tests for plan_incremental_update and the hashes generate_manifest records."""
+
+    def test_records_hashes_when_readmes_given(self):
+        rows = _rows(2)
+        manifest = _previous_manifest(rows, {"main": ["US-001"], "other": ["US-002"]})
+        metadata = manifest["metadata"]
+        assert set(metadata["section_readme_hashes"]) == {"main", "other"}
+        assert metadata["row_sections"][row_hash(rows[0])] == ["main"]
+        assert metadata["row_sections"][row_hash(rows[1])] == ["other"]
+
+    def test_omits_hashes_without_readmes(self):
+        manifest = generate_manifest({"main": ["US-001"]}, _rows(1), ["main"])
+        assert "row_sections" not in manifest["metadata"]
+
+    def test_nothing_changed_reuses_everything(self):
+        rows = _rows(2)
+        previous = _previous_manifest(rows, {"main": ["US-001"], "other": ["US-002"]})
+        preserved, rematch = plan_incremental_update(previous, rows, _INC_READMES)
+        assert preserved == {"main": ["US-001"], "other": ["US-002"]}
+        assert rematch == []
+
+    def test_new_row_is_rematched(self):
+        rows = _rows(2)
+        previous = _previous_manifest(rows, {"main": ["US-001", "US-002"]})
+        preserved, rematch = plan_incremental_update(previous, _rows(3), _INC_READMES)
+        assert preserved == {"main": ["US-001", "US-002"]}
+        assert rematch == [_rows(3)[2]]
+
+    def test_changed_readme_rematches_its_rows_only(self):
+        rows = _rows(2)
+        previous = _previous_manifest(rows, {"main": ["US-001"], "other": ["US-002"]})
+        readmes = dict(_INC_READMES, other="# Other\nNow the settings screen.")
+        preserved, rematch = plan_incremental_update(previous, rows, readmes)
+        assert preserved == {"main": ["US-001"]}
+        assert rematch == [rows[1]]
+
+    def test_removed_section_rematches_its_rows(self):
+        rows = _rows(2)
+        previous = _previous_manifest(rows, {"main": ["US-001"], "other": ["US-002"]})
+        preserved, rematch = plan_incremental_update(previous, rows, {"main": _INC_READMES["main"]})
+        assert preserved == {"main": ["US-001"]}
+        assert rematch == [rows[1]]
+
+    def test_unmatched_row_retried_when_sections_change(self):
+        rows = _rows(2)
+        previous = _previous_manifest(rows, {"main": ["US-001"]})
+        _, rematch = plan_incremental_update(previous, rows, _INC_READMES)
+        assert rematch == []
+
+        readmes = dict(_INC_READMES, extra="# Extra\nNew section.")
+        _, rematch = plan_incremental_update(previous, rows, readmes)
+        assert rematch == [rows[1]]
+
+    def test_changed_element_text_is_a_new_row(self):
+        rows = _rows(1)
+        previous = _previous_manifest(rows, {"main": ["US-001"]})
+        renamed = [{"ux_element": "Renamed", "story_id": "US-001"}]
+        _, rematch = plan_incremental_update(previous, renamed, _INC_READMES)
+        assert rematch == renamed
+
+    def test_deleted_row_rematches_rows_sharing_its_story(self):
+        """A sibling row must not carry the deleted row's section forward."""
+        rows = [
+            {"ux_element": "Hero headline", "story_id": "US-001"},
+            {"ux_element": "Filter chips", "story_id": "US-001"},
+            {"ux_element": "Filter chips", "story_id": "US-002"},
+        ]
+        previous = _previous_manifest(rows, {"main": ["US-001"], "other": ["US-001", "US-002"]})
+
+        remaining = [rows[0], rows[2]]
+        preserved, rematch = plan_incremental_update(previous, remaining, _INC_READMES)
+        assert rematch == [rows[0]]
+        assert preserved == {"other": ["US-002"]}
+
+    def test_manifest_without_story_rows_rematches_everything(self):
+        rows = _rows(2)
+        previous = _previous_manifest(rows, {"main": ["US-001"], "other": ["US-002"]})
+        del previous["metadata"]["story_rows"]
+        _, rematch = plan_incremental_update(previous, rows, _INC_READMES)
+        assert rematch == rows
+
+    def test_load_previous_manifest(self, tmp_path):
+        path = tmp_path / "manifest.json"
+        assert load_previous_manifest(path) is None
+
+        path.write_text(json.dumps(generate_manifest({"main": []}, _rows(1), ["main"])))
+        assert load_previous_manifest(path) is None, "manifests without hashes are not reused"
+
+        path.write_text("{not json")
+        assert load_previous_manifest(path) is None
+
+        manifest = _previous_manifest(_rows(1), {"main": ["US-001"]})
+        path.write_text(json.dumps(manifest))
+        assert load_previous_manifest(path) == manifest
+
+
+class TestMainCLIIncremental:
+    """main() re-runs against an existing manifest."""
+
+    def _setup(self, tmp_path, rows=3):
+        export = tmp_path / "export"
+        for name, readme in _INC_READMES.items():
+            (export / "sections" / name).mkdir(parents=True, exist_ok=True)
+            (export / "sections" / name / "README.md").write_text(readme)
+        self._write_rows(tmp_path, rows)
+        return export
+
+    def _write_rows(self, tmp_path, n):
+        (tmp_path / "UX-FLOWS.md").write_text(
+            "## Section 11: Traceability Matrix\n\n"
+            "| UX Element | Plan Section | Source ID | Desc |\n"
+            "|---|---|---|---|\n"
+            + "".join(f"| Element {i} | S1 | US-{i:03d} | d |\n" for i in range(1, n + 1))
+        )
+
+    def _run(self, tmp_path, client, *extra):
+        output = tmp_path / "manifest.json"
+        sys.argv = [
+            "generate-section-manifest.py",
+            "--export-dir", str(tmp_path / "export"),
+            "--ux-flows", str(tmp_path / "UX-FLOWS.md"),
+            "--output", str(output),
+            "--no-cache", "--matcher", "openai",
+            *extra,
+        ]
+        with patch.object(_mod, "OpenAI", return_value=client):
+            assert main() == 0
+        return json.loads(output.read_text())
+
+    def _prompts(self, client):
+        return [c.kwargs["messages"][1]["content"] for c in client.chat.completions.create.call_args_list]
+
+    def test_unchanged_rerun_makes_no_request(self, tmp_path, monkeypatch):
+        monkeypatch.setenv("OPENAI_API_KEY", "fake-key")
+        self._setup(tmp_path)
+        client = _echo_client()
+        first = self._run(tmp_path, client)
+        second = self._run(tmp_path, client)
+
+        assert client.chat.completions.create.call_count == 1
+        assert second["sections"] == first["sections"]
+        assert second["metadata"]["rows_reused"] == "3"
+
+    @pytest.mark.parametrize("matcher", ["openai", "hybrid", "local"])
+    def test_unchanged_rerun_keeps_metadata_keys(self, tmp_path, monkeypatch, matcher):
+        monkeypatch.setenv("OPENAI_API_KEY", "fake-key")
+        self._setup(tmp_path)
+        client = _echo_client()
+        first = self._run(tmp_path, client, "--matcher", matcher)
+        second = self._run(tmp_path, client, "--matcher", matcher)
+
+        assert second["metadata"]["rows_reused"] == "3"
+        assert second["metadata"].keys() == first["metadata"].keys()
+        assert second["metadata"]["rows_prematched"] == second["metadata"]["rows_sent_to_llm"] == "0"
+
+    def test_only_new_rows_are_sent(self, tmp_path, monkeypatch):
+        monkeypatch.setenv("OPENAI_API_KEY", "fake-key")
+        self._setup(tmp_path)
+        client = _echo_client()
+        self._run(tmp_path, client)
+
+        self._write_rows(tmp_path, 4)
+        manifest = self._run(tmp_path, client)
+
+        delta_prompt = self._prompts(client)[-1]
+        assert "Element 4 | US-004" in delta_prompt
+        assert "Element 1 |" not in delta_prompt
+        assert manifest["sections"]["main"] == ["US-001", "US-002", "US-003", "US-004"]
+        assert manifest["metadata"]["rows_reused"] == "3"
+
+    def test_changed_readme_rematches_its_rows(self, tmp_path, monkeypatch):
+        monkeypatch.setenv("OPENAI_API_KEY", "fake-key")
+        export = self._setup(tmp_path)
+        client = _echo_client()
+        self._run(tmp_path, client)
+
+        (export / "sections" / "main" / "README.md").write_text("# Main\nReworked.")
+        manifest = self._run(tmp_path, client)
+        assert client.chat.completions.create.call_count == 2
+        assert manifest["metadata"]["rows_reused"] == "0"
+
+    def test_row_deletion_matches_full_rebuild(self, tmp_path):
+        """After deleting one of a story's rows, incremental output equals --full."""
+        export = tmp_path / "export"
+        readmes = {
+            "landing-and-hero": "# Landing and Hero\nHero headline and call to action.",
+            "filter-chips": "# Filter Chips\nFilter chips narrow the catalog.",
+        }
+        for name, readme in readmes.items():
+            (export / "sections" / name).mkdir(parents=True, exist_ok=True)
+            (export / "sections" / name / "README.md").write_text(readme)
+
+        def write_rows(rows):
+            (tmp_path / "UX-FLOWS.md").write_text(
+                "## Section 11: Traceability Matrix\n\n"
+                "| UX Element | Plan Section | Source ID | Desc |\n"
+                "|---|---|---|---|\n"
+                + "".join(f"| {element} | S1 | {story} | d |\n" for element, story in rows)
+            )
+
+        def run(*extra):
+            output = tmp_path / "manifest.json"
+            sys.argv = [
+                "generate-section-manifest.py", "--matcher", "local",
+                "--export-dir", str(export), "--ux-flows", str(tmp_path / "UX-FLOWS.md"),
+                "--output", str(output), *extra,
+            ]
+            assert main() == 0
+            return json.loads(output.read_text())
+
+        write_rows([("Hero headline", "US-001"), ("Filter chips", "US-001"), ("Filter chips", "US-002")])
+        assert run()["sections"]["filter-chips"] == ["US-001", "US-002"]
+
+        write_rows([("Hero headline", "US-001"), ("Filter chips", "US-002")])
+        incremental = run()
+        full = run("--full")
+        assert incremental["sections"] == full["sections"]
+        assert incremental["sections"]["filter-chips"] == ["US-002"]
+        assert incremental["stories"] == full["stories"]
+
+    def test_full_and_matcher_change_rebuild(self, tmp_path, monkeypatch):
+        monkeypatch.setenv("OPENAI_API_KEY", "fake-key")
+        self._setup(tmp_path)
+        client = _echo_client()
+        self._run(tmp_path, client)
+
+        assert self._run(tmp_path, client, "--full")["metadata"]["rows_reused"] == "0"
+        assert client.chat.completions.create.call_count == 2
+
+        manifest = self._run(tmp_path, client, "--matcher", "local")  # Later flag wins
+        assert manifest["metadata"]["matcher"] == "local"
+        assert manifest["metadata"]["rows_reused"] == "0"
+
+
+class TestPromptTokenBudget:
+    """Tests for plan_matching_prompt and its helpers."""
+
+    @pytest.fixture(autouse=True)
+    def _heuristic_tokens(self, monkeypatch):
+        """Count tokens with the character heuristic, tiktoken or not."""
+        monkeypatch.setattr(_mod, "tiktoken", None)
+
+    def test_prompt_text_unchanged_by_join(self):
+        """build_matching_prompt renders rows and READMEs exactly as before."""
+        prompt = build_matching_prompt(
+            _rows(2), ["a", "b"], {"a": "# A", "b": "# B"}
+        )
+        assert (
+            "UX Element | Story ID\n----------|----------\n"
+            "Element 1 | US-001\nElement 2 | US-002\n\n"
+        ) in prompt
+        assert "\n### a\n# A\n\n### b\n# B\n\n" in prompt
+
+    def test_small_prompt_is_not_trimmed(self):
+        """READMEs within budget pass through untouched."""
+        readmes = {"main": "# Main\n\nShort."}
+        plan = plan_matching_prompt(_rows(3), ["main"], readmes)
+
+        assert plan["section_readmes"] == readmes
+        assert plan["readmes_trimmed"] == 0
+        assert plan["input_tokens"] >= count_tokens(_mod.SYSTEM_PROMPT)
+
+    def test_trims_proportionally_to_fit_budget(self):
+        """Over budget, each README keeps about the same fraction of itself."""
+        line = "x" * 39 + "\n"  # 10 tokens
+        readmes = {"short": line * 20, "long": line * 200}
+        fixed = plan_matching_prompt(_rows(5), list(readmes), dict.fromkeys(readmes, ""))["input_tokens"]
+
+        plan = plan_matching_prompt(_rows(5), list(readmes), readmes, token_budget=fixed + 1100)
+
+        assert plan["readmes_trimmed"] == 2
+        assert plan["input_tokens"] <= fixed + 1100
+        kept_short = plan["section_readmes"]["short"].count("\n") + 1
+        kept_long = plan["section_readmes"]["long"].count("\n") + 1
+        assert kept_short == 10
+        assert kept_long == 100
+
+    def test_none_budget_disables_trimming(self):
+        """token_budget=None sends every README whole."""
+        readmes = {"main": "word " * 10_000}
+        plan = plan_matching_prompt(_rows(1), ["main"], readmes, token_budget=None)
+        assert plan["section_readmes"] == readmes
+
+    def test_output_estimate_grows_with_rows(self):
+        """Predicted answer size covers every row's story ID."""
+        small = plan_matching_prompt(_rows(1), ["main"], {"main": ""})["output_tokens"]
+        large = plan_matching_prompt(_rows(101), ["main"], {"main": ""})["output_tokens"]
+        assert large - small == 100 * _mod.OUTPUT_TOKENS_PER_ROW
+
+    def test_trim_cuts_oversized_first_line(self):
+        """A single line over budget is cut to the budget, not dropped."""
+        assert trim_to_token_budget("z" * 400, 5) == "z" * 20
+
+    def test_llm_receives_trimmed_readmes(self):
+        """match_sections_with_llm sends the planned, trimmed excerpts."""
+        client = _echo_client()
+        readmes = {"main": "# Main\n" + "filler line here\n" * 5000}
+
+        match_sections_with_llm(_rows(2), ["main"], readmes, client, token_budget=2000)
+
+        prompt = client.chat.completions.create.call_args.kwargs["messages"][1]["content"]
+        assert "# Main\nfiller line here" in prompt
+        assert len(prompt) < len(readmes["main"])
+
+    def test_oversized_request_fails_before_calling(self, monkeypatch):
+        """A prompt that cannot fit the context window never reaches the API."""
+        monkeypatch.setattr(_mod, "CONTEXT_WINDOW_TOKENS", 3000)
+        client = _echo_client()
+
+        with pytest.raises(RuntimeError, match="context window"):
+            match_sections_with_llm(_rows(500), ["main"], {"main": ""}, client)
+        client.chat.completions.create.assert_not_called()
+
+
+def _error_with_headers(error_class: type, headers: dict) -> Exception:
+    """An API error carrying response headers, like the openai SDK's."""
+    error = error_class("rate limited")
+    error.response = Mock(headers=headers)
+    return error
+
+
+def _blocking_client(
+    block_calls: set[int], release: threading.Event, delay: float = 0.0
+) -> Mock:
+    """Echo client whose listed calls (1-based) hang until release is set."""
+    echo = _echo_client(delay).chat.completions.create.side_effect
+    counter = iter(range(1, 10_000))
+    lock = threading.Lock()
+
+    def create(**kwargs):
+        with lock:
+            call = next(counter)
+        if call in block_calls:
+            release.wait(5)
+        return echo(**kwargs)
+
+    client = Mock()
+    client.chat.completions.create = Mock(side_effect=create)
+    return client
+
+
+class TestRetryBackoff:
+    """Tests for backoff_delay and retry_after_seconds."""
+
+    def test_backoff_grows_exponentially_with_full_jitter(self):
+        """Attempt n waits uniformly in [0, base * 2^(n-1)]."""
+        with patch.object(_mod.random, "uniform", side_effect=lambda low, high: high):
+            ceilings = [backoff_delay(attempt) for attempt in (1, 2, 3)]
+        assert ceilings == [RETRY_DELAY_SECONDS, RETRY_DELAY_SECONDS * 2, RETRY_DELAY_SECONDS * 4]
+
+        delays = {backoff_delay(3) for _ in range(50)}
+        assert len(delays) > 1
+        assert all(0 <= d <= RETRY_DELAY_SECONDS * 4 for d in delays)
+
+    def test_backoff_is_capped(self):
+        """Late attempts never wait longer than the ceiling."""
+        assert all(backoff_delay(30) <= _mod.RETRY_MAX_DELAY_SECONDS for _ in range(50))
+
+    def test_retry_after_is_a_floor(self):
+        """A server's Retry-After wins over a shorter jittered delay."""
+        assert backoff_delay(1, retry_after=45.0) == 45.0
+
+    @pytest.mark.parametrize("headers,expected", [
+        ({"retry-after": "7"}, 7.0),
+        ({"retry-after-ms": "1500"}, 1.5),
+        ({"retry-after": "soon"}, None),
+        ({}, None),
+    ])
+    def test_parses_retry_after_headers(self, headers, expected):
+        assert retry_after_seconds(_error_with_headers(_MockRateLimitError, headers)) == expected
+
+    def test_parses_retry_after_http_date(self):
+        """HTTP-date Retry-After values become seconds from now."""
+        from email.utils import formatdate
+        error = _error_with_headers(_MockRateLimitError, {"retry-after": formatdate(time.time() + 30)})
+        assert 25 <= retry_after_seconds(error) <= 31
+
+    def test_error_without_response(self):
+        assert retry_after_seconds(_MockRateLimitError("no response")) is None
+
+    @patch.object(AsyncLLMClient, "sleep", new_callable=AsyncMock)
+    def test_rate_limit_honors_retry_after(self, mock_sleep):
+        """match_sections_with_llm waits at least the Retry-After seconds."""
+        client = _make_mock_client([
+            _error_with_headers(_MockRateLimitError, {"retry-after": "12"}),
+            _make_mock_openai_response('{"main": ["US-001"]}'),
+        ])
+
+        match_sections_with_llm(_MINIMAL_ROWS, _MINIMAL_SECTIONS, _MINIMAL_READMES, client)
+
+        assert mock_sleep.call_args.args[0] >= 12
+
+
+class TestAsyncLLMClient:
+    """Tests for per-request timeouts, hedging and async client support."""
+
+    def test_latency_threshold_needs_samples(self):
+        tracker = LatencyTracker(percentile=50)
+        for seconds in (1.0, 2.0, 3.0, 4.0):
+            tracker.record(seconds)
+        assert tracker.threshold() is None
+
+        tracker.record(5.0)
+        assert tracker.threshold() == 3.0
+
+    def test_timeout_is_retried_then_fails(self):
+        """Attempts that outlive request_timeout are retried, then reported."""
+        release = threading.Event()
+        client = _blocking_client({1, 2, 3}, release)
+        try:
+            with patch.object(_mod, "backoff_delay", return_value=0):
+                with pytest.raises(RuntimeError, match="timed out"):
+                    match_sections_with_llm(
+                        _MINIMAL_ROWS, _MINIMAL_SECTIONS, _MINIMAL_READMES, client,
+                        request_timeout=0.05
+                    )
+        finally:
+            release.set()
+        assert client.chat.completions.create.call_count == MAX_RETRIES
+
+    def test_timeout_then_success(self):
+        """A hung first attempt does not block the retry that follows."""
+        release = threading.Event()
+        client = _blocking_client({1}, release)
+        try:
+            with patch.object(_mod, "backoff_delay", return_value=0):
+                result = match_sections_with_llm(
+                    _MINIMAL_ROWS, _MINIMAL_SECTIONS, _MINIMAL_READMES, client,
+                    request_timeout=0.05
+                )
+        finally:
+            release.set()
+        assert result["main"] == ["US-001"]
+
+    def test_sdk_call_gets_the_timeout(self):
+        client = _echo_client()
+        match_sections_with_llm(
+            _MINIMAL_ROWS, _MINIMAL_SECTIONS, _MINIMAL_READMES, client, request_timeout=12
+        )
+        assert client.chat.completions.create.call_args.kwargs["timeout"] == 12
+
+    def test_hedge_answers_when_first_request_stalls(self):
+        """Past the latency percentile a duplicate is sent and the faster wins."""
+        release = threading.Event()
+        llm = AsyncLLMClient(_blocking_client({1}, release), request_timeout=5, hedge_percentile=50)
+        for _ in range(_mod.HEDGE_MIN_SAMPLES):
+            llm.latency.record(0.01)
+        messages = [{"role": "system", "content": ""}, {"role": "user", "content": "US-001"}]
+
+        start = time.monotonic()
+        try:
+            response = asyncio.run(llm.create(messages=messages))
+        finally:
+            release.set()
+            llm.close()
+
+        assert json.loads(response.choices[0].message.content)["main"] == ["US-001"]
+        assert llm.hedged_requests == 1
+        assert time.monotonic() - start < 2
+
+    def test_no_hedge_without_latency_history(self):
+        """Hedging waits until HEDGE_MIN_SAMPLES latencies have been seen."""
+        client = _echo_client()
+        llm = AsyncLLMClient(client, hedge_percentile=50)
+        messages = [{"role": "system", "content": ""}, {"role": "user", "content": "US-001"}]
+        try:
+            asyncio.run(llm.create(messages=messages))
+        finally:
+            llm.close()
+        assert llm.hedged_requests == 0
+        assert client.chat.completions.create.call_count == 1
+
+    def test_sharded_hedging_bounds_a_stalled_shard(self):
+        """Once earlier shards set the baseline, a stalled shard is hedged."""
+        release = threading.Event()
+        # Calls take a steady 20ms, so scheduling noise on a busy machine
+        # stays well under the latency baseline and only shard 8 is hedged
+        client = _blocking_client({8}, release, delay=0.02)
+        start = time.monotonic()
+        try:
+            results = match_sections_sharded(
+                _rows(8), _MINIMAL_SECTIONS, _MINIMAL_READMES, client,
+                rows_per_shard=1, max_concurrency=1, hedge_percentile=95
+            )
+        finally:
+            release.set()
+
+        assert [r["main"] for r in results] == [[f"US-{i:03d}"] for i in range(1, 9)]
+        assert client.chat.completions.create.call_count == 9
+        assert time.monotonic() - start < 2
+
+    def test_backoff_sleep_leaves_workers_free(self):
+        """A retry waiting out its backoff does not occupy a pool thread."""
+        llm = AsyncLLMClient(_echo_client(), max_workers=1)
+        try:
+            with patch.object(llm._executor, "submit") as submit:
+                asyncio.run(llm.sleep(0.01))
+        finally:
+            llm.close()
+        submit.assert_not_called()
+
+    def test_awaits_async_clients(self):
+        """An AsyncOpenAI-style client (coroutine create) is awaited directly."""
+        async def create(**kwargs):
+            await asyncio.sleep(0)
+            return _make_mock_openai_response('{"main": ["US-001"]}')
+
+        client = Mock()
+        client.chat.completions.create = create
+
+        result = match_sections_with_llm(_MINIMAL_ROWS, _MINIMAL_SECTIONS, _MINIMAL_READMES, client)
+        assert result == {"main": ["US-001"]}
+
+
+def _make_project(root: Path, rows: list[tuple[str, str]]) -> Path:
+    """A project root with the default .charter/ layout."""
+    export = root / ".charter" / "design-os-export"
+    for name, readme in _HOOKHUB_READMES.items():
+        (export / "sections" / name).mkdir(parents=True, exist_ok=True)
+        (export / "sections" / name / "README.md").write_text(readme)
+    (root / ".charter" / "UX-FLOWS.md").write_text(
+        "## Section 11: Traceability Matrix\n\n"
+        "| UX Element | Plan Section | Source ID | Desc |\n"
+        "|---|---|---|---|\n"
+        + "".join(f"| {element} | S1 | {story} | d |\n" for element, story in rows)
+    )
+    return root
+
+
+class TestDiscoverProjects:
+    """Tests for discover_projects."""
+
+    def test_expands_globs_and_dedupes(self, tmp_path):
+        for name in ("b", "a", "c"):
+            (tmp_path / name).mkdir()
+        (tmp_path / "notes.txt").write_text("not a project")
+
+        roots = discover_projects([str(tmp_path / "c"), str(tmp_path / "*")])
+        assert [r.name for r in roots] == ["c", "a", "b"]
+
+    def test_skips_missing_roots(self, tmp_path):
+        assert discover_projects([str(tmp_path / "nope"), str(tmp_path / "none-*")]) == []
+
+
+class TestSharedLLMClient:
+    """Tests for AsyncLLMClient sharing across batch projects."""
+
+    def test_identical_requests_across_threads_run_once(self):
+        """Concurrent identical requests from separate event loops share one call."""
+        calls = 0
+        lock = threading.Lock()
+
+        async def request():
+            nonlocal calls
+            with lock:
+                calls += 1
+            await asyncio.sleep(0.05)
+            return {"main": ["US-001"]}
+
+        llm = AsyncLLMClient(Mock())
+        try:
+            with ThreadPoolExecutor(max_workers=4) as executor:
+                results = list(executor.map(
+                    lambda _: asyncio.run(llm.once("same-key", request)), range(4)
+                ))
+        finally:
+            llm.close()
+
+        assert calls == 1
+        assert results == [{"main": ["US-001"]}] * 4
+        assert llm.deduplicated_requests == 3
+
+    def test_failures_are_not_remembered(self):
+        attempts = []
+
+        async def request():
+            attempts.append(1)
+            if len(attempts) == 1:
+                raise RuntimeError("first try fails")
+            return {"main": []}
+
+        llm = AsyncLLMClient(Mock())
+        try:
+            with pytest.raises(RuntimeError):
+                asyncio.run(llm.once("key", request))
+            assert asyncio.run(llm.once("key", request)) == {"main": []}
+        finally:
+            llm.close()
+        assert len(attempts) == 2
+
+    def test_max_in_flight_is_global(self):
+        """max_in_flight caps calls across every loop using the client."""
+        in_flight = 0
+        peak = 0
+        lock = threading.Lock()
+
+        def create(**kwargs):
+            nonlocal in_flight, peak
+            with lock:
+                in_flight += 1
+                peak = max(peak, in_flight)
+            time.sleep(0.02)
+            with lock:
+                in_flight -= 1
+            return _make_mock_openai_response("{}")
+
+        client = Mock()
+        client.chat.completions.create = Mock(side_effect=create)
+        llm = AsyncLLMClient(client, max_workers=8, max_in_flight=2)
+        try:
+            with ThreadPoolExecutor(max_workers=6) as executor:
+                list(executor.map(lambda _: asyncio.run(llm.create(messages=[])), range(6)))
+        finally:
+            llm.close()
+
+        assert client.chat.completions.create.call_count == 6
+        assert peak == 2
+
+    def test_waiting_for_a_slot_does_not_count_against_the_timeout(self):
+        """Queued requests get their full request_timeout once they hold a slot."""
+        client = _echo_client(delay=0.1)
+        llm = AsyncLLMClient(client, request_timeout=0.15, max_workers=4, max_in_flight=1)
+        messages = [{"role": "system", "content": ""}, {"role": "user", "content": "US-001"}]
+        try:
+            with ThreadPoolExecutor(max_workers=4) as executor:
+                responses = list(executor.map(
+                    lambda _: asyncio.run(llm.create(messages=messages)), range(4)
+                ))
+        finally:
+            llm.close()
+
+        assert len(responses) == 4
+        assert client.chat.completions.create.call_count == 4
+
+    def test_request_abandoned_while_queued_is_never_sent(self):
+        """A caller that gives up waiting for a slot makes no call and leaks no slot."""
+        release = threading.Event()
+        client = _blocking_client({1}, release)
+        llm = AsyncLLMClient(client, request_timeout=5, max_in_flight=1)
+        messages = [{"role": "system", "content": ""}, {"role": "user", "content": "US-001"}]
+
+        async def scenario():
+            first = asyncio.ensure_future(llm.create(messages=messages))
+            await asyncio.sleep(0.05)
+            with pytest.raises(asyncio.TimeoutError):
+                await asyncio.wait_for(llm.create(messages=messages), timeout=0.05)
+            release.set()
+            await first
+            await llm.create(messages=messages)
+
+        try:
+            asyncio.run(scenario())
+        finally:
+            release.set()
+            llm.close()
+        assert client.chat.completions.create.call_count == 2
+
+
+class TestMainCLIBatch:
+    """Tests for --projects batch mode."""
+
+    def _run(self, tmp_path, client, *extra, exit_code=0):
+        summary = tmp_path / "report.json"
+        sys.argv = [
+            "generate-section-manifest.py",
+            "--projects", str(tmp_path / "projects" / "*"),
+            "--summary", str(summary), "--no-cache", *extra,
+        ]
+        with patch.object(_mod, "OpenAI", return_value=client):
+            assert main() == exit_code
+        return json.loads(summary.read_text())
+
+    def test_writes_each_manifest_and_dedupes_identical_prompts(self, tmp_path, monkeypatch):
+        monkeypatch.setenv("OPENAI_API_KEY", "fake-key")
+        rows = [("Widget A", "US-001"), ("Widget B", "US-002")]
+        for name in ("alpha", "beta"):
+            _make_project(tmp_path / "projects" / name, rows)
+        _make_project(tmp_path / "projects" / "gamma", [("Widget C", "US-003")])
+        client = _echo_client()
+
+        summary = self._run(tmp_path, client, "--matcher", "openai")
+
+        assert [p["status"] for p in summary["projects"]] == ["ok", "ok", "ok"]
+        assert summary["totals"] == {**summary["totals"], "projects": 3, "ok": 3, "failed": 0}
+        # alpha and beta send the same prompt: one request between them
+        assert client.chat.completions.create.call_count == 2
+        assert summary["totals"]["llm_requests_deduplicated"] == 1
+        for name in ("alpha", "beta"):
+            manifest = json.loads(
+                (tmp_path / "projects" / name / ".charter/design-os-export/manifest.json").read_text()
+            )
+            assert set(manifest["sections"]) == set(_HOOKHUB_READMES)
+            assert manifest["metadata"]["matcher"] == "openai"
+
+    def test_failed_project_is_reported(self, tmp_path, monkeypatch):
+        monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+        _make_project(tmp_path / "projects" / "good", [("Hero headline", "US-001")])
+        (tmp_path / "projects" / "empty").mkdir()
+
+        summary = self._run(tmp_path, _echo_client(), "--matcher", "local", exit_code=1)
+
+        by_name = {Path(p["project"]).name: p for p in summary["projects"]}
+        assert by_name["good"]["status"] == "ok"
+        assert by_name["good"]["stories_mapped"] == 1
+        assert by_name["empty"]["status"] == "failed"
+        assert "not found" in by_name["empty"]["error"]
+        assert summary["totals"]["failed"] == 1
+
+    def test_dry_run_writes_no_manifests(self, tmp_path, monkeypatch):
+        monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+        root = _make_project(tmp_path / "projects" / "one", [("Hero headline", "US-001")])
+
+        self._run(tmp_path, _echo_client(), "--matcher", "local", "--dry-run")
+        assert not (root / ".charter/design-os-export/manifest.json").exists()
+
+    def test_single_project_flags_still_required(self, tmp_path):
+        sys.argv = ["generate-section-manifest.py", "--export-dir", str(tmp_path)]
+        with pytest.raises(SystemExit) as exc:
+            main()
+        assert exc.value.code == 2
+
+
+def _batch_echo(body: dict) -> str:
+    """Batch responder: every story ID in the prompt goes to hook-catalog."""
+    prompt = body["messages"][1]["content"]
+    ids = sorted(set(re.findall(r"US-\d{3}", prompt.split("## Section Directories")[0])))
+    return json.dumps({"hook-catalog": ids})
+
+
+class TestBatchAPI:
+    """Tests for the Batch API request/result plumbing."""
+
+    def test_parse_batch_output(self):
+        lines = [
+            json.dumps({"custom_id": "a", "error": None, "response": {
+                "status_code": 200,
+                "body": {"choices": [{"message": {"content": '{"x": ["US-001"]}'}}]},
+            }}),
+            json.dumps({"custom_id": "b", "error": None, "response": {
+                "status_code": 400, "body": {"error": {"message": "bad request"}},
+            }}),
+            json.dumps({"custom_id": "c", "response": None, "error": "expired"}),
+            "",
+        ]
+        results = parse_batch_output(lines)
+        assert results["a"] == {"content": '{"x": ["US-001"]}'}
+        assert "bad request" in results["b"]["error"]
+        assert results["c"] == {"error": "expired"}
+
+    def test_batch_backend_is_abstract(self):
+        with pytest.raises(TypeError, match="results"):
+            _mod.BatchBackend()
+
+    @patch("time.sleep")
+    def test_local_backend_round_trip(self, mock_sleep, tmp_path):
+        """Requests are submitted as JSONL, polled, and answered per custom_id."""
+        backend = LocalBatchBackend(tmp_path / "batches", _batch_echo, polls_until_done=3)
+        requests = {
+            "k1": _mod.matching_request(build_matching_prompt(_rows(2), ["hook-catalog"], {})),
+            "k2": _mod.matching_request(build_matching_prompt(_rows(1), ["hook-catalog"], {})),
+        }
+
+        results = run_batch_job(backend, requests, tmp_path / "requests.jsonl", poll_seconds=5)
+
+        assert mock_sleep.call_count == 2
+        lines = (tmp_path / "requests.jsonl").read_text().splitlines()
+        assert [json.loads(line)["custom_id"] for line in lines] == ["k1", "k2"]
+        assert json.loads(lines[0])["url"] == "/v1/chat/completions"
+        assert json.loads(results["k1"]["content"]) == {"hook-catalog": ["US-001", "US-002"]}
+        assert json.loads(results["k2"]["content"]) == {"hook-catalog": ["US-001"]}
+
+    def test_responder_errors_become_request_errors(self, tmp_path):
+        def fail(body):
+            raise ValueError("model unavailable")
+
+        backend = LocalBatchBackend(tmp_path, fail)
+        results = run_batch_job(backend, {"k": {"model": "m"}}, tmp_path / "r.jsonl")
+        assert "model unavailable" in results["k"]["error"]
+
+    def test_failed_batch_raises(self, tmp_path):
+        backend = LocalBatchBackend(tmp_path, _batch_echo)
+        with pytest.raises(RuntimeError, match="failed"):
+            run_batch_job(backend, {}, tmp_path / "r.jsonl", batch_id="batch_missing")
+
+    def test_results_client_validates_answers(self):
+        llm = BatchResultsClient({
+            "good": {"content": '{"main": ["US-001"]}'},
+            "bad": {"content": '{"main": ["SM-001"]}'},
+            "err": {"error": "rate limited"},
+        })
+        try:
+            assert asyncio.run(llm.complete("good", {})) == {"main": ["US-001"]}
+            with pytest.raises(RuntimeError, match="invalid response"):
+                asyncio.run(llm.complete("bad", {}))
+            with pytest.raises(RuntimeError, match="rate limited"):
+                asyncio.run(llm.complete("err", {}))
+            with pytest.raises(RuntimeError, match="no result"):
+                asyncio.run(llm.complete("missing", {}))
+        finally:
+            llm.close()
+
+
+class TestMainCLIBatchAPI:
+    """Tests for --batch-api, with the local file-based backend."""
+
+    def _run(self, tmp_path, argv, exit_code=0):
+        client = _echo_client()
+        backend = LocalBatchBackend(tmp_path / "batches", _batch_echo, polls_until_done=2)
+        sys.argv = [
+            "generate-section-manifest.py", "--matcher", "openai",
+            "--cache-dir", str(tmp_path / "cache"), "--batch-poll-seconds", "0.01", *argv,
+        ]
+        with patch.object(_mod, "OpenAI", return_value=client), \
+                patch.object(_mod, "OpenAIBatchBackend", return_value=backend):
+            assert main() == exit_code
+        return client
+
+    def test_single_project_via_batch(self, tmp_path, monkeypatch):
+        monkeypatch.setenv("OPENAI_API_KEY", "fake-key")
+        root = _make_project(tmp_path / "proj", [("Widget A", "US-001"), ("Widget B", "US-002")])
+        export = root / ".charter/design-os-export"
+        output = export / "manifest.json"
+
+        client = self._run(tmp_path, [
+            "--export-dir", str(export), "--ux-flows", str(root / ".charter/UX-FLOWS.md"),
+            "--output", str(output), "--batch-api",
+        ])
+
+        assert client.chat.completions.create.call_count == 0
+        manifest = json.loads(output.read_text())
+        assert manifest["sections"]["hook-catalog"] == ["US-001", "US-002"]
+        assert manifest["stories"]["US-001"] == ["hook-catalog"]
+        assert len(list((tmp_path / "cache" / "batches").glob("requests-*.jsonl"))) == 1
+
+        # Batch answers land in the response cache: an interactive re-run is free
+        client = self._run(tmp_path, [
+            "--export-dir", str(export), "--ux-flows", str(root / ".charter/UX-FLOWS.md"),
+            "--output", str(output), "--full",
+        ])
+        assert client.chat.completions.create.call_count == 0
+
+    def test_projects_share_one_batch(self, tmp_path, monkeypatch):
+        """Identical prompts from several projects are submitted once."""
+        monkeypatch.setenv("OPENAI_API_KEY", "fake-key")
+        rows = [("Widget A", "US-001")]
+        for name in ("alpha", "beta"):
+            _make_project(tmp_path / "projects" / name, rows)
+        _make_project(tmp_path / "projects" / "gamma", [("Widget C", "US-003")])
+
+        self._run(tmp_path, [
+            "--projects", str(tmp_path / "projects" / "*"), "--batch-api",
+            "--summary", str(tmp_path / "report.json"),
+        ])
+
+        (batch_dir,) = (tmp_path / "batches").iterdir()
+        assert len((batch_dir / "input.jsonl").read_text().splitlines()) == 2
+        summary = json.loads((tmp_path / "report.json").read_text())
+        assert summary["totals"]["ok"] == 3
+        gamma = json.loads(
+            (tmp_path / "projects/gamma/.charter/design-os-export/manifest.json").read_text()
+        )
+        assert gamma["sections"]["hook-catalog"] == ["US-003"]
+
+    def test_fails_when_inputs_change_during_batch(self, tmp_path, monkeypatch, caplog):
+        """An edit made while the batch runs is not silently mixed into the manifest."""
+        monkeypatch.setenv("OPENAI_API_KEY", "fake-key")
+        root = _make_project(tmp_path / "proj", [("Widget A", "US-001")])
+        ux_flows = root / ".charter/UX-FLOWS.md"
+        output = root / ".charter/design-os-export/manifest.json"
+
+        def edit_then_echo(body):
+            ux_flows.write_text(ux_flows.read_text() + "| Widget B | S1 | US-002 | d |\n")
+            return _batch_echo(body)
+
+        backend = LocalBatchBackend(tmp_path / "batches", edit_then_echo, polls_until_done=2)
+        sys.argv = [
+            "generate-section-manifest.py", "--matcher", "openai",
+            "--cache-dir", str(tmp_path / "cache"), "--batch-poll-seconds", "0.01",
+            "--export-dir", str(root / ".charter/design-os-export"),
+            "--ux-flows", str(ux_flows), "--output", str(output), "--batch-api",
+        ]
+        with patch.object(_mod, "OpenAI", return_value=_echo_client()), \
+                patch.object(_mod, "OpenAIBatchBackend", return_value=backend):
+            assert main() == 1
+
+        assert "Inputs changed while waiting for the batch" in caplog.text
+        assert not output.exists()
+
+    def test_requires_llm_matcher(self, tmp_path):
+        root = _make_project(tmp_path / "proj", [("Widget A", "US-001")])
+        sys.argv = [
+            "generate-section-manifest.py", "--matcher", "local", "--batch-api",
+            "--export-dir", str(root / ".charter/design-os-export"),
+            "--ux-flows", str(root / ".charter/UX-FLOWS.md"),
+            "--output", str(tmp_path / "manifest.json"),
+        ]
+        assert main() == 1
+
+
 # ===========================================================================
 # Gaps 3-6: LLM Behavioral Tests with Synthetic Data
 # (requires OPENAI_API_KEY — tests the LLM's semantic matching ability)
@@ -0,0 +1,140 @@
+"""Unit tests for manifest_lookup.py"""
+
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from manifest_lookup import ManifestIndex, load_manifest_index  # noqa: E402
+
+_SCRIPT = Path(__file__).parent / "manifest_lookup.py"
+
+_SECTIONS = {
+    "landing-and-hero": ["US-001", "US-003"],
+    "hook-catalog": ["US-001", "US-004", "US-006"],
+    "dark-and-light-mode": [],
+    "filter-system": ["US-013"],
+}
+_STORIES = {
+    "US-001": ["landing-and-hero", "hook-catalog"],
+    "US-003": ["landing-and-hero"],
+    "US-004": ["hook-catalog"],
+    "US-006": ["hook-catalog"],
+    "US-013": ["filter-system"],
+}
+
+
+@pytest.fixture
+def manifest_path(tmp_path):
+    path = tmp_path / "manifest.json"
+    path.write_text(json.dumps({
+        "sections": _SECTIONS,
+        "stories": _STORIES,
+        "metadata": {"generated_by": "generate-section-manifest.py"},
+    }))
+    return path
+
+
+# =============================================================================
+# ManifestIndex
+# =============================================================================
+
+class TestManifestIndex:
+    """Tests for story → section lookups."""
+
+    def test_sections_for_story(self, manifest_path):
+        index = load_manifest_index(manifest_path)
+        assert index.sections_for("US-001") == ["landing-and-hero", "hook-catalog"]
+        assert index.sections_for("US-999") == []
+
+    def test_batch_lookup_keeps_request_order(self, manifest_path):
+        index = load_manifest_index(manifest_path)
+        assert index.sections_for_stories(["US-013", "US-999", "US-003"]) == {
+            "US-013": ["filter-system"],
+            "US-999": [],
+            "US-003": ["landing-and-hero"],
+        }
+
+    def test_sections_covering_uses_export_order(self, manifest_path):
+        """The union of sections comes back in manifest order, deduplicated."""
+        index = load_manifest_index(manifest_path)
+        assert index.sections_covering(["US-013", "US-004", "US-001"]) == [
+            "landing-and-hero", "hook-catalog", "filter-system"
+        ]
+        assert index.sections_covering([]) == []
+
+    def test_unmapped(self, manifest_path):
+        index = load_manifest_index(manifest_path)
+        assert index.unmapped(["US-001", "US-050", "US-099"]) == ["US-050", "US-099"]
+
+    def test_stories_in_section(self, manifest_path):
+        index = load_manifest_index(manifest_path)
+        assert index.stories_in("hook-catalog") == ["US-001", "US-004", "US-006"]
+        assert index.stories_in("no-such-section") == []
+
+    def test_legacy_manifest_without_stories_map(self):
+        """Manifests from before the inverted map get it rebuilt on load."""
+        index = ManifestIndex.from_manifest({"sections": _SECTIONS, "metadata": {}})
+        assert index.stories == _STORIES
+
+    def test_rejects_non_manifest(self, tmp_path):
+        path = tmp_path / "manifest.json"
+        path.write_text(json.dumps({"hello": "world"}))
+        with pytest.raises(ValueError, match="sections"):
+            load_manifest_index(path)
+
+    def test_rejects_stories_naming_unknown_section(self, tmp_path):
+        """An inconsistent manifest fails on load, not with a KeyError on lookup."""
+        path = tmp_path / "manifest.json"
+        path.write_text(json.dumps({
+            "sections": _SECTIONS,
+            "stories": {**_STORIES, "US-001": ["landing-and-hero", "deleted-section"]},
+        }))
+        with pytest.raises(ValueError, match="deleted-section"):
+            load_manifest_index(path)
+
+
+# =============================================================================
+# CLI
+# =============================================================================
+
+class TestMainCLI:
+    """Tests for the manifest_lookup.py command line."""
+
+    def _run(self, *args):
+        return subprocess.run(
+            [sys.executable, str(_SCRIPT), *map(str, args)],
+            capture_output=True, text=True
+        )
+
+    def test_prints_sections_for_story_ids(self, manifest_path):
+        result = self._run(manifest_path, "US-004,US-013", "US-077")
+        assert result.returncode == 0
+        assert json.loads(result.stdout) == {
+            "sections": ["hook-catalog", "filter-system"],
+            "stories": {
+                "US-004": ["hook-catalog"],
+                "US-013": ["filter-system"],
+                "US-077": [],
+            },
+            "unmapped": ["US-077"],
+        }
+
+    def test_missing_manifest_returns_1(self, tmp_path):
+        result = self._run(tmp_path / "manifest.json", "US-001")
+        assert result.returncode == 1
+        assert "cannot read manifest" in result.stderr
+
+    def test_inconsistent_manifest_returns_1(self, tmp_path):
+        path = tmp_path / "manifest.json"
+        path.write_text(json.dumps({
+            "sections": {"hook-catalog": ["US-004"]},
+            "stories": {"US-004": ["hook-catalog", "gone"]},
+        }))
+        result = self._run(path, "US-004")
+        assert result.returncode == 1
+        assert "gone" in result.stderr
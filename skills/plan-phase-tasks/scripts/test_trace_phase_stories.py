@@ -1,8 +1,15 @@
 """Unit tests for trace-phase-stories.py"""
 
 import importlib
+import io
+import json
+import os
 import re
+import socket
 import sys
+import tempfile
+import threading
+import time
 from pathlib import Path
 
 import pytest
@@ -18,6 +25,38 @@ MatchResult = _mod.MatchResult
 extract_sm_ids = _mod.extract_sm_ids
 extract_matching_stories = _mod.extract_matching_stories
 format_output = _mod.format_output
+extract_phase_sm_ids = _mod.extract_phase_sm_ids
+iter_story_blocks = _mod.iter_story_blocks
+build_index = _mod.build_index
+load_index = _mod.load_index
+index_path_for = _mod.index_path_for
+match_from_index = _mod.match_from_index
+extract_stories_for_phases = _mod.extract_stories_for_phases
+parse_phase_spec = _mod.parse_phase_spec
+iter_matching_stories = _mod.iter_matching_stories
+write_output = _mod.write_output
+summarize_from_index = _mod.summarize_from_index
+iter_index_stories = _mod.iter_index_stories
+tokenize_story_lines = _mod.tokenize_story_lines
+LINE_TEXT = _mod.LINE_TEXT
+LINE_STORY_HEADER = _mod.LINE_STORY_HEADER
+LINE_BOUNDARY = _mod.LINE_BOUNDARY
+LINE_PARENT = _mod.LINE_PARENT
+parse_roadmap = _mod.parse_roadmap
+parse_story_ids = _mod.parse_story_ids
+format_reverse_trace = _mod.format_reverse_trace
+StoryTrace = _mod.StoryTrace
+phase_to_dict = _mod.phase_to_dict
+story_to_dict = _mod.story_to_dict
+build_parser = _mod.build_parser
+run = _mod.run
+IndexCache = _mod.IndexCache
+make_server = _mod.make_server
+query_daemon = _mod.query_daemon
+main = _mod.main
+update_story_regions = _mod.update_story_regions
+refresh_index = _mod.refresh_index
+phase_fingerprint = _mod.phase_fingerprint
 
 
 # ---------------------------------------------------------------------------
@@ -2700,3 +2739,1019 @@ class TestBoomIntegration:
             f"Phase {phase}: expected {self.EXPECTED_US_COUNT_PER_PHASE[phase]} US IDs, "
             f"got {len(result.us_ids)}"
         )
+
+
+# ===========================================================================
+# Tests for extract_phase_sm_ids (all phases in one pass)
+# ===========================================================================
+
+
+class TestExtractPhaseSmIds:
+    """extract_phase_sm_ids() must agree with extract_sm_ids() per phase."""
+
+    @pytest.mark.parametrize("roadmap", [
+        ROADMAP_SINGLE_PHASE,
+        ROADMAP_MULTIPLE_SMS,
+        ROADMAP_WITH_DUPLICATE_SM,
+        ROADMAP_MISSING_PHASE,
+    ])
+    def test_matches_single_phase_extraction(self, roadmap):
+        phases = extract_phase_sm_ids(roadmap)
+        assert phases
+        for phase_num, sm_ids in phases.items():
+            assert sm_ids == extract_sm_ids(phase_num, roadmap)
+
+    def test_all_phases_found(self):
+        phases = extract_phase_sm_ids(ROADMAP_SINGLE_PHASE)
+        assert phases == {1: ["SM-001", "SM-003"], 2: ["SM-007", "SM-008"]}
+
+    def test_phase_without_sm_ids_is_empty(self):
+        phases = extract_phase_sm_ids(ROADMAP_WITH_DUPLICATE_SM)
+        assert phases[2] == []
+
+    def test_first_section_wins_for_repeated_phase(self):
+        roadmap = """\
+#### PHASE-1: First
+
+| SM-001 | A |
+
+#### PHASE-2: Other
+
+| SM-002 | B |
+
+#### PHASE-1: Again
+
+| SM-009 | C |
+"""
+        phases = extract_phase_sm_ids(roadmap)
+        assert phases[1] == ["SM-001"] == extract_sm_ids(1, roadmap)
+
+    def test_leading_zero_phase_ignored(self):
+        """PHASE-01 is not PHASE-1 for extract_sm_ids, so it is skipped here too."""
+        roadmap = "#### PHASE-01: Padded\n\n| SM-001 | A |\n"
+        assert extract_phase_sm_ids(roadmap) == {}
+        assert extract_sm_ids(1, roadmap) == []
+
+
+# ===========================================================================
+# Tests for iter_story_blocks byte ranges
+# ===========================================================================
+
+
+class TestIterStoryBlocks:
+    """Byte ranges recorded by iter_story_blocks() slice back to the block."""
+
+    @staticmethod
+    def _slice(text: str, block) -> str:
+        data = text.encode("utf-8")[block.start:block.end].decode("utf-8")
+        return "\n".join(data.splitlines())
+
+    @pytest.mark.parametrize("text", [
+        USER_STORIES_BASIC,
+        USER_STORIES_ONE_TO_MANY,
+        USER_STORIES_PARTIAL_MATCH,
+        "#### US-001: Story\r\n\r\n**Parent:** SM-001 (STORY-MAP.md)\r\n\r\n---\r\n",
+        "#### US-001: Café ☕\n\n**Parent:** SM-001\n\nÜnïcödé body\n",
+    ])
+    def test_byte_range_slices_to_block_lines(self, text):
+        blocks = list(iter_story_blocks(text.splitlines(keepends=True)))
+        assert blocks
+        for block in blocks:
+            assert self._slice(text, block) == "\n".join(block.lines)
+
+    def test_records_all_parents(self):
+        text = "#### US-001: S\n**Parent:** SM-001\n**Parent:** SM-1.2-03\n---\n"
+        (block,) = iter_story_blocks(text.splitlines(keepends=True))
+        assert block.us_id == "US-001"
+        assert block.parents == ["SM-001", "SM-1.2-03"]
+
+    def test_yields_unmatched_blocks_too(self):
+        blocks = list(iter_story_blocks(USER_STORIES_BASIC.splitlines(keepends=True)))
+        assert [b.us_id for b in blocks] == ["US-001", "US-003", "US-007"]
+
+
+# ===========================================================================
+# Tests for the on-disk index
+# ===========================================================================
+
+
+class TestTraceIndex:
+    """build_index / load_index / match_from_index against real files."""
+
+    @pytest.fixture
+    def charter(self, tmp_path):
+        roadmap = tmp_path / "ROADMAP.md"
+        stories = tmp_path / "USER-STORIES.md"
+        roadmap.write_text(TestIntegration.ROADMAP, encoding="utf-8")
+        stories.write_text(TestIntegration.USER_STORIES, encoding="utf-8")
+        return roadmap, stories, tmp_path / "index"
+
+    @pytest.mark.parametrize("phase", [2, 3])
+    def test_index_lookup_matches_full_scan(self, charter, phase):
+        roadmap, stories, index_dir = charter
+        index = load_index(roadmap, stories, index_dir)
+
+        sm_ids = extract_sm_ids(phase, roadmap.read_text())
+        expected = extract_matching_stories(sm_ids, stories.read_text())
+        assert index.phases[phase] == sm_ids
+        assert match_from_index(index, sm_ids, stories) == expected
+
+    def test_index_matches_full_scan_with_crlf(self, tmp_path):
+        roadmap = tmp_path / "ROADMAP.md"
+        stories = tmp_path / "USER-STORIES.md"
+        roadmap.write_bytes(TestIntegration.ROADMAP.replace("\n", "\r\n").encode())
+        stories.write_bytes(TestIntegration.USER_STORIES.replace("\n", "\r\n").encode())
+
+        index = load_index(roadmap, stories, tmp_path / "index")
+        sm_ids = index.phases[2]
+        expected = extract_matching_stories(sm_ids, TestIntegration.USER_STORIES)
+        assert match_from_index(index, sm_ids, stories) == expected
+
+    def test_index_written_to_disk(self, charter):
+        roadmap, stories, index_dir = charter
+        load_index(roadmap, stories, index_dir)
+        assert index_path_for(roadmap, stories, index_dir).exists()
+
+    def test_warm_load_does_not_reparse(self, charter, monkeypatch):
+        roadmap, stories, index_dir = charter
+        load_index(roadmap, stories, index_dir)
+
+        def fail(*args, **kwargs):
+            raise AssertionError("index should have been reused")
+
+        monkeypatch.setattr(_mod, "build_index", fail)
+        index = load_index(roadmap, stories, index_dir)
+        assert index.phases[2] == ["SM-007", "SM-008", "SM-009"]
+
+    def test_touched_file_with_same_content_reuses_index(self, charter, monkeypatch):
+        roadmap, stories, index_dir = charter
+        load_index(roadmap, stories, index_dir)
+        st = stories.stat()
+        os.utime(stories, ns=(st.st_atime_ns, st.st_mtime_ns + 5_000_000_000))
+
+        monkeypatch.setattr(_mod, "build_index", lambda *a: pytest.fail("rebuilt"))
+        load_index(roadmap, stories, index_dir)
+
+    def test_changed_file_rebuilds_index(self, charter):
+        roadmap, stories, index_dir = charter
+        load_index(roadmap, stories, index_dir)
+        stories.write_text(
+            TestIntegration.USER_STORIES.replace("**Parent:** SM-012", "**Parent:** SM-009"),
+            encoding="utf-8",
+        )
+
+        index = load_index(roadmap, stories, index_dir)
+        result = match_from_index(index, ["SM-009"], stories)
+        assert result.us_ids == ["US-009", "US-012"]
+
+    def test_corrupt_index_is_rebuilt(self, charter):
+        roadmap, stories, index_dir = charter
+        path = index_path_for(roadmap, stories, index_dir)
+        path.parent.mkdir(parents=True)
+        path.write_text("{not json")
+
+        index = load_index(roadmap, stories, index_dir)
+        assert index.phases[3] == ["SM-012"]
+
+    def test_main_output_identical_with_and_without_index(self, charter, capsys, monkeypatch):
+        roadmap, stories, index_dir = charter
+        outputs = []
+        for extra in (["--no-index"], ["--index-dir", str(index_dir)]):
+            monkeypatch.setattr(sys, "argv", [
+                "trace-phase-stories.py", "2", str(roadmap), str(stories), *extra,
+            ])
+            main()
+            outputs.append(capsys.readouterr().out)
+        assert outputs[0] == outputs[1]
+        assert "#### US-009: Show hook description on card" in outputs[1]
+
+    def test_main_missing_phase_exits_1(self, charter, capsys, monkeypatch):
+        roadmap, stories, index_dir = charter
+        monkeypatch.setattr(sys, "argv", [
+            "trace-phase-stories.py", "9", str(roadmap), str(stories),
+            "--index-dir", str(index_dir),
+        ])
+        with pytest.raises(SystemExit) as exc:
+            main()
+        assert exc.value.code == 1
+        assert "No SM-XXX IDs found for PHASE-9" in capsys.readouterr().err
+
+
+# ===========================================================================
+# Tests for multi-phase batch tracing
+# ===========================================================================
+
+
+class TestParsePhaseSpec:
+    """Tests for parse_phase_spec()."""
+
+    @pytest.mark.parametrize("spec, expected", [
+        ("3", [3]),
+        ("1,4", [1, 4]),
+        ("2-5", [2, 3, 4, 5]),
+        ("2-3,7, 9", [2, 3, 7, 9]),
+        ("1,1-2", [1, 2]),
+    ])
+    def test_valid_specs(self, spec, expected):
+        assert parse_phase_spec(spec) == expected
+
+    @pytest.mark.parametrize("spec", ["x", "1,,2", "5-3", "1-x"])
+    def test_invalid_specs(self, spec):
+        with pytest.raises(ValueError):
+            parse_phase_spec(spec)
+
+
+class TestExtractStoriesForPhases:
+    """extract_stories_for_phases() equals per-phase extract_matching_stories()."""
+
+    def test_matches_per_phase_results(self):
+        phases = extract_phase_sm_ids(TestIntegration.ROADMAP)
+        results = extract_stories_for_phases(phases, TestIntegration.USER_STORIES)
+        assert set(results) == {2, 3}
+        for phase_num, sm_ids in phases.items():
+            expected = extract_matching_stories(sm_ids, TestIntegration.USER_STORIES)
+            assert results[phase_num] == expected
+
+    def test_story_routed_to_every_interested_phase(self):
+        phases = {1: ["SM-007"], 2: ["SM-007", "SM-008"]}
+        results = extract_stories_for_phases(phases, USER_STORIES_ONE_TO_MANY)
+        assert results[1].us_ids == ["US-007", "US-008"]
+        assert results[2].us_ids == ["US-007", "US-008", "US-009"]
+        assert results[2].found_sm_ids == {"SM-007", "SM-008"}
+
+    def test_phase_with_no_stories_gets_empty_result(self):
+        results = extract_stories_for_phases({4: ["SM-999"]}, USER_STORIES_BASIC)
+        assert results[4] == MatchResult()
+
+    def test_block_with_two_matching_parents_counted_once(self):
+        text = "#### US-001: S\n**Parent:** SM-001\n**Parent:** SM-003\n---\n"
+        results = extract_stories_for_phases({1: ["SM-001", "SM-003"]}, text)
+        assert results[1].us_ids == ["US-001"]
+        assert results[1].found_sm_ids == {"SM-001", "SM-003"}
+
+
+class TestBatchCLI:
+    """main() with phase lists, ranges and --all."""
+
+    @pytest.fixture
+    def charter(self, tmp_path):
+        roadmap = tmp_path / "ROADMAP.md"
+        stories = tmp_path / "USER-STORIES.md"
+        roadmap.write_text(TestIntegration.ROADMAP, encoding="utf-8")
+        stories.write_text(TestIntegration.USER_STORIES, encoding="utf-8")
+        return roadmap, stories
+
+    def _run(self, monkeypatch, *argv):
+        monkeypatch.setattr(sys, "argv", ["trace-phase-stories.py", *map(str, argv)])
+        main()
+
+    @pytest.mark.parametrize("index_args", [["--no-index"], []])
+    def test_all_prints_one_document_per_phase(self, charter, capsys, monkeypatch, tmp_path, index_args):
+        roadmap, stories = charter
+        extra = index_args or ["--index-dir", tmp_path / "index"]
+        self._run(monkeypatch, "--all", roadmap, stories, *extra)
+        out = capsys.readouterr().out
+        assert out.index("# Phase 2 — Traced User Stories") < out.index("# Phase 3 — Traced User Stories")
+        assert "**US-XXX IDs in this phase:** US-007 US-008 US-009" in out
+        assert "**US-XXX IDs in this phase:** US-012" in out
+
+    def test_range_matches_single_phase_runs(self, charter, capsys, monkeypatch):
+        roadmap, stories = charter
+        singles = []
+        for phase in (2, 3):
+            self._run(monkeypatch, phase, roadmap, stories, "--no-index")
+            singles.append(capsys.readouterr().out.rstrip("\n"))
+
+        self._run(monkeypatch, "2-3", roadmap, stories, "--no-index")
+        assert capsys.readouterr().out.rstrip("\n") == "\n\n".join(singles)
+
+    def test_output_dir_writes_phase_files(self, charter, capsys, monkeypatch, tmp_path):
+        roadmap, stories = charter
+        out_dir = tmp_path / "traced"
+        self._run(monkeypatch, "--all", roadmap, stories, "--no-index", "--output-dir", out_dir)
+        assert sorted(p.name for p in out_dir.iterdir()) == ["phase-2.md", "phase-3.md"]
+        assert "#### US-012" in (out_dir / "phase-3.md").read_text()
+
+    def test_missing_phase_in_list_reports_and_exits_1(self, charter, capsys, monkeypatch):
+        roadmap, stories = charter
+        with pytest.raises(SystemExit) as exc:
+            self._run(monkeypatch, "2,9", roadmap, stories, "--no-index")
+        assert exc.value.code == 1
+        captured = capsys.readouterr()
+        assert "No SM-XXX IDs found for PHASE-9" in captured.err
+        assert "# Phase 2 — Traced User Stories" in captured.out
+
+    def test_phase_and_all_together_rejected(self, charter, capsys, monkeypatch):
+        roadmap, stories = charter
+        with pytest.raises(SystemExit) as exc:
+            self._run(monkeypatch, "2", roadmap, stories, "--all")
+        assert exc.value.code == 1
+
+
+# ===========================================================================
+# Tests for streaming extraction and output
+# ===========================================================================
+
+
+class TestStreaming:
+    """Generator-based extraction and output match the in-memory path."""
+
+    def test_iter_matching_stories_reads_open_file(self, tmp_path):
+        path = tmp_path / "USER-STORIES.md"
+        path.write_text(TestIntegration.USER_STORIES, encoding="utf-8")
+        with open(path, encoding="utf-8", newline="") as f:
+            matched = [(b.us_id, m) for b, m in iter_matching_stories(["SM-008", "SM-012"], f)]
+        assert matched == [("US-008", ["SM-008"]), ("US-012", ["SM-012"])]
+
+    def test_iter_matching_stories_is_lazy(self):
+        def lines():
+            yield "#### US-001: First\n"
+            yield "**Parent:** SM-001\n"
+            yield "---\n"
+            raise AssertionError("consumed past the first block")
+
+        gen = iter_matching_stories(["SM-001"], lines())
+        block, _ = next(gen)
+        assert block.us_id == "US-001"
+
+    @pytest.mark.parametrize("sm_ids", [
+        ["SM-007", "SM-008", "SM-009"],
+        ["SM-007", "SM-999"],
+        ["SM-999"],
+    ])
+    def test_write_output_matches_format_output(self, sm_ids):
+        result = extract_matching_stories(sm_ids, TestIntegration.USER_STORIES)
+        out = io.StringIO()
+        write_output(out, 2, sm_ids, result, iter(result.stories))
+        assert out.getvalue() == format_output(2, sm_ids, result)
+
+    def test_summarize_from_index_has_no_story_text(self, tmp_path):
+        roadmap = tmp_path / "ROADMAP.md"
+        stories = tmp_path / "USER-STORIES.md"
+        roadmap.write_text(TestIntegration.ROADMAP, encoding="utf-8")
+        stories.write_text(TestIntegration.USER_STORIES, encoding="utf-8")
+        index = build_index(roadmap, stories, with_signatures=False)
+
+        summary = summarize_from_index(index, index.phases[2])
+        full = extract_matching_stories(index.phases[2], TestIntegration.USER_STORIES)
+        assert summary.stories == []
+        assert summary.us_ids == full.us_ids
+        assert summary.found_sm_ids == full.found_sm_ids
+        assert list(iter_index_stories(index, index.phases[2], stories)) == full.stories
+
+    def test_no_index_cli_never_loads_whole_story_file(self, tmp_path, capsys, monkeypatch):
+        roadmap = tmp_path / "ROADMAP.md"
+        stories = tmp_path / "USER-STORIES.md"
+        roadmap.write_text(TestIntegration.ROADMAP, encoding="utf-8")
+        stories.write_text(TestIntegration.USER_STORIES, encoding="utf-8")
+
+        real_read_text = Path.read_text
+
+        def guarded_read_text(self, *args, **kwargs):
+            assert self != stories, "USER-STORIES.md must be streamed"
+            return real_read_text(self, *args, **kwargs)
+
+        monkeypatch.setattr(Path, "read_text", guarded_read_text)
+        monkeypatch.setattr(sys, "argv", [
+            "trace-phase-stories.py", "2", str(roadmap), str(stories), "--no-index",
+        ])
+        main()
+
+        sm_ids = extract_sm_ids(2, TestIntegration.ROADMAP)
+        result = extract_matching_stories(sm_ids, TestIntegration.USER_STORIES)
+        assert capsys.readouterr().out == format_output(2, sm_ids, result) + "\n"
+
+
+# ===========================================================================
+# Tests for the line tokenizer
+# ===========================================================================
+
+
+class TestTokenizeStoryLines:
+    """tokenize_story_lines() classification."""
+
+    @staticmethod
+    def _kinds(text):
+        return [(kind, value) for kind, _, value, _ in tokenize_story_lines(text.splitlines(keepends=True))]
+
+    @pytest.mark.parametrize("line, expected", [
+        ("#### US-001: Title", (LINE_STORY_HEADER, "US-001")),
+        ("#### US-7", (LINE_STORY_HEADER, "US-7")),
+        ("---", (LINE_BOUNDARY, None)),
+        ("## Epic 2", (LINE_BOUNDARY, None)),
+        ("### Feature 2.1", (LINE_BOUNDARY, None)),
+        ("**Parent:** SM-001 (STORY-MAP.md)", (LINE_PARENT, "SM-001")),
+        ("**Parent:**\tSM-1.2-03", (LINE_PARENT, "SM-1.2-03")),
+        ("----", (LINE_TEXT, None)),
+        ("- [ ] criterion", (LINE_TEXT, None)),
+        ("#### us-001: lowercase", (LINE_TEXT, None)),
+        ("##### US-001: too deep", (LINE_TEXT, None)),
+        ("#### Not a story", (LINE_TEXT, None)),
+        ("Parent: SM-001", (LINE_TEXT, None)),
+        ("", (LINE_TEXT, None)),
+    ])
+    def test_classification(self, line, expected):
+        assert self._kinds(line + "\n") == [expected]
+
+    def test_byte_sizes_include_terminators(self):
+        text = "a\r\nbé\n---"
+        sizes = [size for *_, size in tokenize_story_lines(text.splitlines(keepends=True))]
+        assert sizes == [3, 4, 3]
+        assert sum(sizes) == len(text.encode("utf-8"))
+
+    def test_strips_terminators(self):
+        text = "#### US-001: S\r\n---\r\n"
+        lines = [line for _, line, _, _ in tokenize_story_lines(text.splitlines(keepends=True))]
+        assert lines == ["#### US-001: S", "---"]
+
+
+# ===========================================================================
+# Benchmark: tokenizer vs. per-line regex calls
+# ===========================================================================
+
+
+def _regex_per_line_baseline(sm_ids, user_stories_text):
+    """The original extract_matching_stories loop: four re calls per line."""
+    sm_set = set(sm_ids)
+    us_ids = []
+    in_story = False
+    matched = False
+    current = None
+    for line in user_stories_text.splitlines():
+        header = re.match(r"^#### (US-\d+)", line)
+        if header:
+            if in_story and matched:
+                us_ids.append(current)
+            in_story, matched, current = True, False, header.group(1)
+            continue
+        if re.match(r"^---$", line) or re.match(r"^#{2,3}\s", line):
+            if in_story and matched:
+                us_ids.append(current)
+            in_story, matched = False, False
+            continue
+        if in_story:
+            parent = re.search(r"\*\*Parent:\*\*\s+(SM-\d+(?:\.\d+-\d+)?)", line)
+            if parent and parent.group(1) in sm_set:
+                matched = True
+    if in_story and matched:
+        us_ids.append(current)
+    return us_ids
+
+
+@pytest.mark.benchmark
+@pytest.mark.skipif(
+    not os.environ.get("RUN_BENCHMARKS"),
+    reason="Set RUN_BENCHMARKS=1 to run throughput benchmarks",
+)
+class TestTokenizerBenchmark:
+    """Throughput on a synthetic 100k-story USER-STORIES.md."""
+
+    STORY_COUNT = 100_000
+
+    @pytest.fixture
+    def big_user_stories(self):
+        blocks = ["## Epic 1: Synthetic\n\n"]
+        for i in range(self.STORY_COUNT):
+            blocks.append(
+                f"#### US-{i:06d}: Synthetic story {i}\n\n"
+                f"**Parent:** SM-{i % 500:03d} (STORY-MAP.md)\n"
+                f"**Source:** BR-01\n**Release:** MVP\n\n"
+                f"As a user, I want capability {i}.\n\n"
+                f"**Acceptance Criteria:**\n- [ ] Works\n- [ ] Is fast\n\n"
+                f"**Priority:** Must | **Size:** S\n\n---\n\n"
+            )
+        return "".join(blocks)
+
+    def test_tokenizer_faster_than_per_line_regex(self, big_user_stories):
+        sm_ids = [f"SM-{i:03d}" for i in range(0, 500, 5)]
+
+        start = time.perf_counter()
+        baseline_ids = _regex_per_line_baseline(sm_ids, big_user_stories)
+        baseline_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        result = extract_matching_stories(sm_ids, big_user_stories)
+        tokenized_s = time.perf_counter() - start
+
+        lines = big_user_stories.count("\n")
+        print(
+            f"\n{lines:,} lines: per-line regex {lines / baseline_s:,.0f} lines/s, "
+            f"tokenizer {lines / tokenized_s:,.0f} lines/s "
+            f"({baseline_s / tokenized_s:.1f}x)"
+        )
+        assert result.us_ids == baseline_ids
+        assert len(result.us_ids) == self.STORY_COUNT // 5
+        assert tokenized_s < baseline_s / 1.5
+
+
+# ===========================================================================
+# Tests for reverse tracing (US-XXX → SM-XXX → phase/wave)
+# ===========================================================================
+
+
+class TestParseRoadmap:
+    """parse_roadmap() records wave and release for each phase."""
+
+    def test_waves_and_releases(self):
+        phases = parse_roadmap(ROADMAP_SINGLE_PHASE)
+        assert phases[1].wave == "Wave 1"
+        assert phases[2].wave == "Wave 2"
+        assert phases[1].release == phases[2].release == "Release: MVP"
+
+    def test_new_release_resets_wave(self):
+        roadmap = """\
+## Release: MVP
+
+### Wave 1
+
+#### PHASE-1: A
+
+| SM-001 | A |
+
+## Release: R2
+
+#### PHASE-2: B
+
+| SM-002 | B |
+"""
+        phases = parse_roadmap(roadmap)
+        assert (phases[2].release, phases[2].wave) == ("Release: R2", "")
+
+    def test_sm_ids_match_extract_phase_sm_ids(self):
+        phases = parse_roadmap(TestIntegration.ROADMAP)
+        assert {k: v.sm_ids for k, v in phases.items()} == extract_phase_sm_ids(TestIntegration.ROADMAP)
+
+
+class TestReverseTrace:
+    """TraceIndex.trace_story() and the --story CLI."""
+
+    @pytest.fixture
+    def index(self, tmp_path):
+        roadmap = tmp_path / "ROADMAP.md"
+        stories = tmp_path / "USER-STORIES.md"
+        roadmap.write_text(TestIntegration.ROADMAP, encoding="utf-8")
+        stories.write_text(
+            TestIntegration.USER_STORIES + "\n#### US-050: Orphan\n\n**Parent:** SM-099\n\n---\n",
+            encoding="utf-8",
+        )
+        return build_index(roadmap, stories, with_signatures=False)
+
+    def test_story_traced_to_phase_and_wave(self, index):
+        trace = index.trace_story("US-008")
+        assert trace == StoryTrace(
+            us_id="US-008", found=True, sm_ids=["SM-008"], phases=[2], waves=["Wave 1"],
+        )
+
+    def test_story_in_later_wave(self, index):
+        trace = index.trace_story("US-012")
+        assert (trace.phases, trace.waves) == ([3], ["Wave 2"])
+
+    def test_story_not_in_user_stories(self, index):
+        trace = index.trace_story("US-404")
+        assert not trace.found
+        assert trace.sm_ids == trace.phases == []
+
+    def test_story_whose_parent_is_in_no_phase(self, index):
+        trace = index.trace_story("US-050")
+        assert trace.found
+        assert trace.sm_ids == ["SM-099"]
+        assert trace.phases == []
+
+    def test_reverse_trace_agrees_with_forward_trace(self, index):
+        for phase_num, sm_ids in index.phases.items():
+            for us_id in summarize_from_index(index, sm_ids).us_ids:
+                assert phase_num in index.trace_story(us_id).phases
+
+    def test_format_reverse_trace(self, index):
+        output = format_reverse_trace([
+            index.trace_story(us_id) for us_id in ("US-008", "US-050", "US-404")
+        ])
+        assert "| US-008 | SM-008 | 2 | Wave 1 |" in output
+        assert "| US-050 | SM-099 | — | — |" in output
+        assert "| US-404 | — | — | — |" in output
+        assert "- **Not in USER-STORIES.md:** US-404" in output
+        assert "- **Not in any ROADMAP.md phase:** US-050" in output
+
+    def test_parse_story_ids(self, monkeypatch):
+        monkeypatch.setattr(sys, "stdin", io.StringIO("US-003\nUS-004, US-001\n"))
+        assert parse_story_ids(["US-001,US-002", "-"]) == ["US-001", "US-002", "US-003", "US-004"]
+
+    def test_cli_story_option(self, tmp_path, capsys, monkeypatch):
+        roadmap = tmp_path / "ROADMAP.md"
+        stories = tmp_path / "USER-STORIES.md"
+        roadmap.write_text(TestIntegration.ROADMAP, encoding="utf-8")
+        stories.write_text(TestIntegration.USER_STORIES, encoding="utf-8")
+        monkeypatch.setattr(sys, "argv", [
+            "trace-phase-stories.py", "--story", "US-009,US-012",
+            str(roadmap), str(stories), "--index-dir", str(tmp_path / "index"),
+        ])
+        main()
+        out = capsys.readouterr().out
+        assert "| US-009 | SM-009 | 2 | Wave 1 |" in out
+        assert "| US-012 | SM-012 | 3 | Wave 2 |" in out
+
+    @pytest.mark.parametrize("story, stdin", [("-", ""), (" , ", "US-001")])
+    def test_cli_story_without_ids_is_an_error(self, tmp_path, capsys, monkeypatch, story, stdin):
+        roadmap = tmp_path / "ROADMAP.md"
+        stories = tmp_path / "USER-STORIES.md"
+        roadmap.write_text(TestIntegration.ROADMAP, encoding="utf-8")
+        stories.write_text(TestIntegration.USER_STORIES, encoding="utf-8")
+        monkeypatch.setattr(sys, "stdin", io.StringIO(stdin))
+        monkeypatch.setattr(sys, "argv", [
+            "trace-phase-stories.py", "--story", story, str(roadmap), str(stories), "--no-daemon",
+        ])
+        with pytest.raises(SystemExit) as exc_info:
+            main()
+        assert exc_info.value.code == 1
+        captured = capsys.readouterr()
+        assert captured.out == ""
+        assert "--story needs at least one US-XXX ID" in captured.err
+
+
+# ===========================================================================
+# Tests for JSON / NDJSON output
+# ===========================================================================
+
+
+class TestMachineReadableOutput:
+    """--format json / ndjson and the serializers behind them."""
+
+    @pytest.fixture
+    def charter(self, tmp_path):
+        roadmap = tmp_path / "ROADMAP.md"
+        stories = tmp_path / "USER-STORIES.md"
+        roadmap.write_text(TestIntegration.ROADMAP, encoding="utf-8")
+        stories.write_text(TestIntegration.USER_STORIES, encoding="utf-8")
+        return roadmap, stories
+
+    def _run(self, monkeypatch, capsys, *argv):
+        monkeypatch.setattr(sys, "argv", ["trace-phase-stories.py", *map(str, argv), "--no-index"])
+        main()
+        return capsys.readouterr().out
+
+    def test_block_line_numbers(self):
+        blocks = list(iter_story_blocks(USER_STORIES_BASIC.splitlines(keepends=True)))
+        source = USER_STORIES_BASIC.splitlines()
+        for block in blocks:
+            assert source[block.start_line - 1].startswith(f"#### {block.us_id}")
+            assert source[block.start_line - 1:block.end_line] == block.lines
+
+    def test_phase_to_dict_missing_ids(self):
+        result = extract_matching_stories(["SM-007", "SM-999"], TestIntegration.USER_STORIES)
+        phase = phase_to_dict(2, ["SM-007", "SM-999"], result, "Wave 1")
+        assert phase["us_ids"] == ["US-007"]
+        assert phase["found_sm_ids"] == ["SM-007"]
+        assert phase["missing_sm_ids"] == ["SM-999"]
+        assert phase["wave"] == "Wave 1"
+
+    def test_json_single_phase(self, charter, monkeypatch, capsys):
+        doc = json.loads(self._run(monkeypatch, capsys, 2, *charter, "--format", "json"))
+        expected = extract_matching_stories(["SM-007", "SM-008", "SM-009"], TestIntegration.USER_STORIES)
+        assert doc["phase"] == 2
+        assert doc["wave"] == "Wave 1"
+        assert doc["us_ids"] == expected.us_ids
+        assert doc["missing_sm_ids"] == []
+        assert [s["text"] for s in doc["stories"]] == expected.stories
+        assert doc["stories"][0]["start_line"] == 5
+
+    def test_json_multiple_phases_is_array(self, charter, monkeypatch, capsys):
+        docs = json.loads(self._run(monkeypatch, capsys, "--all", *charter, "--format", "json"))
+        assert [d["phase"] for d in docs] == [2, 3]
+
+    def test_ndjson_records(self, charter, monkeypatch, capsys):
+        out = self._run(monkeypatch, capsys, "2-3", *charter, "--format", "ndjson")
+        records = [json.loads(line) for line in out.splitlines()]
+        assert [(r["type"], r["phase"]) for r in records] == [
+            ("phase", 2), ("story", 2), ("story", 2), ("story", 2), ("phase", 3), ("story", 3),
+        ]
+        assert records[-1]["us_id"] == "US-012"
+        assert records[-1]["parents"] == ["SM-012"]
+
+    def test_json_output_dir(self, charter, monkeypatch, capsys, tmp_path):
+        out_dir = tmp_path / "out"
+        self._run(monkeypatch, capsys, "--all", *charter, "--format", "json", "--output-dir", out_dir)
+        doc = json.loads((out_dir / "phase-3.json").read_text())
+        assert doc["us_ids"] == ["US-012"]
+
+    def test_story_json(self, charter, monkeypatch, capsys):
+        out = self._run(monkeypatch, capsys, "--story", "US-012", *charter, "--format", "json")
+        assert json.loads(out) == [{
+            "us_id": "US-012", "found": True, "sm_ids": ["SM-012"], "phases": [3], "waves": ["Wave 2"],
+        }]
+
+
+# ===========================================================================
+# Tests for the trace daemon
+# ===========================================================================
+
+
+@pytest.mark.skipif(not hasattr(_mod.socket, "AF_UNIX"), reason="Unix sockets unavailable")
+class TestDaemon:
+    """IndexCache, the socket server and the falling-back thin client."""
+
+    @pytest.fixture
+    def charter(self, tmp_path):
+        roadmap = tmp_path / "ROADMAP.md"
+        stories = tmp_path / "USER-STORIES.md"
+        roadmap.write_text(TestIntegration.ROADMAP, encoding="utf-8")
+        stories.write_text(TestIntegration.USER_STORIES, encoding="utf-8")
+        return roadmap, stories
+
+    @pytest.fixture
+    def daemon(self):
+        # AF_UNIX paths are length-limited, so avoid pytest's long tmp_path
+        sock_dir = Path(tempfile.mkdtemp(prefix="trace-"))
+        socket_path = sock_dir / "d.sock"
+        cache = IndexCache()
+        server = make_server(socket_path, cache)
+        thread = threading.Thread(target=server.serve_forever, args=(0.01,), daemon=True)
+        thread.start()
+        yield socket_path, cache
+        server.shutdown()
+        server.server_close()
+        socket_path.unlink(missing_ok=True)
+        sock_dir.rmdir()
+
+    def _args(self, *argv):
+        return build_parser().parse_args([str(a) for a in argv])
+
+    def test_cache_reuses_index_until_file_changes(self, charter, tmp_path):
+        roadmap, stories = charter
+        cache = IndexCache()
+        first = cache.get(roadmap, stories, no_index=True)
+        assert cache.get(roadmap, stories, no_index=True) is first
+
+        stories.write_text(TestIntegration.USER_STORIES + "\n#### US-099: New\n**Parent:** SM-012\n")
+        rebuilt = cache.get(roadmap, stories, no_index=True)
+        assert rebuilt is not first
+        assert summarize_from_index(rebuilt, ["SM-012"]).us_ids == ["US-012", "US-099"]
+
+    def test_daemon_answer_matches_in_process(self, charter, daemon):
+        roadmap, stories = charter
+        socket_path, _ = daemon
+        args = self._args(2, roadmap, stories, "--no-index")
+
+        response = query_daemon(socket_path, args)
+        out, err = io.StringIO(), io.StringIO()
+        assert run(args, out, err) == 0
+        assert response == {"stdout": out.getvalue(), "stderr": "", "exit_code": 0}
+
+    def test_daemon_reports_errors_and_exit_code(self, charter, daemon):
+        roadmap, stories = charter
+        socket_path, _ = daemon
+        response = query_daemon(socket_path, self._args(9, roadmap, stories, "--no-index"))
+        assert response["exit_code"] == 1
+        assert "No SM-XXX IDs found for PHASE-9" in response["stderr"]
+
+    def test_daemon_sees_edits(self, charter, daemon):
+        roadmap, stories = charter
+        socket_path, _ = daemon
+        args = self._args("--story", "US-012", roadmap, stories, "--no-index", "--format", "json")
+        assert json.loads(query_daemon(socket_path, args)["stdout"])[0]["phases"] == [3]
+
+        stories.write_text(TestIntegration.USER_STORIES.replace("**Parent:** SM-012", "**Parent:** SM-007"))
+        assert json.loads(query_daemon(socket_path, args)["stdout"])[0]["phases"] == [2]
+
+    def test_daemon_resolves_relative_paths_from_client_cwd(self, charter, daemon, monkeypatch):
+        roadmap, stories = charter
+        socket_path, _ = daemon
+        monkeypatch.chdir(roadmap.parent)
+        response = query_daemon(socket_path, self._args(3, "ROADMAP.md", "USER-STORIES.md", "--no-index"))
+        assert "#### US-012" in response["stdout"]
+
+    def test_client_falls_back_without_daemon(self, charter, capsys, monkeypatch, tmp_path):
+        roadmap, stories = charter
+        assert query_daemon(tmp_path / "missing.sock", self._args(2, roadmap, stories)) is None
+
+        monkeypatch.setattr(sys, "argv", [
+            "trace-phase-stories.py", "2", str(roadmap), str(stories),
+            "--no-index", "--socket", str(tmp_path / "missing.sock"),
+        ])
+        main()
+        assert "# Phase 2 — Traced User Stories" in capsys.readouterr().out
+
+    def test_stale_socket_falls_back_with_stdin_stories(self, charter, capsys, monkeypatch):
+        """Stdin is read once, before the daemon is tried, so the fallback still sees it."""
+        roadmap, stories = charter
+        sock_dir = Path(tempfile.mkdtemp(prefix="trace-"))
+        socket_path = sock_dir / "daemon.sock"
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as stale:
+            stale.bind(str(socket_path))  # bound, never listening: connect is refused
+        try:
+            monkeypatch.setattr(sys, "stdin", io.StringIO("US-009\n"))
+            monkeypatch.setattr(sys, "argv", [
+                "trace-phase-stories.py", "--story", "-", str(roadmap), str(stories),
+                "--no-index", "--socket", str(socket_path),
+            ])
+            main()
+        finally:
+            socket_path.unlink(missing_ok=True)
+            sock_dir.rmdir()
+        assert "| US-009 | SM-009 | 2 | Wave 1 |" in capsys.readouterr().out
+
+    def test_main_uses_daemon_when_listening(self, charter, daemon, capsys, monkeypatch):
+        roadmap, stories = charter
+        socket_path, cache = daemon
+        monkeypatch.setattr(sys, "argv", [
+            "trace-phase-stories.py", "2", str(roadmap), str(stories),
+            "--no-index", "--socket", str(socket_path),
+        ])
+        main()
+        assert "# Phase 2 — Traced User Stories" in capsys.readouterr().out
+        assert cache._entries, "query should have been answered by the daemon"
+
+
+# ===========================================================================
+# Tests for incremental re-trace
+# ===========================================================================
+
+def _index_key(index):
+    """Everything a full rebuild would record, for comparing against updates."""
+    blocks = [
+        (b.us_id, b.parents, b.start, b.end, b.start_line, b.end_line, b.region_end, b.digest)
+        for b in index.stories
+    ]
+    return blocks, index.size, index.total_lines, index.preamble_digest
+
+
+class TestIncrementalIndex:
+    """update_story_regions() re-scans only edited story regions."""
+
+    @pytest.fixture
+    def charter(self, tmp_path):
+        roadmap = tmp_path / "ROADMAP.md"
+        stories = tmp_path / "USER-STORIES.md"
+        roadmap.write_text(TestIntegration.ROADMAP, encoding="utf-8")
+        stories.write_text(TestIntegration.USER_STORIES, encoding="utf-8")
+        return roadmap, stories
+
+    @pytest.mark.parametrize("old, new", [
+        # Edit inside one story: later stories shift by bytes and lines
+        ("I want to see lifecycle event as a badge.\n",
+         "I want to see lifecycle event as a badge.\nAnd in the tooltip too.\n"),
+        # Re-parent a story in place
+        ("**Parent:** SM-008", "**Parent:** SM-012"),
+        # Delete a whole story
+        ("#### US-008: Show lifecycle event with visual distinction\n", "Retired story\n"),
+        # Insert a new story between two others
+        ("---\n\n#### US-009", "---\n\n#### US-020: New\n\n**Parent:** SM-009\n\n---\n\n#### US-009"),
+        # Edit the preamble before the first story
+        ("## Epic 2: Browse Catalog\n", "## Epic 2: Browse the Catalog\n\nIntro.\n"),
+        # Non-ASCII text moves byte offsets differently from characters
+        ("I want a brief description.", "I want a brief description — café."),
+    ])
+    def test_update_matches_full_rebuild(self, charter, old, new):
+        roadmap, stories = charter
+        before = build_index(roadmap, stories, with_signatures=False)
+        assert old in TestIntegration.USER_STORIES
+        stories.write_text(TestIntegration.USER_STORIES.replace(old, new, 1), encoding="utf-8")
+
+        updated = update_story_regions(before, stories)
+        assert updated is not None
+        assert _index_key(updated) == _index_key(build_index(roadmap, stories, with_signatures=False))
+
+    def test_separator_removed_merges_blocks_like_rebuild(self, charter):
+        # US-007 now runs on until the next header, so its unchanged region grows
+        roadmap, stories = charter
+        before = build_index(roadmap, stories, with_signatures=False)
+        stories.write_text(TestIntegration.USER_STORIES.replace("---\n", "", 1), encoding="utf-8")
+
+        updated = update_story_regions(before, stories)
+        assert _index_key(updated) == _index_key(build_index(roadmap, stories, with_signatures=False))
+
+    def test_header_edit_extends_previous_block_like_rebuild(self, tmp_path):
+        stories = tmp_path / "USER-STORIES.md"
+        roadmap = tmp_path / "ROADMAP.md"
+        roadmap.write_text("#### PHASE-1: X\n| SM-001 |\n", encoding="utf-8")
+        stories.write_text(
+            "#### US-001: A\n**Parent:** SM-001\n#### US-002: B\n**Parent:** SM-002\n",
+            encoding="utf-8",
+        )
+        before = build_index(roadmap, stories, with_signatures=False)
+        stories.write_text(
+            "#### US-001: A\n**Parent:** SM-001\nNo longer a header\n**Parent:** SM-002\n",
+            encoding="utf-8",
+        )
+
+        updated = update_story_regions(before, stories)
+        assert [b.parents for b in updated.stories] == [["SM-001", "SM-002"]]
+        assert _index_key(updated) == _index_key(build_index(roadmap, stories, with_signatures=False))
+
+    def test_unchanged_regions_are_reused(self, charter):
+        roadmap, stories = charter
+        before = build_index(roadmap, stories, with_signatures=False)
+        stories.write_text(
+            TestIntegration.USER_STORIES.replace("I want a brief description.", "I want a short one."),
+            encoding="utf-8",
+        )
+
+        updated = update_story_regions(before, stories)
+        # US-007 sits before the edit and US-012 after it; neither was re-scanned
+        assert updated.stories[0] is before.stories[0]
+        assert updated.stories[-1].digest == before.stories[-1].digest
+        assert updated.stories[-1].start == before.stories[-1].start - len("description.") + len("one.")
+        assert before.stories[2].end != updated.stories[2].end, "original index must not be mutated"
+
+    def test_empty_file_needs_full_rebuild(self, charter):
+        roadmap, stories = charter
+        before = build_index(roadmap, stories, with_signatures=False)
+        stories.write_text("", encoding="utf-8")
+        assert update_story_regions(before, stories) is None
+        assert refresh_index(before, roadmap, stories).stories == []
+
+    def test_load_index_updates_persisted_index(self, charter, tmp_path):
+        roadmap, stories = charter
+        index_dir = tmp_path / "index"
+        load_index(roadmap, stories, index_dir)
+        stories.write_text(
+            TestIntegration.USER_STORIES.replace("**Parent:** SM-012", "**Parent:** SM-009"),
+            encoding="utf-8",
+        )
+
+        index = load_index(roadmap, stories, index_dir)
+        assert _index_key(index) == _index_key(build_index(roadmap, stories))
+        assert summarize_from_index(index, ["SM-009"]).us_ids == ["US-009", "US-012"]
+        assert load_index(roadmap, stories, index_dir).user_stories_sig == index.user_stories_sig
+
+    def test_roadmap_only_change_keeps_story_offsets(self, charter):
+        roadmap, stories = charter
+        before = build_index(roadmap, stories)
+        roadmap.write_text(TestIntegration.ROADMAP.replace("| SM-012 |", "| SM-009 |"), encoding="utf-8")
+
+        updated = refresh_index(before, roadmap, stories, roadmap_changed=True, stories_changed=False)
+        assert updated.phases[3] == ["SM-009"]
+        assert updated.stories == before.stories
+
+    def test_cache_refresh_without_index(self, charter):
+        roadmap, stories = charter
+        cache = IndexCache()
+        first = cache.get(roadmap, stories, no_index=True)
+        stories.write_text(
+            TestIntegration.USER_STORIES.replace("**Parent:** SM-012", "**Parent:** SM-007"),
+            encoding="utf-8",
+        )
+        os.utime(stories, ns=(0, 0))
+
+        second = cache.get(roadmap, stories, no_index=True)
+        assert second is not first
+        assert second.trace_story("US-012").phases == [2]
+        assert first.trace_story("US-012").phases == [3]
+
+
+class TestIncrementalOutputDir:
+    """--output-dir rewrites only phases whose inputs changed."""
+
+    @pytest.fixture
+    def charter(self, tmp_path):
+        roadmap = tmp_path / "ROADMAP.md"
+        stories = tmp_path / "USER-STORIES.md"
+        roadmap.write_text(TestIntegration.ROADMAP, encoding="utf-8")
+        stories.write_text(TestIntegration.USER_STORIES, encoding="utf-8")
+        return roadmap, stories
+
+    def _run(self, monkeypatch, capsys, *argv):
+        monkeypatch.setattr(sys, "argv", ["trace-phase-stories.py", *map(str, argv), "--no-daemon"])
+        main()
+        return capsys.readouterr().out
+
+    def test_only_affected_phase_is_rewritten(self, charter, capsys, monkeypatch, tmp_path):
+        roadmap, stories = charter
+        out_dir = tmp_path / "traced"
+        argv = ("--all", roadmap, stories, "--output-dir", out_dir, "--index-dir", tmp_path / "index")
+
+        out = self._run(monkeypatch, capsys, *argv)
+        assert "Wrote" in out and "Unchanged" not in out
+
+        out = self._run(monkeypatch, capsys, *argv)
+        assert f"Unchanged {out_dir / 'phase-2.md'}" in out
+        assert f"Unchanged {out_dir / 'phase-3.md'}" in out
+
+        stories.write_text(
+            TestIntegration.USER_STORIES.replace("Validate", "Check"), encoding="utf-8"
+        )
+        out = self._run(monkeypatch, capsys, *argv)
+        assert f"Unchanged {out_dir / 'phase-2.md'}" in out
+        assert f"Wrote {out_dir / 'phase-3.md'}" in out
+        assert sorted(p.name for p in out_dir.iterdir()) == ["phase-2.md", "phase-3.md"]
+
+    def test_deleted_output_file_is_rewritten(self, charter, capsys, monkeypatch, tmp_path):
+        roadmap, stories = charter
+        out_dir = tmp_path / "traced"
+        argv = ("--all", roadmap, stories, "--output-dir", out_dir, "--index-dir", tmp_path / "index")
+        self._run(monkeypatch, capsys, *argv)
+        (out_dir / "phase-2.md").unlink()
+
+        out = self._run(monkeypatch, capsys, *argv)
+        assert f"Wrote {out_dir / 'phase-2.md'}" in out
+        assert (out_dir / "phase-2.md").is_file()
+
+    def test_json_fingerprint_tracks_offsets(self, charter):
+        roadmap, stories = charter
+        before = build_index(roadmap, stories, with_signatures=False)
+        # Shift phase 3's story down without touching its text
+        stories.write_text("Intro.\n" + TestIntegration.USER_STORIES, encoding="utf-8")
+        after = build_index(roadmap, stories, with_signatures=False)
+        sm_ids = before.phases[3]
+
+        assert phase_fingerprint(before, 3, sm_ids, "markdown") == phase_fingerprint(after, 3, sm_ids, "markdown")
+        assert phase_fingerprint(before, 3, sm_ids, "json") != phase_fingerprint(after, 3, sm_ids, "json")
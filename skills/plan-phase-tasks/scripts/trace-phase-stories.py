@@ -7,18 +7,89 @@ Traces from ROADMAP.md (SM-XXX IDs per phase) to USER-STORIES.md
 
 Usage:
     trace-phase-stories.py <phase-number> <roadmap-path> <user-stories-path>
+        [--format markdown|json|ndjson] [--no-index] [--index-dir <dir>]
+    trace-phase-stories.py <phases> <roadmap-path> <user-stories-path>
+        [--output-dir <dir>]
+    trace-phase-stories.py --all <roadmap-path> <user-stories-path>
+        [--output-dir <dir>]
+    trace-phase-stories.py --story <US-XXX[,US-YYY...]> <roadmap-path> <user-stories-path>
+    trace-phase-stories.py --serve [--socket <path>] [--index-dir <dir>]
 
 Example:
     trace-phase-stories.py 1 .charter/ROADMAP.md .charter/USER-STORIES.md
+    trace-phase-stories.py 1-4,7 .charter/ROADMAP.md .charter/USER-STORIES.md
 
 Output:
     Filtered markdown containing only the US-XXX stories that belong
     to the specified phase's SM-XXX IDs, preserving original formatting.
+    With several phases (or --all), one document per phase is printed in
+    order, or written to <output-dir>/phase-N.md. Both files are still read
+    only once: every story block is routed to all phases that want it.
+    Story blocks are written to the output one at a time (seek-and-slice
+    from recorded byte offsets), so memory stays bounded by the largest
+    story block rather than by the size of USER-STORIES.md.
+    --format json prints the same data as a JSON object (an array of them
+    for several phases) with story blocks and their line/byte offsets;
+    --format ndjson streams one phase record followed by one record per
+    story, so consumers never have to regex the markdown.
+    --story reverses the trace: a table of each US-XXX ID's Parent SM-XXX,
+    owning phase(s) and wave, answered from the same index.
+
+Index:
+    Phase → SM-XXX lists and US-XXX story byte offsets are cached on disk
+    (default: $XDG_CACHE_HOME/claude-forge/trace-phase-stories). The index
+    is reused while both files keep the same mtime/size (or content hash),
+    so repeated lookups across a release seek straight to the matching
+    story blocks instead of re-scanning USER-STORIES.md. Each story's
+    region also gets a content digest: after an edit only the changed
+    regions are re-scanned, and --output-dir rewrites only the phase files
+    whose stories or SM-XXX lists changed (their fingerprints are kept in
+    the index directory; --no-index always rewrites every file).
+
+Daemon:
+    --serve keeps parsed files in memory and answers queries over a Unix
+    socket (default: <index-dir>/daemon.sock), re-parsing a file only when
+    its mtime or size changes. Every normal invocation first tries that
+    socket and falls back to running in-process when no daemon is
+    listening (or pass --no-daemon).
 """
 
+import argparse
+import hashlib
+import io
+import json
+import mmap
+import os
 import re
+import signal
+import socket
+import socketserver
 import sys
-from dataclasses import dataclass, field
+import threading
+from dataclasses import asdict, dataclass, field, replace
+from pathlib import Path
+from typing import Iterable, Iterator, TextIO
+
+INDEX_VERSION = 4
+
+# Everything str.splitlines() treats as a line boundary
+_LINE_TERMINATORS = "\r\n\x0b\x0c\x1c\x1d\x1e\x85\u2028\u2029"
+
+# Precompiled patterns for the per-line hot paths.
+# Supports both simple (SM-001) and hierarchical (SM-1.2-01) SM-XXX formats.
+_SM_ID_RE = re.compile(r"SM-\d+(?:\.\d+-\d+)?")
+_PHASE_HEADER_RE = re.compile(r"####\s+PHASE-(\d+):")
+_PHASE_END_RE = re.compile(r"#{2,4}\s")
+_RELEASE_OR_WAVE_RE = re.compile(r"(#{2,3})\s+(.*?)\s*$")
+_US_HEADER_RE = re.compile(r"#### (US-\d+)")
+_STORY_END_HEADING_RE = re.compile(r"#{2,3}\s")
+_PARENT_RE = re.compile(r"\*\*Parent:\*\*\s+(SM-\d+(?:\.\d+-\d+)?)")
+
+# Line kinds produced by tokenize_story_lines()
+LINE_TEXT = 0
+LINE_STORY_HEADER = 1   # '#### US-XXX ...' — value is the US-XXX ID
+LINE_BOUNDARY = 2       # '---' or a ## / ### heading
+LINE_PARENT = 3         # '**Parent:** SM-XXX' — value is the SM-XXX ID
 
 
 @dataclass
@@ -30,6 +101,86 @@ class MatchResult:
     us_count: int = 0                                        # total stories found
 
 
+@dataclass
+class StoryBlock:
+    """A '#### US-XXX' block from USER-STORIES.md and its byte range."""
+    us_id: str
+    parents: list[str] = field(default_factory=list)   # every **Parent:** SM-XXX in the block
+    lines: list[str] = field(default_factory=list)     # block lines, without terminators
+    start: int = 0                                      # byte offset of the header line
+    end: int = 0                                        # byte offset just past the last line
+    start_line: int = 0                                 # 1-based line number of the header
+    end_line: int = 0                                   # 1-based line number of the last line
+    region_end: int = 0                                 # byte offset of the next header (or EOF)
+    digest: str = ""                                    # hash of the bytes in [start, region_end)
+
+
+@dataclass
+class PhaseInfo:
+    """A '#### PHASE-N:' section of ROADMAP.md."""
+    sm_ids: list[str] = field(default_factory=list)   # sorted, deduplicated
+    wave: str = ""       # enclosing ### heading, e.g. "Wave 2"
+    release: str = ""    # enclosing ## heading, e.g. "Release: MVP"
+
+
+@dataclass
+class StoryTrace:
+    """Reverse trace of one US-XXX ID back to its SM-XXX parents and phases."""
+    us_id: str
+    found: bool = False                                  # has a '#### US-XXX' block
+    sm_ids: list[str] = field(default_factory=list)      # **Parent:** IDs
+    phases: list[int] = field(default_factory=list)      # phases listing those SM-XXX IDs
+    waves: list[str] = field(default_factory=list)       # wave of each phase, same order
+
+
+@dataclass
+class TraceIndex:
+    """Phase → SM-XXX lists and story byte ranges for one ROADMAP/USER-STORIES pair."""
+    phases: dict[int, list[str]] = field(default_factory=dict)
+    waves: dict[int, str] = field(default_factory=dict)
+    releases: dict[int, str] = field(default_factory=dict)
+    stories: list[StoryBlock] = field(default_factory=list)   # lines left empty
+    roadmap_sig: dict = field(default_factory=dict)
+    user_stories_sig: dict = field(default_factory=dict)
+    size: int = 0                # USER-STORIES.md size in bytes when indexed
+    total_lines: int = 0         # ...and its line count
+    preamble_digest: str = ""    # hash of the bytes before the first story header
+    by_parent: dict[str, list[int]] | None = field(default=None, repr=False, compare=False)
+    by_us_id: dict[str, list[int]] | None = field(default=None, repr=False, compare=False)
+
+    def story_indexes_for(self, sm_ids: list[str]) -> list[int]:
+        """Positions in self.stories whose Parent is one of sm_ids, in document order."""
+        if self.by_parent is None:
+            by_parent: dict[str, list[int]] = {}
+            for i, block in enumerate(self.stories):
+                for parent in dict.fromkeys(block.parents):
+                    by_parent.setdefault(parent, []).append(i)
+            self.by_parent = by_parent
+        return sorted({i for sm in set(sm_ids) for i in self.by_parent.get(sm, ())})
+
+    def trace_story(self, us_id: str) -> StoryTrace:
+        """Reverse lookup: which SM-XXX, phase and wave own a US-XXX story."""
+        if self.by_us_id is None:
+            by_us_id: dict[str, list[int]] = {}
+            for i, block in enumerate(self.stories):
+                by_us_id.setdefault(block.us_id, []).append(i)
+            self.by_us_id = by_us_id
+
+        trace = StoryTrace(us_id=us_id)
+        for i in self.by_us_id.get(us_id, ()):
+            trace.found = True
+            for parent in self.stories[i].parents:
+                if parent not in trace.sm_ids:
+                    trace.sm_ids.append(parent)
+
+        sm_set = set(trace.sm_ids)
+        for phase_num, sm_ids in sorted(self.phases.items()):
+            if sm_set.intersection(sm_ids):
+                trace.phases.append(phase_num)
+                trace.waves.append(self.waves.get(phase_num, ""))
+        return trace
+
+
 def extract_sm_ids(phase_num: int, roadmap_text: str) -> list[str]:
     """Parse SM-XXX IDs from a phase section in ROADMAP.md.
 
@@ -40,27 +191,186 @@ def extract_sm_ids(phase_num: int, roadmap_text: str) -> list[str]:
     """
     sm_ids: list[str] = []
     in_phase = False
+    target = str(phase_num)
 
     for line in roadmap_text.splitlines():
-        # Detect start of target phase
-        if re.match(rf"^####\s+PHASE-{phase_num}:", line):
-            in_phase = True
-            continue
+        # Only '#' lines can be headings — skip the regexes for everything else
+        if line.startswith("#"):
+            # Detect start of target phase
+            phase_match = _PHASE_HEADER_RE.match(line)
+            if phase_match and phase_match.group(1) == target:
+                in_phase = True
+                continue
 
-        # Detect end of phase section (any heading level 2-4)
-        if in_phase and re.match(r"^#{2,4}\s", line):
-            break
+            # Detect end of phase section (any heading level 2-4)
+            if in_phase and _PHASE_END_RE.match(line):
+                break
 
         # Extract SM-XXX from table rows while inside the phase
-        # Supports both simple (SM-001) and hierarchical (SM-1.2-01) formats
         if in_phase:
-            for match in re.finditer(r"SM-\d+(?:\.\d+-\d+)?", line):
-                sm_ids.append(match.group())
+            sm_ids.extend(_SM_ID_RE.findall(line))
 
     # Deduplicate and sort
     return sorted(set(sm_ids))
 
 
+def parse_roadmap(roadmap_text: str) -> dict[int, PhaseInfo]:
+    """Parse every '#### PHASE-N:' section of ROADMAP.md in a single pass.
+
+    SM-XXX IDs follow extract_sm_ids(): only the first section for a phase
+    number counts, and a repeated heading for the phase being collected
+    continues it. Each phase also records its enclosing ### (wave) and
+    ## (release) headings.
+    """
+    phases: dict[int, PhaseInfo] = {}
+    sm_sets: dict[int, set[str]] = {}
+    current: int | None = None
+    release = ""
+    wave = ""
+
+    for line in roadmap_text.splitlines():
+        if line.startswith("#"):
+            phase_match = _PHASE_HEADER_RE.match(line)
+            if phase_match and str(int(phase_match.group(1))) == phase_match.group(1):
+                phase_num = int(phase_match.group(1))
+                if phase_num == current:
+                    continue
+                if phase_num in phases:
+                    current = None  # later duplicate section — ignored
+                    continue
+                phases[phase_num] = PhaseInfo(wave=wave, release=release)
+                sm_sets[phase_num] = set()
+                current = phase_num
+                continue
+
+            if _PHASE_END_RE.match(line):
+                current = None
+                heading_match = _RELEASE_OR_WAVE_RE.match(line)
+                if heading_match and len(heading_match.group(1)) == 2:
+                    release, wave = heading_match.group(2), ""
+                elif heading_match:
+                    wave = heading_match.group(2)
+                continue
+
+        if current is not None:
+            sm_sets[current].update(_SM_ID_RE.findall(line))
+
+    for phase_num, info in phases.items():
+        info.sm_ids = sorted(sm_sets[phase_num])
+    return phases
+
+
+def extract_phase_sm_ids(roadmap_text: str) -> dict[int, list[str]]:
+    """Parse SM-XXX IDs for every phase in ROADMAP.md in a single pass.
+
+    Gives the same answer as extract_sm_ids() for each '#### PHASE-N:'
+    heading.
+
+    Returns {phase_num: sorted, deduplicated SM-XXX IDs}.
+    """
+    return {phase_num: info.sm_ids for phase_num, info in parse_roadmap(roadmap_text).items()}
+
+
+def tokenize_story_lines(lines: Iterable[str]) -> Iterator[tuple[int, str, str | None, int]]:
+    """Classify USER-STORIES.md lines as (kind, line, value, byte_size).
+
+    Dispatches on the first character before running any regex: only '#'
+    lines can be headings, only '-' lines can be '---', and the Parent
+    pattern runs only when the literal '**Parent:**' is on the line.
+    `line` has its terminator stripped; `byte_size` includes it.
+    """
+    for raw in lines:
+        line = raw.rstrip(_LINE_TERMINATORS)
+        size = len(raw) if raw.isascii() else len(raw.encode("utf-8"))
+
+        first = line[:1]
+        if first == "#":
+            header_match = _US_HEADER_RE.match(line)
+            if header_match:
+                yield LINE_STORY_HEADER, line, header_match.group(1), size
+                continue
+            if _STORY_END_HEADING_RE.match(line):
+                yield LINE_BOUNDARY, line, None, size
+                continue
+        elif first == "-" and line == "---":
+            yield LINE_BOUNDARY, line, None, size
+            continue
+
+        if "**Parent:**" in line:
+            parent_match = _PARENT_RE.search(line)
+            if parent_match:
+                yield LINE_PARENT, line, parent_match.group(1), size
+                continue
+
+        yield LINE_TEXT, line, None, size
+
+
+def iter_story_blocks(
+    lines: Iterable[str], start_offset: int = 0, first_line: int = 1
+) -> Iterator[StoryBlock]:
+    """Yield every '#### US-XXX' block of USER-STORIES.md in document order.
+
+    `lines` must keep their line terminators (splitlines(keepends=True) or a
+    file opened with newline="") so each block's byte range can be recorded.
+    A block ends at '---', a ## / ### heading, or the next story header.
+    start_offset / first_line place `lines` within the file when scanning
+    starts part-way through it.
+    """
+    block: StoryBlock | None = None
+    offset = start_offset
+
+    for line_no, (kind, line, value, size) in enumerate(
+        tokenize_story_lines(lines), start=first_line
+    ):
+        if kind == LINE_STORY_HEADER:
+            if block is not None:
+                yield block
+            block = StoryBlock(
+                us_id=value,
+                lines=[line],
+                start=offset,
+                end=offset + size,
+                start_line=line_no,
+                end_line=line_no,
+            )
+
+        elif kind == LINE_BOUNDARY:
+            if block is not None:
+                yield block
+            block = None
+
+        elif block is not None:
+            block.lines.append(line)
+            block.end = offset + size
+            block.end_line = line_no
+            if kind == LINE_PARENT:
+                block.parents.append(value)
+
+        offset += size
+
+    # Final story without a trailing separator
+    if block is not None:
+        yield block
+
+
+def iter_matching_stories(
+    sm_ids: list[str], lines: Iterable[str]
+) -> Iterator[tuple[StoryBlock, list[str]]]:
+    """Yield (block, matching parent IDs) for each story whose Parent is in sm_ids.
+
+    Blocks are yielded as soon as they end, so `lines` can be an open file
+    (newline="") and only one story block is held in memory at a time.
+    """
+    # Parent fields must equal one of our SM-XXX IDs exactly (SM-001 must not
+    # match SM-0011), so compare full tokens against a set.
+    sm_set = set(sm_ids)
+
+    for block in iter_story_blocks(lines):
+        matching = [p for p in block.parents if p in sm_set]
+        if matching:
+            yield block, matching
+
+
 def extract_matching_stories(
     sm_ids: list[str], user_stories_text: str
 ) -> MatchResult:
@@ -76,174 +386,1089 @@ def extract_matching_stories(
     """
     result = MatchResult()
 
-    # Build a regex pattern that matches any of our SM-XXX IDs exactly
-    # Using word boundary (\b) would not work well since SM-001 vs SM-00 needs
-    # exact matching. We match the full SM-NNN token in the Parent field.
-    sm_set = set(sm_ids)
+    lines = user_stories_text.splitlines(keepends=True)
+    for block, matching in iter_matching_stories(sm_ids, lines):
+        result.stories.append("\n".join(block.lines))
+        result.us_count += 1
+        result.us_ids.append(block.us_id)
+        result.found_sm_ids.update(matching)
 
-    in_story = False
-    buffer_lines: list[str] = []
-    matched = False
-    current_us_id: str | None = None
-
-    def flush():
-        nonlocal in_story, buffer_lines, matched, current_us_id
-        if in_story and matched:
-            result.stories.append("\n".join(buffer_lines))
-            result.us_count += 1
-            if current_us_id:
-                result.us_ids.append(current_us_id)
-        in_story = False
-        buffer_lines = []
-        matched = False
-        current_us_id = None
-
-    for line in user_stories_text.splitlines():
-        # Story header: #### US-XXX: Title
-        us_header_match = re.match(r"^#### (US-\d+)", line)
-        if us_header_match:
-            flush()
-            in_story = True
-            buffer_lines = [line]
-            matched = False
-            current_us_id = us_header_match.group(1)
-            continue
+    return result
 
-        # End of story block: --- or higher-level header (## or ###)
-        if re.match(r"^---$", line) or re.match(r"^#{2,3}\s", line):
-            flush()
-            continue
 
-        # Inside a story block
-        if in_story:
-            buffer_lines.append(line)
+def extract_stories_for_phases(
+    phase_sm_ids: dict[int, list[str]], user_stories_text: str
+) -> dict[int, MatchResult]:
+    """Route every story block to all interested phases in one pass.
 
-            # Check for Parent match: **Parent:** SM-XXX
-            # Supports both simple (SM-001) and hierarchical (SM-1.2-01) formats
-            parent_match = re.search(r"\*\*Parent:\*\*\s+(SM-\d+(?:\.\d+-\d+)?)", line)
-            if parent_match:
-                parent_id = parent_match.group(1)
-                if parent_id in sm_set:
-                    matched = True
-                    result.found_sm_ids.add(parent_id)
+    Equivalent to calling extract_matching_stories() once per phase, but
+    USER-STORIES.md is scanned a single time regardless of phase count.
+    """
+    results = {phase_num: MatchResult() for phase_num in phase_sm_ids}
 
-    # Flush final story if matched
-    flush()
+    sm_to_phases: dict[str, list[int]] = {}
+    for phase_num, sm_ids in phase_sm_ids.items():
+        for sm_id in set(sm_ids):
+            sm_to_phases.setdefault(sm_id, []).append(phase_num)
 
-    return result
+    for block in iter_story_blocks(user_stories_text.splitlines(keepends=True)):
+        matched_phases: dict[int, None] = {}
+        for parent in block.parents:
+            for phase_num in sm_to_phases.get(parent, ()):
+                results[phase_num].found_sm_ids.add(parent)
+                matched_phases[phase_num] = None
 
+        if matched_phases:
+            story = "\n".join(block.lines)
+            for phase_num in matched_phases:
+                result = results[phase_num]
+                result.stories.append(story)
+                result.us_count += 1
+                result.us_ids.append(block.us_id)
 
-def format_output(
-    phase_num: int, sm_ids: list[str], result: MatchResult
-) -> str:
-    """Format the final markdown output with header, stories, and trace summary."""
-    lines: list[str] = []
+    return results
+
+
+def iter_output_lines(
+    phase_num: int, sm_ids: list[str], result: MatchResult, stories: Iterable[str]
+) -> Iterator[str]:
+    """Yield the output document line by line.
 
+    The header and summary come from `result`; story blocks come from
+    `stories`, which may be a lazy iterable so large phases never have to
+    be held in memory as one string.
+    """
     # Header
-    lines.append(f"# Phase {phase_num} — Traced User Stories")
-    lines.append("")
-    lines.append(f"**SM-XXX IDs in this phase:** {' '.join(sm_ids)}")
-    lines.append(f"**US-XXX IDs in this phase:** {' '.join(result.us_ids)}")
-    lines.append(
+    yield f"# Phase {phase_num} — Traced User Stories"
+    yield ""
+    yield f"**SM-XXX IDs in this phase:** {' '.join(sm_ids)}"
+    yield f"**US-XXX IDs in this phase:** {' '.join(result.us_ids)}"
+    yield (
         f"**US stories found:** {result.us_count} "
         f"(covering {len(result.found_sm_ids)} of {len(sm_ids)} SM-XXX IDs)"
     )
-    lines.append("")
-    lines.append("---")
-    lines.append("")
+    yield ""
+    yield "---"
+    yield ""
 
     # Story blocks separated by ---
-    for story in result.stories:
-        lines.append(story)
-        lines.append("---")
+    for story in stories:
+        yield story
+        yield "---"
 
-    lines.append("")
+    yield ""
 
     # Trace summary
-    lines.append("## Trace Summary")
-    lines.append("")
-    lines.append(f"- **Phase:** {phase_num}")
-    lines.append(f"- **SM-XXX IDs:** {len(sm_ids)}")
-    lines.append(f"- **US-XXX stories found:** {result.us_count}")
+    yield "## Trace Summary"
+    yield ""
+    yield f"- **Phase:** {phase_num}"
+    yield f"- **SM-XXX IDs:** {len(sm_ids)}"
+    yield f"- **US-XXX stories found:** {result.us_count}"
 
     # Missing SM-XXX IDs
     missing = [sm for sm in sm_ids if sm not in result.found_sm_ids]
     if missing:
-        lines.append(f"- **Missing (no US-XXX for SM-XXX):** {' '.join(missing)}")
-        lines.append("")
-        lines.append(
+        yield f"- **Missing (no US-XXX for SM-XXX):** {' '.join(missing)}"
+        yield ""
+        yield (
             "> **Warning:** The above SM-XXX IDs have no matching "
             "US-XXX story in USER-STORIES.md."
         )
-        lines.append(
-            "> Fall back to STORY-MAP.md for these stories' descriptions."
+        yield "> Fall back to STORY-MAP.md for these stories' descriptions."
+
+
+def format_output(
+    phase_num: int, sm_ids: list[str], result: MatchResult
+) -> str:
+    """Format the final markdown output with header, stories, and trace summary."""
+    return "\n".join(iter_output_lines(phase_num, sm_ids, result, result.stories))
+
+
+def write_output(
+    out: TextIO,
+    phase_num: int,
+    sm_ids: list[str],
+    result: MatchResult,
+    stories: Iterable[str],
+) -> None:
+    """Stream the same document as format_output() to `out` (no trailing newline)."""
+    for i, line in enumerate(iter_output_lines(phase_num, sm_ids, result, stories)):
+        if i:
+            out.write("\n")
+        out.write(line)
+
+
+def phase_to_dict(
+    phase_num: int,
+    sm_ids: list[str],
+    result: MatchResult,
+    wave: str = "",
+    release: str = "",
+) -> dict:
+    """JSON-ready phase summary: the header/trace-summary fields of format_output()."""
+    return {
+        "phase": phase_num,
+        "wave": wave,
+        "release": release,
+        "sm_ids": sm_ids,
+        "us_ids": result.us_ids,
+        "us_count": result.us_count,
+        "found_sm_ids": sorted(result.found_sm_ids),
+        "missing_sm_ids": [sm for sm in sm_ids if sm not in result.found_sm_ids],
+    }
+
+
+def story_to_dict(block: StoryBlock, text: str) -> dict:
+    """JSON-ready story block with its line and byte offsets in USER-STORIES.md."""
+    return {
+        "us_id": block.us_id,
+        "parents": block.parents,
+        "start_line": block.start_line,
+        "end_line": block.end_line,
+        "start_byte": block.start,
+        "end_byte": block.end,
+        "text": text,
+    }
+
+
+def write_ndjson(
+    out: TextIO, phase: dict, blocks: Iterable[tuple[StoryBlock, str]]
+) -> None:
+    """Stream one {"type": "phase"} record, then one {"type": "story"} record per block."""
+    out.write(json.dumps({"type": "phase", **phase}) + "\n")
+    for block, text in blocks:
+        record = {"type": "story", "phase": phase["phase"], **story_to_dict(block, text)}
+        out.write(json.dumps(record) + "\n")
+
+
+# -----------------------------------------------------------------------------
+# On-disk index
+# -----------------------------------------------------------------------------
+
+def default_index_dir() -> Path:
+    """Directory holding trace indexes ($XDG_CACHE_HOME or ~/.cache)."""
+    cache_home = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(cache_home) / "claude-forge" / "trace-phase-stories"
+
+
+def index_path_for(roadmap_path: Path, user_stories_path: Path, index_dir: Path) -> Path:
+    """Index file for a ROADMAP/USER-STORIES pair, keyed by resolved paths."""
+    key = f"{roadmap_path.resolve()}\0{user_stories_path.resolve()}"
+    return index_dir / f"{hashlib.sha256(key.encode('utf-8')).hexdigest()[:16]}.json"
+
+
+def _sha256_file(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _file_signature(path: Path) -> dict:
+    st = path.stat()
+    return {"mtime_ns": st.st_mtime_ns, "size": st.st_size, "sha256": _sha256_file(path)}
+
+
+def _signature_matches(path: Path, sig: dict) -> tuple[bool, bool]:
+    """Check a recorded signature: returns (matches, stat_changed).
+
+    mtime + size is the fast path; a touched-but-identical file is still
+    accepted by falling back to the content hash.
+    """
+    st = path.stat()
+    if st.st_size != sig.get("size"):
+        return False, True
+    if st.st_mtime_ns == sig.get("mtime_ns"):
+        return True, False
+    return _sha256_file(path) == sig.get("sha256"), True
+
+
+def _region_digest(data: bytes) -> str:
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def _apply_roadmap(index: TraceIndex, roadmap_path: Path) -> None:
+    roadmap = parse_roadmap(roadmap_path.read_text(encoding="utf-8"))
+    index.phases = {phase_num: info.sm_ids for phase_num, info in roadmap.items()}
+    index.waves = {phase_num: info.wave for phase_num, info in roadmap.items()}
+    index.releases = {phase_num: info.release for phase_num, info in roadmap.items()}
+
+
+def _iter_lines_between(path: Path, start: int, stop: int) -> Iterator[str]:
+    """Lines (with terminators) of the byte range [start, stop), which must fall on line starts."""
+    raw = open(path, "rb")
+    raw.seek(start)
+    with io.TextIOWrapper(raw, encoding="utf-8", newline="") as f:
+        offset = start
+        for line in f:
+            if offset >= stop:
+                break
+            yield line
+            offset += len(line) if line.isascii() else len(line.encode("utf-8"))
+
+
+def _scan_regions(
+    lines: Iterable[str], start_offset: int, first_line: int, region_end: int
+) -> tuple[list[StoryBlock], int]:
+    """Story blocks of a scanned range with region_end filled in, plus its line count.
+
+    A story's region runs from its header to the next header, so it also
+    covers the separators and headings after the block.
+    """
+    line_count = 0
+
+    def counted() -> Iterator[str]:
+        nonlocal line_count
+        for line in lines:
+            line_count += 1
+            yield line
+
+    blocks: list[StoryBlock] = []
+    for block in iter_story_blocks(counted(), start_offset, first_line):
+        block.lines = []
+        if blocks:
+            blocks[-1].region_end = block.start
+        blocks.append(block)
+    if blocks:
+        blocks[-1].region_end = region_end
+    return blocks, line_count
+
+
+def _digest_regions(blocks: list[StoryBlock], data) -> None:
+    for block in blocks:
+        block.digest = _region_digest(data[block.start:block.region_end])
+
+
+def build_index(
+    roadmap_path: Path, user_stories_path: Path, with_signatures: bool = True
+) -> TraceIndex:
+    """Parse both files once and record phases plus story byte ranges.
+
+    USER-STORIES.md is streamed line by line; only offsets and a digest of
+    each story's region are kept, never story text. Pass
+    with_signatures=False for an in-memory index that will not be saved
+    (skips hashing the files).
+    """
+    index = TraceIndex()
+    if with_signatures:
+        index.roadmap_sig = _file_signature(roadmap_path)
+        index.user_stories_sig = _file_signature(user_stories_path)
+    _apply_roadmap(index, roadmap_path)
+
+    index.size = user_stories_path.stat().st_size
+    with open(user_stories_path, "r", encoding="utf-8", newline="") as f:
+        index.stories, index.total_lines = _scan_regions(f, 0, 1, index.size)
+
+    if index.size:
+        with open(user_stories_path, "rb") as f, \
+                mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            preamble_end = index.stories[0].start if index.stories else len(data)
+            index.preamble_digest = _region_digest(data[:preamble_end])
+            _digest_regions(index.stories, data)
+
+    return index
+
+
+def update_story_regions(index: TraceIndex, user_stories_path: Path) -> TraceIndex | None:
+    """Re-scan only the part of USER-STORIES.md that changed since `index` was built.
+
+    Story regions still byte-identical at the start of the file, and at the
+    end once shifted by the size difference, are reused as-is (the latter
+    with their offsets and line numbers moved). Only the bytes in between
+    are tokenized again, starting one unchanged region early: its header
+    resets the scan, so block boundaries come out exactly as a full rebuild
+    would make them. Returns a new TraceIndex (`index` is left untouched for
+    concurrent readers), or None when a full rebuild is needed.
+    """
+    if not index.size or not index.preamble_digest:
+        return None
+
+    with open(user_stories_path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if not size:
+            return None
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            # (start, end, start_line, digest) for the preamble and every story region
+            first_start = index.stories[0].start if index.stories else index.size
+            regions = [(0, first_start, 1, index.preamble_digest)] + [
+                (b.start, b.region_end, b.start_line, b.digest) for b in index.stories
+            ]
+            shift = size - index.size
+
+            head = 0
+            while head < len(regions):
+                start, end, _, digest = regions[head]
+                if end > size or _region_digest(data[start:end]) != digest:
+                    break
+                head += 1
+            if head == len(regions) and not shift:
+                return replace(index, by_parent=None, by_us_id=None)
+
+            first = max(head - 1, 0)
+            floor = regions[head - 1][1] if head else 0
+            tail = 0
+            while len(regions) - 1 - tail >= max(head, 1):
+                start, end, _, digest = regions[-1 - tail]
+                start += shift
+                # A reused region must still begin a line, after the reused head
+                if start < floor or not start or data[start - 1:start] not in (b"\n", b"\r"):
+                    break
+                if _region_digest(data[start:end + shift]) != digest:
+                    break
+                tail += 1
+
+            scan_start, _, scan_first_line, _ = regions[first]
+            if tail:
+                old_scan_end, _, old_end_line, _ = regions[len(regions) - tail]
+                scan_end = old_scan_end + shift
+            else:
+                scan_end, old_end_line = size, index.total_lines + 1
+
+            blocks, line_count = _scan_regions(
+                _iter_lines_between(user_stories_path, scan_start, scan_end),
+                scan_start, scan_first_line, scan_end,
+            )
+            _digest_regions(blocks, data)
+            line_shift = scan_first_line + line_count - old_end_line
+
+            updated = replace(
+                index, by_parent=None, by_us_id=None, user_stories_sig={},
+                size=size, total_lines=index.total_lines + line_shift,
+            )
+            if first == 0:
+                preamble_end = blocks[0].start if blocks else scan_end
+                updated.preamble_digest = _region_digest(data[:preamble_end])
+
+        kept_head = index.stories[:max(first - 1, 0)]
+        kept_tail = [
+            replace(
+                b, start=b.start + shift, end=b.end + shift, region_end=b.region_end + shift,
+                start_line=b.start_line + line_shift, end_line=b.end_line + line_shift,
+            )
+            for b in index.stories[len(index.stories) - tail:]
+        ]
+        updated.stories = kept_head + blocks + kept_tail
+        return updated
+
+
+def refresh_index(
+    index: TraceIndex,
+    roadmap_path: Path,
+    user_stories_path: Path,
+    roadmap_changed: bool = True,
+    stories_changed: bool = True,
+    with_signatures: bool = True,
+) -> TraceIndex:
+    """Bring `index` up to date, re-parsing only the inputs (and story regions) that changed."""
+    updated = None
+    if stories_changed:
+        updated = update_story_regions(index, user_stories_path)
+        if updated is None:
+            return build_index(roadmap_path, user_stories_path, with_signatures)
+    else:
+        updated = replace(index, by_parent=None, by_us_id=None)
+
+    if roadmap_changed:
+        _apply_roadmap(updated, roadmap_path)
+    if with_signatures:
+        updated.roadmap_sig = _file_signature(roadmap_path)
+        updated.user_stories_sig = _file_signature(user_stories_path)
+    return updated
+
+
+def save_index(index: TraceIndex, path: Path) -> None:
+    """Write the index atomically; failures are ignored (it is only a cache)."""
+    payload = {
+        "version": INDEX_VERSION,
+        "roadmap": index.roadmap_sig,
+        "user_stories": index.user_stories_sig,
+        "phases": {str(k): v for k, v in index.phases.items()},
+        "waves": {str(k): v for k, v in index.waves.items()},
+        "releases": {str(k): v for k, v in index.releases.items()},
+        "size": index.size,
+        "total_lines": index.total_lines,
+        "preamble_digest": index.preamble_digest,
+        "stories": [
+            {
+                "us_id": b.us_id, "parents": b.parents, "start": b.start, "end": b.end,
+                "start_line": b.start_line, "end_line": b.end_line,
+                "region_end": b.region_end, "digest": b.digest,
+            }
+            for b in index.stories
+        ],
+    }
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        tmp_path.write_text(json.dumps(payload), encoding="utf-8")
+        os.replace(tmp_path, path)
+    except OSError:
+        pass
+
+
+def _read_index(path: Path) -> TraceIndex | None:
+    try:
+        payload = json.loads(path.read_text(encoding="utf-8"))
+        if payload.get("version") != INDEX_VERSION:
+            return None
+        return TraceIndex(
+            phases={int(k): v for k, v in payload["phases"].items()},
+            waves={int(k): v for k, v in payload["waves"].items()},
+            releases={int(k): v for k, v in payload["releases"].items()},
+            stories=[
+                StoryBlock(
+                    us_id=s["us_id"], parents=s["parents"], start=s["start"], end=s["end"],
+                    start_line=s["start_line"], end_line=s["end_line"],
+                    region_end=s["region_end"], digest=s["digest"],
+                )
+                for s in payload["stories"]
+            ],
+            roadmap_sig=payload["roadmap"],
+            user_stories_sig=payload["user_stories"],
+            size=payload["size"],
+            total_lines=payload["total_lines"],
+            preamble_digest=payload["preamble_digest"],
         )
+    except (OSError, ValueError, KeyError, TypeError, AttributeError):
+        return None
+
+
+def load_index(
+    roadmap_path: Path, user_stories_path: Path, index_dir: Path | None = None
+) -> TraceIndex:
+    """Return a fresh index for the pair, updating it when either file changed.
+
+    An edited USER-STORIES.md is only re-scanned across the story regions
+    that changed (see update_story_regions()).
+    """
+    path = index_path_for(roadmap_path, user_stories_path, index_dir or default_index_dir())
+
+    index = _read_index(path)
+    if index is None:
+        index = build_index(roadmap_path, user_stories_path)
+        save_index(index, path)
+        return index
+
+    roadmap_ok, roadmap_moved = _signature_matches(roadmap_path, index.roadmap_sig)
+    stories_ok, stories_moved = _signature_matches(user_stories_path, index.user_stories_sig)
+    if roadmap_ok and stories_ok:
+        if roadmap_moved or stories_moved:
+            # Same content, new mtime — refresh so the next call stays on the fast path
+            index.roadmap_sig = _file_signature(roadmap_path)
+            index.user_stories_sig = _file_signature(user_stories_path)
+            save_index(index, path)
+        return index
+
+    index = refresh_index(
+        index, roadmap_path, user_stories_path,
+        roadmap_changed=not roadmap_ok, stories_changed=not stories_ok,
+    )
+    save_index(index, path)
+    return index
+
+
+def read_story_text(f, block: StoryBlock) -> str:
+    """Slice a story block out of a binary USER-STORIES.md handle."""
+    f.seek(block.start)
+    text = f.read(block.end - block.start).decode("utf-8")
+    return "\n".join(text.splitlines())
+
+
+def summarize_from_index(index: TraceIndex, sm_ids: list[str]) -> MatchResult:
+    """MatchResult for sm_ids with IDs and counts filled in but no story text."""
+    result = MatchResult()
+    sm_set = set(sm_ids)
+
+    for i in index.story_indexes_for(sm_ids):
+        block = index.stories[i]
+        result.us_count += 1
+        result.us_ids.append(block.us_id)
+        result.found_sm_ids.update(p for p in block.parents if p in sm_set)
+
+    return result
+
+
+def iter_index_blocks(
+    index: TraceIndex, sm_ids: list[str], user_stories_path: Path
+) -> Iterator[tuple[StoryBlock, str]]:
+    """Lazily yield (block, text) for matching stories, one seek-and-slice at a time."""
+    with open(user_stories_path, "rb") as f:
+        for i in index.story_indexes_for(sm_ids):
+            block = index.stories[i]
+            yield block, read_story_text(f, block)
+
+
+def iter_index_stories(
+    index: TraceIndex, sm_ids: list[str], user_stories_path: Path
+) -> Iterator[str]:
+    """Lazily read matching story blocks, one seek-and-slice at a time."""
+    for _, text in iter_index_blocks(index, sm_ids, user_stories_path):
+        yield text
+
+
+def match_from_index(
+    index: TraceIndex, sm_ids: list[str], user_stories_path: Path
+) -> MatchResult:
+    """Build the same MatchResult as extract_matching_stories() via seek-and-slice."""
+    result = summarize_from_index(index, sm_ids)
+    result.stories = list(iter_index_stories(index, sm_ids, user_stories_path))
+    return result
+
+
+def phase_fingerprint(index: TraceIndex, phase_num: int, sm_ids: list[str], fmt: str) -> str:
+    """Digest of everything one phase's output is derived from.
+
+    Markdown depends only on the matching stories' content; json/ndjson
+    also carry their line/byte offsets, which move when earlier text does.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    header = [fmt, sm_ids, index.waves.get(phase_num, ""), index.releases.get(phase_num, "")]
+    digest.update(json.dumps(header).encode("utf-8"))
+    for i in index.story_indexes_for(sm_ids):
+        block = index.stories[i]
+        digest.update(block.digest.encode("ascii"))
+        if fmt != "markdown":
+            digest.update(f":{block.start}:{block.start_line}".encode("ascii"))
+    return digest.hexdigest()
+
+
+def output_stamps_path(output_dir: Path, index_dir: Path) -> Path:
+    """Where the fingerprints of an --output-dir's phase files are kept."""
+    key = str(output_dir.resolve())
+    return index_dir / "outputs" / f"{hashlib.sha256(key.encode('utf-8')).hexdigest()[:16]}.json"
+
+
+def read_output_stamps(path: Path) -> dict[str, str]:
+    """Fingerprints of the phase files last written, keyed by file name."""
+    try:
+        stamps = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+    return stamps if isinstance(stamps, dict) else {}
+
+
+def write_output_stamps(path: Path, stamps: dict[str, str]) -> None:
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(stamps, sort_keys=True), encoding="utf-8")
+    except OSError:
+        pass
+
+
+def format_reverse_trace(traces: list[StoryTrace]) -> str:
+    """Format US-XXX → SM-XXX → phase/wave lookups as a markdown table."""
+    lines: list[str] = []
+
+    lines.append("# Reverse Trace — US-XXX → SM-XXX → Phase")
+    lines.append("")
+    lines.append("| US-XXX | SM-XXX | Phase | Wave |")
+    lines.append("|--------|--------|-------|------|")
+    for trace in traces:
+        sm_ids = " ".join(trace.sm_ids) or "—"
+        phases = " ".join(str(p) for p in trace.phases) or "—"
+        waves = ", ".join(w or "—" for w in trace.waves) or "—"
+        lines.append(f"| {trace.us_id} | {sm_ids} | {phases} | {waves} |")
+
+    not_found = [t.us_id for t in traces if not t.found]
+    unplanned = [t.us_id for t in traces if t.found and not t.phases]
+    if not_found:
+        lines.append("")
+        lines.append(f"- **Not in USER-STORIES.md:** {' '.join(not_found)}")
+    if unplanned:
+        if not not_found:
+            lines.append("")
+        lines.append(f"- **Not in any ROADMAP.md phase:** {' '.join(unplanned)}")
 
     return "\n".join(lines)
 
 
-def main() -> None:
-    """CLI entry point with argument validation."""
-    if len(sys.argv) < 4:
-        print(
-            "Usage: trace-phase-stories.py <phase-number> "
-            "<roadmap-path> <user-stories-path>",
-            file=sys.stderr,
-        )
-        print("", file=sys.stderr)
-        print(
-            "Example: trace-phase-stories.py 1 "
-            ".charter/ROADMAP.md .charter/USER-STORIES.md",
-            file=sys.stderr,
-        )
-        sys.exit(1)
+def parse_story_ids(values: list[str]) -> list[str]:
+    """Split --story values on commas/whitespace; '-' reads IDs from stdin."""
+    ids: list[str] = []
+    for value in values:
+        if value == "-":
+            value = sys.stdin.read()
+        ids.extend(re.split(r"[\s,]+", value.strip()))
+    return list(dict.fromkeys(i for i in ids if i))
+
+
+def parse_phase_spec(spec: str) -> list[int]:
+    """Parse a phase list such as '3', '1,4' or '2-5,7' into phase numbers.
+
+    Raises:
+        ValueError: If any part is not an integer or an ascending range
+    """
+    phases: list[int] = []
+    for part in spec.split(","):
+        part = part.strip()
+        first, sep, last = part.partition("-")
+        if sep and first:
+            start, end = int(first), int(last)
+            if end < start:
+                raise ValueError(f"descending range: {part}")
+            phases.extend(range(start, end + 1))
+        else:
+            phases.append(int(part))
+    return list(dict.fromkeys(phases))
+
+
+# -----------------------------------------------------------------------------
+# Daemon
+# -----------------------------------------------------------------------------
+
+# Request/response shape shared by the daemon and the thin client
+DAEMON_PROTOCOL_VERSION = 1
+DAEMON_TIMEOUT_SECONDS = 30
+
+# Namespace attributes that hold paths (sent to the daemon as absolute strings)
+_PATH_ARGS = ("roadmap", "user_stories", "output_dir", "index_dir", "socket")
+
+
+def default_socket_path(index_dir: Path | None = None) -> Path:
+    """Daemon socket, kept next to the on-disk indexes it serves."""
+    return (index_dir or default_index_dir()) / "daemon.sock"
+
+
+class IndexCache:
+    """In-memory TraceIndex per file pair, revalidated by stat on every lookup.
+
+    Used by the daemon: a query only re-parses when either file's mtime or
+    size changed since the cached index was built.
+    """
 
+    def __init__(self):
+        self._entries: dict[tuple[str, str], tuple[tuple, TraceIndex]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _stamp(path: Path) -> tuple[int, int]:
+        st = path.stat()
+        return st.st_mtime_ns, st.st_size
+
+    def get(
+        self,
+        roadmap_path: Path,
+        user_stories_path: Path,
+        no_index: bool = False,
+        index_dir: Path | None = None,
+    ) -> TraceIndex:
+        key = (str(roadmap_path.resolve()), str(user_stories_path.resolve()))
+        stamp = (self._stamp(roadmap_path), self._stamp(user_stories_path))
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == stamp:
+                return entry[1]
+
+            if no_index and entry is not None:
+                # Re-scan only the files (and story regions) that changed
+                index = refresh_index(
+                    entry[1], roadmap_path, user_stories_path,
+                    roadmap_changed=entry[0][0] != stamp[0],
+                    stories_changed=entry[0][1] != stamp[1],
+                    with_signatures=False,
+                )
+            elif no_index:
+                index = build_index(roadmap_path, user_stories_path, with_signatures=False)
+            else:
+                index = load_index(roadmap_path, user_stories_path, index_dir)
+            self._entries[key] = (stamp, index)
+            return index
+
+
+def _args_to_request(args: argparse.Namespace) -> dict:
+    """Serialize CLI args for the daemon, resolving paths against our cwd."""
+    payload = dict(vars(args))
+    for name in _PATH_ARGS:
+        if payload.get(name) is not None:
+            payload[name] = str(Path(payload[name]).resolve())
+    return {"version": DAEMON_PROTOCOL_VERSION, "args": payload}
+
+
+def _args_from_request(payload: dict) -> argparse.Namespace:
+    args = argparse.Namespace(**payload)
+    for name in _PATH_ARGS:
+        if getattr(args, name, None) is not None:
+            setattr(args, name, Path(getattr(args, name)))
+    return args
+
+
+def handle_request(request: dict, cache: IndexCache) -> dict:
+    """Answer one daemon request with the output run() would have printed."""
+    if request.get("version") != DAEMON_PROTOCOL_VERSION:
+        return {"error": f"unsupported protocol version: {request.get('version')}"}
+
+    out, err = io.StringIO(), io.StringIO()
     try:
-        phase_num = int(sys.argv[1])
-    except ValueError:
-        print(
-            f"Error: Phase number must be an integer, got: {sys.argv[1]}",
-            file=sys.stderr,
-        )
-        sys.exit(1)
+        exit_code = run(_args_from_request(request["args"]), out, err, cache)
+    except Exception as e:  # report, don't kill the daemon
+        return {"error": f"{type(e).__name__}: {e}"}
+    return {"stdout": out.getvalue(), "stderr": err.getvalue(), "exit_code": exit_code}
 
-    roadmap_path = sys.argv[2]
-    user_stories_path = sys.argv[3]
 
-    # Validate files exist
+def make_server(
+    socket_path: Path, cache: IndexCache | None = None
+) -> socketserver.ThreadingUnixStreamServer:
+    """Bind the trace daemon to a Unix socket (replacing a stale socket file).
+
+    Each connection carries one JSON request line and gets one JSON
+    response line. Parsed files stay in memory in `cache` between requests.
+    """
+    cache = cache or IndexCache()
+
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            line = self.rfile.readline()
+            if not line:
+                return  # liveness probe: connect and close
+            try:
+                response = handle_request(json.loads(line), cache)
+            except ValueError as e:
+                response = {"error": f"bad request: {e}"}
+            try:
+                self.wfile.write((json.dumps(response) + "\n").encode("utf-8"))
+            except BrokenPipeError:
+                pass  # client gave up (timeout) and ran in-process
+
+    socket_path.parent.mkdir(parents=True, exist_ok=True)
+    if socket_path.exists():
+        if query_daemon_alive(socket_path):
+            raise RuntimeError(f"A trace daemon is already listening on {socket_path}")
+        socket_path.unlink()  # stale socket from a daemon that died
+
+    server = socketserver.ThreadingUnixStreamServer(str(socket_path), Handler)
+    server.daemon_threads = True
+    return server
+
+
+def serve(socket_path: Path) -> None:
+    """Run the trace daemon until interrupted, removing the socket on exit."""
+    server = make_server(socket_path)
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    print(f"Trace daemon listening on {socket_path}", file=sys.stderr)
     try:
-        with open(roadmap_path, "r") as f:
-            roadmap_text = f.read()
-    except FileNotFoundError:
-        print(f"Error: Roadmap file not found: {roadmap_path}", file=sys.stderr)
-        sys.exit(1)
+        server.serve_forever()
+    finally:
+        server.server_close()
+        try:
+            socket_path.unlink()
+        except OSError:
+            pass
 
+
+def query_daemon_alive(socket_path: Path) -> bool:
+    """True if something accepts connections on socket_path."""
     try:
-        with open(user_stories_path, "r") as f:
-            user_stories_text = f.read()
-    except FileNotFoundError:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(1)
+            sock.connect(str(socket_path))
+        return True
+    except OSError:
+        return False
+
+
+def query_daemon(
+    socket_path: Path, args: argparse.Namespace, timeout: float = DAEMON_TIMEOUT_SECONDS
+) -> dict | None:
+    """Send args to a running daemon; None means run in-process instead."""
+    if not hasattr(socket, "AF_UNIX") or not socket_path.exists():
+        return None
+
+    try:
+        request = _args_to_request(args)
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(timeout)
+            sock.connect(str(socket_path))
+            sock.sendall((json.dumps(request) + "\n").encode("utf-8"))
+            with sock.makefile("rb") as f:
+                response = json.loads(f.readline())
+    except (OSError, ValueError):
+        return None
+
+    if "error" in response:
+        return None
+    return response
+
+
+# -----------------------------------------------------------------------------
+# CLI
+# -----------------------------------------------------------------------------
+
+def build_parser() -> argparse.ArgumentParser:
+    """Argument parser for trace queries."""
+    parser = argparse.ArgumentParser(
+        description="Extract the user stories traced to ROADMAP.md phases",
+        epilog=(
+            "Example: trace-phase-stories.py 1 "
+            ".charter/ROADMAP.md .charter/USER-STORIES.md"
+        ),
+    )
+    parser.add_argument(
+        "phase",
+        nargs="?",
+        help="Phase number, or a list/range such as 1,3 or 2-5 (PHASE-N in ROADMAP.md)",
+    )
+    parser.add_argument("roadmap", type=Path, help="Path to ROADMAP.md")
+    parser.add_argument("user_stories", type=Path, help="Path to USER-STORIES.md")
+    parser.add_argument(
+        "--all",
+        action="store_true",
+        help="Trace every phase in ROADMAP.md",
+    )
+    parser.add_argument(
+        "--story",
+        action="append",
+        metavar="US-XXX",
+        help="Reverse trace: report the SM-XXX, phase and wave owning these "
+             "US-XXX IDs (repeatable, comma-separated; '-' reads IDs from stdin)",
+    )
+    parser.add_argument(
+        "--format",
+        choices=("markdown", "json", "ndjson"),
+        default="markdown",
+        help="Output format (default: markdown)",
+    )
+    parser.add_argument(
+        "--output-dir",
+        type=Path,
+        default=None,
+        help="Write one phase-N.<md|json|ndjson> per phase instead of printing to stdout",
+    )
+    parser.add_argument(
+        "--no-index",
+        action="store_true",
+        help="Parse both files directly without reading or writing the on-disk index",
+    )
+    parser.add_argument(
+        "--index-dir",
+        type=Path,
+        default=None,
+        help="Directory for the on-disk index (default: $XDG_CACHE_HOME/claude-forge/trace-phase-stories)",
+    )
+    parser.add_argument(
+        "--socket",
+        type=Path,
+        default=None,
+        help="Daemon socket to query (default: <index-dir>/daemon.sock)",
+    )
+    parser.add_argument(
+        "--no-daemon",
+        action="store_true",
+        help="Always run in-process, even if a trace daemon is listening",
+    )
+    return parser
+
+
+def build_serve_parser() -> argparse.ArgumentParser:
+    """Argument parser for `--serve` (daemon) mode."""
+    parser = argparse.ArgumentParser(
+        description="Run the trace daemon: keep parsed charters in memory and "
+                    "answer trace-phase-stories.py queries over a Unix socket",
+    )
+    parser.add_argument("--serve", action="store_true", required=True)
+    parser.add_argument(
+        "--index-dir",
+        type=Path,
+        default=None,
+        help="Directory for the on-disk index (default: $XDG_CACHE_HOME/claude-forge/trace-phase-stories)",
+    )
+    parser.add_argument(
+        "--socket",
+        type=Path,
+        default=None,
+        help="Socket to listen on (default: <index-dir>/daemon.sock)",
+    )
+    return parser
+
+
+def run(
+    args: argparse.Namespace,
+    out: TextIO,
+    err: TextIO,
+    cache: IndexCache | None = None,
+) -> int:
+    """Execute a trace query, writing results to out and diagnostics to err.
+
+    Returns the process exit code. With a cache (daemon mode) parsed files
+    are reused across calls until they change on disk.
+    """
+    if sum((args.all, args.phase is not None, args.story is not None)) != 1:
+        err.write(build_parser().format_usage())
+        print("Error: Give exactly one of a phase number, --all or --story", file=err)
+        return 1
+
+    requested: list[int] = []
+    if args.phase is not None:
+        try:
+            requested = parse_phase_spec(args.phase)
+        except ValueError:
+            print(
+                f"Error: Phase number must be an integer, got: {args.phase}",
+                file=err,
+            )
+            return 1
+
+    story_ids: list[str] = []
+    if args.story is not None:
+        story_ids = parse_story_ids(args.story)
+        if not story_ids:
+            print("Error: --story needs at least one US-XXX ID", file=err)
+            return 1
+
+    roadmap_path = args.roadmap
+    user_stories_path = args.user_stories
+
+    # Validate files exist
+    if not roadmap_path.is_file():
+        print(f"Error: Roadmap file not found: {roadmap_path}", file=err)
+        return 1
+
+    if not user_stories_path.is_file():
         print(
             f"Error: User stories file not found: {user_stories_path}",
-            file=sys.stderr,
+            file=err,
         )
-        sys.exit(1)
+        return 1
 
-    # Step 1: Extract SM-XXX IDs from the target phase
-    sm_ids = extract_sm_ids(phase_num, roadmap_text)
+    # Without the on-disk index, build the same offsets in memory so story
+    # text is still streamed block by block rather than loaded whole.
+    if cache is not None:
+        index = cache.get(roadmap_path, user_stories_path, args.no_index, args.index_dir)
+    elif args.no_index:
+        index = build_index(roadmap_path, user_stories_path, with_signatures=False)
+    else:
+        index = load_index(roadmap_path, user_stories_path, args.index_dir)
 
-    if not sm_ids:
-        print(
-            f"Error: No SM-XXX IDs found for PHASE-{phase_num} in {roadmap_path}",
-            file=sys.stderr,
+    if story_ids:
+        traces = [index.trace_story(us_id) for us_id in story_ids]
+        if args.format == "json":
+            print(json.dumps([asdict(t) for t in traces], indent=2), file=out)
+        elif args.format == "ndjson":
+            for trace in traces:
+                print(json.dumps(asdict(trace)), file=out)
+        else:
+            print(format_reverse_trace(traces), file=out)
+        return 0
+
+    # Step 1: Extract SM-XXX IDs for the target phase(s)
+    phase_sm_ids: dict[int, list[str]] = {}
+    missing_phases = False
+    for phase_num in (sorted(index.phases) if args.all else requested):
+        sm_ids = index.phases.get(phase_num, [])
+        if sm_ids:
+            phase_sm_ids[phase_num] = sm_ids
+            continue
+        if args.all:
+            print(f"Warning: PHASE-{phase_num} has no SM-XXX IDs — skipped", file=err)
+        else:
+            print(
+                f"Error: No SM-XXX IDs found for PHASE-{phase_num} in {roadmap_path}",
+                file=err,
+            )
+            missing_phases = True
+
+    if not phase_sm_ids:
+        if args.all:
+            print(f"Error: No phases with SM-XXX IDs found in {roadmap_path}", file=err)
+        return 1
+
+    # Steps 2-3: Stream each phase's matching story blocks to its output
+    if args.output_dir:
+        args.output_dir.mkdir(parents=True, exist_ok=True)
+    suffix = {"markdown": "md", "json": "json", "ndjson": "ndjson"}[args.format]
+    json_docs: list[dict] = []
+    # With the on-disk index, only phases whose SM-XXX list or matching
+    # stories changed since the last --output-dir run are rewritten
+    stamps_path = None
+    if args.output_dir and not args.no_index:
+        stamps_path = output_stamps_path(args.output_dir, args.index_dir or default_index_dir())
+    stamps = read_output_stamps(stamps_path) if stamps_path else {}
+
+    for n, (phase_num, sm_ids) in enumerate(phase_sm_ids.items()):
+        if args.output_dir:
+            out_path = args.output_dir / f"phase-{phase_num}.{suffix}"
+        if stamps_path:
+            fingerprint = phase_fingerprint(index, phase_num, sm_ids, args.format)
+            if stamps.get(out_path.name) == fingerprint and out_path.is_file():
+                print(f"Unchanged {out_path}", file=out)
+                continue
+            stamps[out_path.name] = fingerprint
+
+        result = summarize_from_index(index, sm_ids)
+        blocks = iter_index_blocks(index, sm_ids, user_stories_path)
+        phase = phase_to_dict(
+            phase_num, sm_ids, result,
+            index.waves.get(phase_num, ""), index.releases.get(phase_num, ""),
         )
-        sys.exit(1)
 
-    # Step 2: Extract matching story blocks
-    result = extract_matching_stories(sm_ids, user_stories_text)
+        target = out
+        if args.output_dir:
+            target = open(out_path, "w", encoding="utf-8")
+
+        try:
+            if args.format == "ndjson":
+                write_ndjson(target, phase, blocks)
+            elif args.format == "json":
+                phase["stories"] = [story_to_dict(block, text) for block, text in blocks]
+                if args.output_dir:
+                    target.write(json.dumps(phase, indent=2) + "\n")
+                else:
+                    json_docs.append(phase)
+            else:
+                if n and not args.output_dir:
+                    target.write("\n\n")
+                write_output(target, phase_num, sm_ids, result, (text for _, text in blocks))
+                if args.output_dir:
+                    target.write("\n")
+        finally:
+            if args.output_dir:
+                target.close()
+                print(f"Wrote {out_path}", file=out)
+
+    if stamps_path:
+        write_output_stamps(stamps_path, stamps)
+    if not args.output_dir:
+        if args.format == "json":
+            # One phase → one object; several phases → an array of them
+            print(json.dumps(json_docs[0] if len(json_docs) == 1 else json_docs, indent=2), file=out)
+        elif args.format == "markdown":
+            out.write("\n")
+
+    return 1 if missing_phases else 0
+
+
+def main() -> None:
+    """CLI entry point: answer via a running daemon if there is one, else in-process."""
+    if "--serve" in sys.argv[1:]:
+        serve_args = build_serve_parser().parse_args()
+        try:
+            serve(serve_args.socket or default_socket_path(serve_args.index_dir))
+        except (RuntimeError, OSError) as e:
+            print(f"Error: {e}", file=sys.stderr)
+            sys.exit(1)
+        except KeyboardInterrupt:
+            pass
+        return
+
+    args = build_parser().parse_args()
+    if args.story is not None:
+        # Read '-' (stdin) once, so the daemon and the in-process fallback
+        # trace the same IDs
+        args.story = parse_story_ids(args.story)
+
+    if not args.no_daemon:
+        response = query_daemon(args.socket or default_socket_path(args.index_dir), args)
+        if response is not None:
+            sys.stdout.write(response["stdout"])
+            sys.stderr.write(response["stderr"])
+            if response["exit_code"]:
+                sys.exit(response["exit_code"])
+            return
 
-    # Step 3: Output
-    output = format_output(phase_num, sm_ids, result)
-    print(output)
+    exit_code = run(args, sys.stdout, sys.stderr)
+    if exit_code:
+        sys.exit(exit_code)
 
 
 if __name__ == "__main__":